@@ -0,0 +1,927 @@
+import math
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+from cover_reduction import CoverReduction
+from counterexamples_generator import CounterexamplesGenerator, BatchCounterexamplesGenerator, StateKeying
+from lts_cache import save_compact_lts, load_compact_lts, compute_digest, LTS_KIND, CLTS_KIND
+from label_table import LABELS
+from lts_parser import LtsParser, DES_PATTERN, parse_compact_lts, State, Transition, TransitionType
+from minimiser import Minimiser
+from patcher import ComponentPatches, Heuristic, Patcher, search_by_component, search_component
+from property_automaton import compile_property
+from set_cover import MinimumCoverSearch, LeastGreenImpactSearch, ApproximateCoverSearch, ParetoFrontSearch, \
+    exhaustive_minimum_covers, exhaustive_least_green_impact_covers, exhaustive_pareto_front, popcount, \
+    search_in_parallel
+from transitions_loader import TransitionsLoader
+from utils import print_error
+from verifier import Verifier
+
+# This script measures the performances of the different stages of the tool.
+# Usage: python benchmark.py <benchmark_name> [<benchmark_name> ...]
+# Running it without argument launches all the benchmarks. The benchmarks comparing several computations of the same
+# results also check that these results agree (see check()), and fail otherwise.
+
+EXAMPLES_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "EXAMPLES")
+PARSER_REFERENCE_FILE = os.path.join(EXAMPLES_DIRECTORY, "ifttt9_while", "ifttt9.autx")
+PARSER_SCALING_FACTOR = 500
+MEMORY_REFERENCE_DIRECTORY = os.path.join(EXAMPLES_DIRECTORY, "ifttt9_while")
+MEMORY_SCALING_FACTOR = 200
+CACHE_SCALING_FACTOR = 50
+MINIMISATION_SCALING_FACTOR = 100
+BATCH_SCALING_FACTOR = 100
+LOADER_NB_LABELS = [1000, 10000, 100000, 200000]
+COVER_NB_CANDIDATES = [25, 50, 100, 150, 200]
+COVER_NB_LABELS = 30
+COVER_DENSITY = 0.15
+# The exhaustive search is only run when it has at most this number of combinations to test
+GREEN_COVER_NB_CANDIDATES = [15, 20, 50, 100, 200]
+GREEN_COVER_NB_LABELS = 30
+GREEN_COVER_DENSITY = 0.1
+APPROXIMATION_NB_CANDIDATES = [100, 300, 1000]
+APPROXIMATION_NB_LABELS = 10000
+APPROXIMATION_DENSITY = 0.01
+APPROXIMATION_MAX_WEIGHT = 30
+REDUCTION_NB_CANDIDATES = [50, 100, 200]
+REDUCTION_NB_GREEN_LABELS = 20
+COMPONENTS_NB_COMPONENTS = [1, 2, 3, 8]
+# The instance is searched as a whole up to this number of components
+WHOLE_SEARCH_MAX_COMPONENTS = 3
+COMPONENTS_NB_CANDIDATES = 40
+COMPONENTS_NB_LABELS = 15
+ENUMERATION_NB_CANDIDATES = [12, 15, 18, 21]
+PARALLEL_NB_CANDIDATES = 100
+PARALLEL_NB_PROCESSES = [1, 2, 4, 8]
+PARETO_NB_CANDIDATES = [15, 20, 50, 80]
+ANYTIME_NB_CANDIDATES = 100
+# In seconds
+ANYTIME_TIME_BOUND = 1
+DEGENERATE_NB_LABELS = [8, 10, 12]
+DEGENERATE_NB_COPIES = 6
+DEGENERATE_MAX_NB_COVERS = 10
+REACHABILITY_NB_LABELS = [1000, 10000, 100000]
+EXHAUSTIVE_MAX_COMBINATIONS = 2000000
+BATCH_PROPERTIES = [("LOG",), ("MOVEIN", "LIGHTON"), ("MOVEIN", "LIGHTON", "LOG"), ("MOVEIN", "LOG"),
+                    ("MOVEOUT", "LIGHTOFF"), ("WARM", "OPENWINDOW"), ("COLD", "CLOSEWINDOW", "LOG")]
+STRESS_CHAIN_LENGTH = 1000000
+STRESS_FAILURE_PERIOD = 1000
+
+
+def benchmark_parser():
+    print("Parser throughput:")
+    report_parser_throughput(PARSER_REFERENCE_FILE)
+
+    with tempfile.TemporaryDirectory() as directory:
+        synthetic_file = os.path.join(directory, "synthetic.autx")
+        scale_up_autx(PARSER_REFERENCE_FILE, synthetic_file, PARSER_SCALING_FACTOR)
+        report_parser_throughput(synthetic_file)
+
+
+def report_parser_throughput(filename):
+    with open(filename) as file:
+        nb_lines = sum(1 for _ in file)
+
+    start = time.time()
+    lts_parser = LtsParser()
+    lts_parser.parse(filename)
+    duration = time.time() - start
+
+    print("    - {}: {} lines parsed in {:.3f}s ({:.0f} lines/s)".format(
+        os.path.basename(filename), nb_lines, duration, nb_lines / duration if duration > 0 else float("inf")))
+
+
+def benchmark_memory():
+    print("Peak memory of parsing + CLTS generation:")
+
+    with tempfile.TemporaryDirectory() as directory:
+        synthetic_file = os.path.join(directory, "synthetic.daut")
+        scale_up_autx(os.path.join(MEMORY_REFERENCE_DIRECTORY, "ifttt9.daut"), synthetic_file,
+                      MEMORY_SCALING_FACTOR)
+        mcl_file = os.path.join(MEMORY_REFERENCE_DIRECTORY, "prop.mcl")
+        object_memory = measure_peak_memory(run_object_pipeline, synthetic_file, mcl_file)
+        compact_memory = measure_peak_memory(run_compact_pipeline, synthetic_file, mcl_file)
+
+    print("    - State/Transition objects: {:.1f} MiB".format(object_memory / 1024))
+    print("    - Compact LTS: {:.1f} MiB ({:.1f}x less)".format(compact_memory / 1024, object_memory / compact_memory))
+
+
+def benchmark_cache():
+    print("Loading from cache files:")
+
+    with tempfile.TemporaryDirectory() as directory:
+        synthetic_file = os.path.join(directory, "synthetic.daut")
+        scale_up_autx(os.path.join(MEMORY_REFERENCE_DIRECTORY, "ifttt9.daut"), synthetic_file, CACHE_SCALING_FACTOR)
+        mcl_file = os.path.join(MEMORY_REFERENCE_DIRECTORY, "prop.mcl")
+        sys.stdout = open(os.devnull, "w")
+
+        start = time.time()
+        lts = parse_compact_lts(synthetic_file)
+        parse_time = time.time() - start
+        generator = CounterexamplesGenerator(lts, compile_property(mcl_file), True)
+        start = time.time()
+        clts = generator.generate()
+        generate_time = time.time() - start
+
+        lts_digest = compute_digest(synthetic_file)
+        clts_digest = compute_digest(synthetic_file, generator.cache_key())
+        save_compact_lts(lts, synthetic_file + ".ltsc", LTS_KIND, lts_digest)
+        save_compact_lts(clts, synthetic_file + ".cltsc", CLTS_KIND, clts_digest)
+
+        start = time.time()
+        cached_lts = load_compact_lts(synthetic_file + ".ltsc", LTS_KIND, lts_digest)
+        lts_load_time = time.time() - start
+        start = time.time()
+        cached_clts = load_compact_lts(synthetic_file + ".cltsc", CLTS_KIND, clts_digest)
+        clts_load_time = time.time() - start
+        sys.stdout = sys.__stdout__
+
+        print("    - LTS ({} transitions): parsed in {:.3f}s, loaded in {:.4f}s".format(
+            cached_lts.nb_transitions, parse_time, lts_load_time))
+        print("    - CLTS ({} transitions): generated in {:.3f}s, loaded in {:.4f}s".format(
+            cached_clts.nb_transitions, generate_time, clts_load_time))
+
+
+# The recursive traversals of the tool used to exceed the recursion limit of Python on such models
+def benchmark_stress():
+    print("Generation of the CLTS of a chain of {} transitions:".format(STRESS_CHAIN_LENGTH))
+
+    with tempfile.TemporaryDirectory() as directory:
+        lts_file = os.path.join(directory, "chain.aut")
+        mcl_file = os.path.join(directory, "prop.mcl")
+        write_chain_aut(lts_file, STRESS_CHAIN_LENGTH, STRESS_FAILURE_PERIOD)
+
+        with open(mcl_file, "w") as file:
+            file.write("INEVITABLE(\"END\")\n")
+
+        sys.stdout = open(os.devnull, "w")
+        start = time.time()
+        lts = parse_compact_lts(lts_file)
+        parse_time = time.time() - start
+        start = time.time()
+        clts = CounterexamplesGenerator(lts, compile_property(mcl_file), True).generate()
+        generate_time = time.time() - start
+        start = time.time()
+        clts_is_valid = Verifier(clts.get_state(clts.initial_state)).verify()
+        verify_time = time.time() - start
+        sys.stdout = sys.__stdout__
+
+    print("    - LTS ({} transitions) parsed in {:.3f}s".format(lts.nb_transitions, parse_time))
+    print("    - CLTS ({} transitions, {} red) generated in {:.3f}s".format(
+        clts.nb_transitions, len(clts.red_transitions), generate_time))
+    check(clts_is_valid, "the CLTS of the chain is not valid")
+    print("    - CLTS verified in {:.3f}s".format(verify_time))
+
+
+# Write an LTS made of a single path of <length> "STEP" transitions ending with an "END" transition, a
+# "FAIL" transition leading to a deadlock going out of one state every <failure_period> states
+def write_chain_aut(filename, length, failure_period):
+    nb_failures = length // failure_period
+    end_state = length + 1
+
+    with open(filename, "w") as file:
+        file.write("des (0, {}, {})\n".format(length + 1 + nb_failures, end_state + 1 + nb_failures))
+
+        for state in range(length):
+            file.write("({}, \"STEP\", {})\n".format(state, state + 1))
+
+        file.write("({}, \"END\", {})\n".format(length, end_state))
+
+        for failure in range(nb_failures):
+            file.write("({}, \"FAIL\", {})\n".format(failure * failure_period, end_state + 1 + failure))
+
+
+# Compare the colors computed on the condensation of the CLTS with the ones of the former forward searches, which are
+# not exact on some examples (e.g. basic2 and nested): only the colors computed on the condensation are checked
+def benchmark_coloring():
+    print("CLTS coloring, former forward searches vs. condensation:")
+
+    for example in sorted(os.listdir(EXAMPLES_DIRECTORY)):
+        directory = os.path.join(EXAMPLES_DIRECTORY, example)
+        lts_files = [file for file in os.listdir(directory) if file.endswith(".daut")]
+        mcl_file = os.path.join(directory, "prop.mcl")
+
+        if len(lts_files) != 1 or not os.path.isfile(mcl_file):
+            continue
+
+        colorings = []
+        sys.stdout = open(os.devnull, "w")
+
+        for legacy_coloring in (True, False):
+            lts_parser = LtsParser()
+            lts_parser.parse(os.path.join(directory, lts_files[0]))
+            generator = CounterexamplesGenerator(lts_parser, compile_property(mcl_file),
+                                                 legacy_coloring=legacy_coloring)
+            clts = generator.generate()
+            colorings.append(([transition.transition_type for transition in clts.transitions],
+                              generator.phase_durations))
+
+        clts_is_valid = Verifier(next(state for state in clts.states if state.label == clts.initial_state)).verify()
+        sys.stdout = sys.__stdout__
+        check(clts_is_valid, "the CLTS of {} is not valid".format(example))
+        (legacy_colors, legacy_durations), (colors, durations) = colorings
+        nb_differences = sum(1 for legacy_color, color in zip(legacy_colors, colors) if legacy_color != color)
+
+        print("    - {} ({} transitions, {} colored differently):".format(example, len(colors), nb_differences))
+
+        for phase in durations:
+            print("        {}: {:.4f}s -> {:.4f}s".format(phase, legacy_durations[phase], durations[phase]))
+
+
+def benchmark_keying():
+    print("Size of the CLTS, states identified by transitions vs. product states:")
+
+    for example in sorted(os.listdir(EXAMPLES_DIRECTORY)):
+        directory = os.path.join(EXAMPLES_DIRECTORY, example)
+        lts_files = [file for file in os.listdir(directory) if file.endswith(".daut")]
+        mcl_file = os.path.join(directory, "prop.mcl")
+
+        if len(lts_files) != 1 or not os.path.isfile(mcl_file):
+            continue
+
+        sizes = []
+        sys.stdout = open(os.devnull, "w")
+
+        for state_keying in (StateKeying.TRANSITION, StateKeying.PRODUCT):
+            lts = parse_compact_lts(os.path.join(directory, lts_files[0]))
+            start = time.time()
+            clts = CounterexamplesGenerator(lts, compile_property(mcl_file), True, state_keying=state_keying).generate()
+            sizes.append((clts.nb_states, clts.nb_transitions, time.time() - start))
+
+        sys.stdout = sys.__stdout__
+        (transition_states, transition_transitions, transition_time), (product_states, product_transitions,
+                                                                       product_time) = sizes
+
+        print("    - {} (LTS: {} states, {} transitions): {} -> {} states, {} -> {} transitions, "
+              "{:.4f}s -> {:.4f}s".format(example, lts.nb_states, lts.nb_transitions, transition_states,
+                                          product_states, transition_transitions, product_transitions,
+                                          transition_time, product_time))
+
+
+def benchmark_minimisation():
+    print("Minimisation of the CLTS modulo bisimulation:")
+
+    with tempfile.TemporaryDirectory() as directory:
+        synthetic_file = os.path.join(directory, "synthetic.daut")
+        scale_up_autx(os.path.join(MEMORY_REFERENCE_DIRECTORY, "ifttt9.daut"), synthetic_file,
+                      MINIMISATION_SCALING_FACTOR)
+        mcl_file = os.path.join(MEMORY_REFERENCE_DIRECTORY, "prop.mcl")
+
+        for lts_file in (os.path.join(MEMORY_REFERENCE_DIRECTORY, "ifttt9.daut"), synthetic_file):
+            sys.stdout = open(os.devnull, "w")
+            clts = CounterexamplesGenerator(parse_compact_lts(lts_file), compile_property(mcl_file), True).generate()
+            start = time.time()
+            minimised_clts = Minimiser(clts).minimise()
+            duration = time.time() - start
+            sys.stdout = sys.__stdout__
+
+            print("    - {}: {} -> {} states, {} -> {} transitions (ratio {:.2f}) in {:.3f}s".format(
+                os.path.basename(lts_file), clts.nb_states, minimised_clts.nb_states, clts.nb_transitions,
+                minimised_clts.nb_transitions, clts.nb_transitions / minimised_clts.nb_transitions, duration))
+
+
+# Checking N properties separately parses the LTS and explores its product N times, whereas a batch run parses it once
+# and explores the product with all the properties at once
+def benchmark_batch():
+    print("Generation of the CLTS of {} properties, in separate runs vs. in a single batch run (parsing included):"
+          .format(len(BATCH_PROPERTIES)))
+
+    with tempfile.TemporaryDirectory() as directory:
+        synthetic_file = os.path.join(directory, "synthetic.daut")
+        scale_up_autx(os.path.join(MEMORY_REFERENCE_DIRECTORY, "ifttt9.daut"), synthetic_file, BATCH_SCALING_FACTOR)
+        mcl_files = []
+
+        for index, tasks in enumerate(BATCH_PROPERTIES):
+            mcl_file = os.path.join(directory, "property{}.mcl".format(index))
+
+            with open(mcl_file, "w") as file:
+                file.write("INEVITABLE({})\n".format(", ".join("\"{}\"".format(task) for task in tasks)))
+
+            mcl_files.append(mcl_file)
+
+        for compact in (False, True):
+            sys.stdout = open(os.devnull, "w")
+            start = time.time()
+            separate_cltss = [CounterexamplesGenerator(parse_lts(synthetic_file, compact), compile_property(mcl_file),
+                                                       compact).generate()
+                              for mcl_file in mcl_files]
+            separate_time = time.time() - start
+            start = time.time()
+            lts = parse_lts(synthetic_file, compact)
+            batch_cltss = BatchCounterexamplesGenerator(lts, [compile_property(mcl_file) for mcl_file in mcl_files],
+                                                        compact).generate()
+            batch_time = time.time() - start
+            start = time.time()
+            CounterexamplesGenerator(parse_lts(synthetic_file, compact), compile_property(mcl_files[0]),
+                                     compact).generate()
+            single_time = time.time() - start
+            sys.stdout = sys.__stdout__
+
+            check(all(clts_size(separate_clts) == clts_size(batch_clts)
+                      for separate_clts, batch_clts in zip(separate_cltss, batch_cltss)),
+                  "the CLTS generated in batch differ from the ones generated separately")
+            print("    - {} LTS: {:.3f}s separately, {:.3f}s in batch (a single property takes {:.3f}s)".format(
+                "compact" if compact else "object", separate_time, batch_time, single_time))
+
+
+def parse_lts(lts_file, compact):
+    if compact:
+        return parse_compact_lts(lts_file)
+
+    lts_parser = LtsParser()
+    lts_parser.parse(lts_file)
+
+    return lts_parser
+
+
+def clts_size(clts):
+    if isinstance(clts, LtsParser):
+        return len(clts.states), len(clts.transitions)
+
+    return clts.nb_states, clts.nb_transitions
+
+
+def benchmark_loader():
+    print("Computation of ART, FRT and URT on CLTS having many distinct labels:")
+
+    for nb_labels in LOADER_NB_LABELS:
+        clts = build_many_labels_clts(nb_labels)
+        sys.stdout = open(os.devnull, "w")
+        start = time.time()
+        transitions_loader = TransitionsLoader(clts.transitions)
+        transitions_loader.load_subsets()
+        duration = time.time() - start
+        sys.stdout = sys.__stdout__
+
+        print("    - {} labels, {} transitions: {:.3f}s ({:.3f}us per transition), |ART| = {}, |FRT| = {}, "
+              "|URT| = {}".format(nb_labels, len(clts.transitions), duration,
+                                  duration * 1000000 / len(clts.transitions), len(transitions_loader.art),
+                                  len(transitions_loader.frt), len(transitions_loader.urt)))
+
+
+# CLTS in which the initial state (a neighbourhood) has a red transition for each label, followed by a black
+# transition of the same label for one label out of two, and by a green transition of another label
+def build_many_labels_clts(nb_labels):
+    states = [State(0, True)]
+    transitions_by_type = {
+        TransitionType.NEUTRAL: [],
+        TransitionType.CORRECT: [],
+        TransitionType.INCORRECT: []
+    }
+    transitions = []
+
+    def add_transition(inc_state, label_id, transition_type):
+        out_state = State(len(states))
+        states.append(out_state)
+        transition = Transition(inc_state, out_state, label_id, transition_type)
+        inc_state.add_out_transition(transition)
+        out_state.add_inc_transition(transition)
+        transitions_by_type[transition_type].append(transition)
+        transitions.append(transition)
+
+        return out_state
+
+    green_label_id = LABELS.intern("SYNTHETIC_GREEN")
+
+    for label in range(nb_labels):
+        label_id = LABELS.intern("SYNTHETIC_{}".format(label))
+        out_state = add_transition(states[0], label_id, TransitionType.INCORRECT)
+
+        if label % 2 == 0:
+            out_state = add_transition(out_state, label_id, TransitionType.NEUTRAL)
+
+        add_transition(out_state, green_label_id, TransitionType.CORRECT)
+
+    return LtsParser(transitions_by_type[TransitionType.INCORRECT], transitions_by_type[TransitionType.CORRECT],
+                     transitions_by_type[TransitionType.NEUTRAL], 0, len(transitions), len(states), states,
+                     transitions)
+
+
+# ART, FRT and URT computed by a separate traversal of the CLTS vs. from the census built during its generation
+def benchmark_census():
+    print("Computation of ART, FRT and URT, by a separate traversal vs. during the generation of the CLTS:")
+
+    with tempfile.TemporaryDirectory() as directory:
+        synthetic_file = os.path.join(directory, "synthetic.daut")
+        scale_up_autx(os.path.join(MEMORY_REFERENCE_DIRECTORY, "ifttt9.daut"), synthetic_file,
+                      MINIMISATION_SCALING_FACTOR)
+        mcl_file = os.path.join(MEMORY_REFERENCE_DIRECTORY, "prop.mcl")
+
+        for compact in (False, True):
+            results = []
+
+            for emit_label_census in (False, True):
+                sys.stdout = open(os.devnull, "w")
+                generator = CounterexamplesGenerator(parse_lts(synthetic_file, compact), compile_property(mcl_file),
+                                                     compact, emit_label_census=emit_label_census)
+                start = time.time()
+                clts = generator.generate()
+                generation_time = time.time() - start
+                start = time.time()
+                transitions_loader = TransitionsLoader(clts.transitions, clts.label_census)
+                transitions_loader.load_subsets()
+                loading_time = time.time() - start
+                sys.stdout = sys.__stdout__
+                results.append((generation_time, loading_time,
+                                [sorted(transition.label_id for transition in subset)
+                                 for subset in (transitions_loader.art, transitions_loader.frt,
+                                                transitions_loader.urt)]))
+
+            (separate_generation, separate_loading, separate_sets), (emitted_generation, emitted_loading,
+                                                                     emitted_sets) = results
+            check(separate_sets == emitted_sets, "ART, FRT and URT computed from the census differ from the ones "
+                                                 "computed by a separate traversal")
+            print("    - {} CLTS: generation + loading took {:.3f}s + {:.3f}s separately, {:.3f}s + {:.3f}s with "
+                  "the census".format("compact" if compact else "object", separate_generation, separate_loading,
+                                      emitted_generation, emitted_loading))
+
+
+# Minimum covers of random instances, in which each FRT transition covers each ART label with a given probability
+def benchmark_cover():
+    print("Search of all the minimum covers of {} ART labels, each FRT transition covering a label with probability "
+          "{}:".format(COVER_NB_LABELS, COVER_DENSITY))
+
+    for nb_candidates in COVER_NB_CANDIDATES:
+        masks, universe = random_cover_instance(nb_candidates, COVER_NB_LABELS, COVER_DENSITY, nb_candidates)
+        search = MinimumCoverSearch(masks, universe)
+        start = time.time()
+        covers = search.search()
+        duration = time.time() - start
+        nb_combinations = sum(math.comb(nb_candidates, size) for size in range(1, search.best_size + 1))
+
+        if nb_combinations <= EXHAUSTIVE_MAX_COMBINATIONS:
+            start = time.time()
+            exhaustive_covers = exhaustive_minimum_covers(masks, universe)
+            exhaustive_result = "exhaustive search: {:.3f}s".format(time.time() - start)
+            check_same_covers(covers, exhaustive_covers, "exhaustive search", nb_candidates)
+        else:
+            exhaustive_result = "exhaustive search: not run"
+
+        print("    - |FRT| = {}: {} covers of size {} found in {:.3f}s ({} nodes instead of {} combinations), {}"
+              .format(nb_candidates, len(covers), search.best_size, duration, search.nb_nodes, nb_combinations,
+                      exhaustive_result))
+
+
+# Covers having the least impact on the green part of random instances, in which each FRT transition also reaches
+# each green label with a given probability. The exhaustive search tests all the combinations of candidates.
+def benchmark_green_cover():
+    print("Search of all the covers of {} ART labels reaching the fewest of {} green labels, each FRT transition "
+          "covering (resp. reaching) a label with probability {} (resp. {}):".format(
+              COVER_NB_LABELS, GREEN_COVER_NB_LABELS, COVER_DENSITY, GREEN_COVER_DENSITY))
+
+    for nb_candidates in GREEN_COVER_NB_CANDIDATES:
+        masks, universe = random_cover_instance(nb_candidates, COVER_NB_LABELS, COVER_DENSITY, nb_candidates)
+        green_masks, _ = random_cover_instance(nb_candidates, GREEN_COVER_NB_LABELS, GREEN_COVER_DENSITY,
+                                               -nb_candidates)
+        search = LeastGreenImpactSearch(masks, green_masks, universe)
+        start = time.time()
+        covers = search.search()
+        duration = time.time() - start
+        nb_combinations = 2 ** nb_candidates - 1
+
+        if nb_combinations <= EXHAUSTIVE_MAX_COMBINATIONS:
+            start = time.time()
+            exhaustive_covers = exhaustive_least_green_impact_covers(masks, green_masks, universe)
+            exhaustive_result = "exhaustive search: {:.3f}s".format(time.time() - start)
+            check_same_covers(covers, exhaustive_covers, "exhaustive search", nb_candidates)
+        else:
+            exhaustive_result = "exhaustive search: not run"
+
+        print("    - |FRT| = {}: {} covers reaching {} green labels with {} transitions found in {:.3f}s ({} nodes "
+              "instead of {} combinations), {}".format(nb_candidates, len(covers), search.best_cost[0],
+                                                       search.best_cost[1], duration, search.nb_nodes,
+                                                       nb_combinations, exhaustive_result))
+
+
+# Approximate covers of random instances having a large ART, the weight of each FRT transition being random
+def benchmark_approximation():
+    print("Approximation of the cover of least weight of {} ART labels, each FRT transition covering a label with "
+          "probability {} and weighing between 1 and {}:".format(APPROXIMATION_NB_LABELS, APPROXIMATION_DENSITY,
+                                                                 APPROXIMATION_MAX_WEIGHT))
+
+    for nb_candidates in APPROXIMATION_NB_CANDIDATES:
+        masks, universe = random_cover_instance(nb_candidates, APPROXIMATION_NB_LABELS, APPROXIMATION_DENSITY,
+                                                nb_candidates)
+        generator = random.Random(nb_candidates)
+        weights = [generator.randint(1, APPROXIMATION_MAX_WEIGHT) for _ in range(nb_candidates)]
+        search = ApproximateCoverSearch(masks, weights, universe)
+        start = time.time()
+        cover = search.search()
+        duration = time.time() - start
+        print("    - |FRT| = {}: cover of {} transitions found in {:.3f}s, weight {} (greedy: {}, lower bound: {}, "
+              "gap: {:.2f}, H({}) = {:.2f})".format(nb_candidates, len(cover), duration, search.weight,
+                                               search.greedy_weight, search.lower_bound,
+                                               search.weight / search.lower_bound, search.max_coverage,
+                                               search.harmonic_bound))
+
+
+# Covers having the least impact on the green part of random instances in which many candidates are equivalent or
+# dominated, as in the FRT of actual models: half of the candidates are copies of other ones or of parts of them
+def benchmark_reduction():
+    print("Search of the covers having the least impact on the green part, with and without reduction of the "
+          "instance:")
+
+    for nb_candidates in REDUCTION_NB_CANDIDATES:
+        generator = random.Random(nb_candidates)
+        masks, universe = random_cover_instance(nb_candidates // 2, COVER_NB_LABELS, COVER_DENSITY, nb_candidates)
+        green_masks, _ = random_cover_instance(nb_candidates // 2, REDUCTION_NB_GREEN_LABELS, GREEN_COVER_DENSITY,
+                                               -nb_candidates)
+
+        while len(masks) < nb_candidates:
+            copied = generator.randrange(len(masks))
+
+            if generator.random() < 0.5:
+                masks.append(masks[copied])
+                green_masks.append(green_masks[copied])
+            else:
+                masks.append(masks[copied] & generator.getrandbits(COVER_NB_LABELS))
+                green_masks.append(green_masks[copied] | 1 << generator.randrange(REDUCTION_NB_GREEN_LABELS))
+
+        search = LeastGreenImpactSearch(masks, green_masks, universe)
+        start = time.time()
+        covers = search.search()
+        duration = time.time() - start
+
+        start = time.time()
+        reduction = CoverReduction(masks, green_masks, universe)
+        reduction.reduce()
+        reduction_duration = time.time() - start
+        reduced_search = LeastGreenImpactSearch(reduction.masks, reduction.green_masks, reduction.universe)
+        start = time.time()
+        reduced_covers = reduction.expand(reduced_search.search())
+        reduced_duration = time.time() - start
+        check_same_covers(covers, reduced_covers, "search of the reduced instance", nb_candidates)
+
+        print("    - |FRT| = {}: {} covers found in {:.3f}s ({} nodes) without reduction, in {:.3f}s + {:.3f}s ({} "
+              "nodes) on {} candidates and {} labels after reduction".format(
+                  nb_candidates, len(covers), duration, search.nb_nodes, reduction_duration, reduced_duration,
+                  reduced_search.nb_nodes, len(reduction.kept), popcount(reduction.universe)))
+
+
+# Minimum covers of random instances made of independent components, each having the same number of candidates and
+# labels, searched as a whole or component by component (serially, then in parallel)
+def benchmark_components():
+    print("Search of all the minimum covers of instances made of independent components of {} FRT transitions and {} "
+          "ART labels:".format(COMPONENTS_NB_CANDIDATES, COMPONENTS_NB_LABELS))
+
+    for nb_components in COMPONENTS_NB_COMPONENTS:
+        masks = []
+
+        for component in range(nb_components):
+            component_masks, _ = random_cover_instance(COMPONENTS_NB_CANDIDATES, COMPONENTS_NB_LABELS, COVER_DENSITY,
+                                                       component)
+            masks.extend(mask << component * COMPONENTS_NB_LABELS for mask in component_masks)
+
+        universe = (1 << nb_components * COMPONENTS_NB_LABELS) - 1
+        results = []
+
+        for nb_processes in (1, os.cpu_count()):
+            start = time.time()
+            patches = ComponentPatches([[tuple(candidates[candidate] for candidate in cover) for cover in covers]
+                                        for candidates, covers, _ in search_by_component(masks, [0] * len(masks),
+                                                                                         universe, False, None,
+                                                                                         nb_processes)])
+            results.append((time.time() - start, patches))
+
+        check(results[0][1].component_patches == results[1][1].component_patches,
+              "the searches of the components by 1 and {} processes find other covers ({} components)".format(
+                  os.cpu_count(), nb_components))
+
+        if nb_components <= WHOLE_SEARCH_MAX_COMPONENTS:
+            search = MinimumCoverSearch(masks, universe)
+            start = time.time()
+            covers = search.search()
+            whole_result = "{} covers found in {:.3f}s as a whole".format(len(covers), time.time() - start)
+            check(sorted(covers) == sorted(tuple(sorted(patch)) for patch in results[0][1]),
+                  "the search as a whole finds other covers than the search by component ({} components)".format(
+                      nb_components))
+        else:
+            whole_result = "search as a whole not run"
+
+        print("    - {} components: {} covers found in {:.3f}s by component, {:.3f}s with {} processes, {}".format(
+            nb_components, len(results[0][1]), results[0][0], results[1][0], os.cpu_count(), whole_result))
+
+
+# Exhaustive search of the covers having the least impact on the green part, whose memory footprint should not depend
+# on the number of combinations enumerated
+def benchmark_enumeration():
+    print("Exhaustive search of the covers having the least impact on the green part:")
+
+    for nb_candidates in ENUMERATION_NB_CANDIDATES:
+        masks, universe = random_cover_instance(nb_candidates, COVER_NB_LABELS, COVER_DENSITY, nb_candidates)
+        green_masks, _ = random_cover_instance(nb_candidates, GREEN_COVER_NB_LABELS, GREEN_COVER_DENSITY,
+                                               -nb_candidates)
+        start = time.time()
+        peak = measure_peak_memory(exhaustive_least_green_impact_covers, masks, green_masks, universe)
+        print("    - |FRT| = {}: {} combinations enumerated in {:.3f}s, peak memory increase: {} KiB".format(
+            nb_candidates, 2 ** nb_candidates - 1, time.time() - start, peak))
+
+
+# Speedup of the parallel searches with the number of processes, on the instances of the cover and greencover
+# benchmarks. The speedup is bounded by the number of cores of the machine.
+def benchmark_parallel():
+    print("Parallel search of the covers of instances of {} FRT transitions, on {} cores:".format(
+        PARALLEL_NB_CANDIDATES, os.cpu_count()))
+    masks, universe = random_cover_instance(PARALLEL_NB_CANDIDATES, COVER_NB_LABELS, COVER_DENSITY,
+                                            PARALLEL_NB_CANDIDATES)
+    green_masks, _ = random_cover_instance(PARALLEL_NB_CANDIDATES, GREEN_COVER_NB_LABELS, GREEN_COVER_DENSITY,
+                                           -PARALLEL_NB_CANDIDATES)
+
+    for name, create_search in (("minimum covers", lambda: MinimumCoverSearch(masks, universe)),
+                                ("least impact on the green part",
+                                 lambda: LeastGreenImpactSearch(masks, green_masks, universe))):
+        search = create_search()
+        start = time.time()
+        covers = search.search()
+        serial_duration = time.time() - start
+        print("    - {}: {} covers found in {:.3f}s ({} nodes) by a single process".format(name, len(covers),
+                                                                                          serial_duration,
+                                                                                          search.nb_nodes))
+
+        for nb_processes in PARALLEL_NB_PROCESSES:
+            parallel_search = create_search()
+            start = time.time()
+            parallel_covers = search_in_parallel(parallel_search, nb_processes)
+            duration = time.time() - start
+            check(list(parallel_covers) == list(covers) and parallel_covers.count == covers.count,
+                  "the search of the {} by {} processes finds other covers".format(name, nb_processes))
+            print("        - {} processes: {:.3f}s ({} nodes), speedup: {:.2f}".format(
+                nb_processes, duration, parallel_search.nb_nodes, serial_duration / duration))
+
+
+# Single search of the Pareto front of (size, number of green labels reached) of the covers, compared to the two
+# searches of its extreme points, on the instances of the greencover benchmark
+def benchmark_pareto():
+    print("Search of the Pareto front of the covers of {} ART labels reaching some of {} green labels, each FRT "
+          "transition covering (resp. reaching) a label with probability {} (resp. {}):".format(
+              COVER_NB_LABELS, GREEN_COVER_NB_LABELS, COVER_DENSITY, GREEN_COVER_DENSITY))
+
+    for nb_candidates in PARETO_NB_CANDIDATES:
+        masks, universe = random_cover_instance(nb_candidates, COVER_NB_LABELS, COVER_DENSITY, nb_candidates)
+        green_masks, _ = random_cover_instance(nb_candidates, GREEN_COVER_NB_LABELS, GREEN_COVER_DENSITY,
+                                               -nb_candidates)
+        search = ParetoFrontSearch(masks, green_masks, universe)
+        start = time.time()
+        front = search.search()
+        duration = time.time() - start
+        start = time.time()
+        minimum_search = MinimumCoverSearch(masks, universe)
+        minimum_search.search()
+        least_green_impact_search = LeastGreenImpactSearch(masks, green_masks, universe)
+        least_green_impact_search.search()
+        extreme_points_duration = time.time() - start
+        nb_combinations = 2 ** nb_candidates - 1
+        # The front starts with the minimum covers reaching the fewest green labels, and ends with the covers having the
+        # least impact on the green part
+        check(min(front)[0] == minimum_search.best_size
+              and max(front) == tuple(reversed(least_green_impact_search.best_cost)),
+              "the Pareto front does not match the searches of its extreme points (|FRT| = {})".format(nb_candidates))
+
+        if nb_combinations <= EXHAUSTIVE_MAX_COMBINATIONS:
+            start = time.time()
+            exhaustive_front = exhaustive_pareto_front(masks, green_masks, universe)
+            exhaustive_result = "exhaustive search: {:.3f}s".format(time.time() - start)
+            check(sorted(front) == sorted(exhaustive_front),
+                  "the exhaustive search finds another Pareto front (|FRT| = {})".format(nb_candidates))
+
+            for point in front:
+                check_same_covers(front[point], exhaustive_front[point], "exhaustive search", nb_candidates)
+        else:
+            exhaustive_result = "exhaustive search: not run"
+
+        print("    - |FRT| = {}: {} points ({}) and {} covers found in {:.3f}s ({} nodes), searches of the extreme "
+              "points: {:.3f}s, {}".format(nb_candidates, len(front),
+                                           ", ".join("{} transitions/{} green labels".format(*point)
+                                                     for point in sorted(front)),
+                                           sum(len(covers) for covers in front.values()), duration, search.nb_nodes,
+                                           extreme_points_duration, exhaustive_result))
+
+
+# Covers found over time by a search of the greencover benchmark, and cost of the same search split into runs stopped
+# by a time bound and resumed from a checkpoint file
+def benchmark_anytime():
+    print("Anytime search of the covers of {} ART labels reaching the fewest of {} green labels, among {} FRT "
+          "transitions:".format(COVER_NB_LABELS, GREEN_COVER_NB_LABELS, ANYTIME_NB_CANDIDATES))
+    masks, universe = random_cover_instance(ANYTIME_NB_CANDIDATES, COVER_NB_LABELS, COVER_DENSITY,
+                                            ANYTIME_NB_CANDIDATES)
+    green_masks, _ = random_cover_instance(ANYTIME_NB_CANDIDATES, GREEN_COVER_NB_LABELS, GREEN_COVER_DENSITY,
+                                           -ANYTIME_NB_CANDIDATES)
+    search = LeastGreenImpactSearch(masks, green_masks, universe)
+    improvements = []
+    search.listener = lambda cover: improvements.append((time.time() - start, popcount(search.cover_green(cover)),
+                                                         len(cover)))
+    start = time.time()
+    covers = search.search()
+    duration = time.time() - start
+
+    for improvement_time, nb_green_labels, size in improvements:
+        print("    - Cover reaching {} green labels with {} transitions found after {:.3f}s".format(
+            nb_green_labels, size, improvement_time))
+
+    print("    - Search completed in {:.3f}s ({} nodes)".format(duration, search.nb_nodes))
+
+    with tempfile.TemporaryDirectory() as directory:
+        checkpoint_file = os.path.join(directory, "search.patchc")
+        nb_runs = 0
+        start = time.time()
+
+        while True:
+            search = LeastGreenImpactSearch(masks, green_masks, universe, ANYTIME_TIME_BOUND)
+            search.checkpoint_file = checkpoint_file
+            resumed_covers = search.search()
+            nb_runs += 1
+
+            if search.complete:
+                break
+
+            print("    - Run {} stopped after {}s: best covers reach {} green labels with {} transitions, optimal "
+                  "covers reach at least {} green labels".format(nb_runs, ANYTIME_TIME_BOUND, *search.best_cost,
+                                                                 search.lower_bound[0]))
+
+        check(list(resumed_covers) == list(covers) and resumed_covers.count == covers.count,
+              "the search resumed from checkpoints finds other covers")
+        print("    - Search completed by {} runs in {:.3f}s ({} nodes)".format(nb_runs, time.time() - start,
+                                                                            search.nb_nodes))
+
+
+# Labels of the red and green transitions reachable from each label of FRT, computed when creating the Patcher, on the
+# CLTS of the loader benchmark: their cost should grow linearly with the size of the CLTS, whatever the size of FRT
+def benchmark_reachability():
+    print("Computation of the transitions reachable from FRT on CLTS having many distinct labels:")
+
+    for nb_labels in REACHABILITY_NB_LABELS:
+        clts = build_many_labels_clts(nb_labels)
+        sys.stdout = open(os.devnull, "w")
+        transitions_loader = TransitionsLoader(clts.transitions)
+        transitions_loader.load_subsets()
+        sys.stdout = sys.__stdout__
+        start = time.time()
+        Patcher(transitions_loader.art, transitions_loader.frt, transitions_loader.urt,
+                Heuristic.LESS_IMPACT_ON_GREEN_PART, clts.green_transitions, clts.red_transitions, clts.transitions, -1)
+        duration = time.time() - start
+        print("    - |FRT| = {}, {} transitions: {:.3f}s ({:.3f}us per transition)".format(
+            len(transitions_loader.frt), len(clts.transitions), duration, duration * 1000000 / len(clts.transitions)))
+
+
+# Search of the minimum covers of instances having many optimal covers: the labels form a cycle, each pair of
+# consecutive labels being covered by DEGENERATE_NB_COPIES equivalent candidates, so that the optimal covers are the
+# 2 * DEGENERATE_NB_COPIES ^ (nb_labels / 2) combinations of copies of every other pair. Only the first
+# DEGENERATE_MAX_NB_COVERS covers are kept by the limited search, whose memory footprint should not depend on the
+# number of optimal covers.
+def benchmark_degenerate():
+    print("Search of the minimum covers of cycles of labels, each pair of consecutive labels being covered by {} "
+          "equivalent FRT transitions:".format(DEGENERATE_NB_COPIES))
+
+    for nb_labels in DEGENERATE_NB_LABELS:
+        masks = [1 << label | 1 << (label + 1) % nb_labels
+                 for label in range(nb_labels) for _ in range(DEGENERATE_NB_COPIES)]
+        universe = (1 << nb_labels) - 1
+        results = []
+
+        for limit in (None, DEGENERATE_MAX_NB_COVERS):
+            instance = (masks, [0] * len(masks), universe, False, None, limit)
+            start = time.time()
+            covers, _ = search_component(*instance)
+            duration = time.time() - start
+            results.append((covers, duration, measure_peak_memory(search_component, *instance)))
+
+        (all_covers, duration, peak), (first_covers, limited_duration, limited_peak) = results
+        nb_optimal_covers = 2 * DEGENERATE_NB_COPIES ** (nb_labels // 2)
+        check(all_covers.count == first_covers.count == len(all_covers) == nb_optimal_covers
+              and list(first_covers) == list(all_covers)[:DEGENERATE_MAX_NB_COVERS],
+              "the searches do not find the {} optimal covers of the cycle of {} labels".format(nb_optimal_covers,
+                                                                                              nb_labels))
+        print("    - {} labels: {} optimal covers found in {:.3f}s (peak memory increase: {} KiB), {} of them kept "
+              "in {:.3f}s (peak memory increase: {} KiB)".format(nb_labels, first_covers.count, duration, peak,
+                                                                 len(first_covers), limited_duration, limited_peak))
+
+
+# Fail the benchmark if the condition does not hold
+def check(condition, description):
+    if not condition:
+        print_error("Benchmark check failed: {}.".format(description))
+        raise Exception()
+
+
+def check_same_covers(covers, other_covers, other_search, nb_candidates):
+    check(sorted(covers) == sorted(other_covers), "the {} finds other covers (|FRT| = {})".format(other_search,
+                                                                                                 nb_candidates))
+
+
+def random_cover_instance(nb_candidates, nb_labels, density, seed):
+    generator = random.Random(seed)
+    masks = [sum(1 << label for label in range(nb_labels) if generator.random() < density)
+             for _ in range(nb_candidates)]
+
+    # Each label is covered by at least one candidate
+    for label in range(nb_labels):
+        if not any(mask >> label & 1 for mask in masks):
+            masks[generator.randrange(nb_candidates)] |= 1 << label
+
+    return masks, (1 << nb_labels) - 1
+
+
+def run_object_pipeline(lts_file, mcl_file):
+    lts_parser = LtsParser()
+    lts_parser.parse(lts_file)
+    CounterexamplesGenerator(lts_parser, compile_property(mcl_file)).generate()
+
+
+def run_compact_pipeline(lts_file, mcl_file):
+    lts = parse_compact_lts(lts_file)
+    CounterexamplesGenerator(lts, compile_property(mcl_file), True).generate()
+
+
+# Run the given function in a fresh process and return the increase of its resident memory peak, in KiB
+def measure_peak_memory(function, *args):
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=report_peak_memory, args=(queue, function) + args)
+    process.start()
+    peak = queue.get()
+    process.join()
+
+    return peak
+
+
+def report_peak_memory(queue, function, *args):
+    initial_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    sys.stdout = open(os.devnull, "w")
+    function(*args)
+    queue.put(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - initial_peak)
+
+
+# Write <nb_copies> disjoint copies of the given AUT file in a single file, by shifting the state numbers
+# of each copy. The copies are linked by their initial states, through transitions having distinct labels so
+# that the resulting LTS stays connected and deterministic.
+def scale_up_autx(original_filename, scaled_filename, nb_copies):
+    with open(original_filename) as file:
+        lines = file.read().splitlines()
+
+    header = DES_PATTERN.fullmatch(lines[0].strip())
+
+    if header is None:
+        print_error("File |{}| does not start with a valid AUT header.".format(original_filename))
+        raise Exception()
+
+    initial_state, nb_transitions, nb_states = (int(group) for group in header.groups())
+    transitions = [line.strip()[1:-1] for line in lines[1:] if line.strip()]
+
+    with open(scaled_filename, "w") as file:
+        file.write("des ({}, {}, {})\n".format(initial_state, nb_transitions * nb_copies + nb_copies - 1,
+                                               nb_states * nb_copies))
+
+        for copy in range(nb_copies):
+            offset = copy * nb_states
+
+            for transition in transitions:
+                first_coma = transition.find(",")
+                last_coma = transition.rfind(",")
+                inc_state = transition[:first_coma].split(":", 1)
+                inc_state[0] = str(int(inc_state[0]) + offset)
+                file.write("({},{}, {})\n".format(":".join(inc_state), transition[first_coma + 1:last_coma],
+                                                  int(transition[last_coma + 1:]) + offset))
+
+            if copy != 0:
+                file.write("({}, \"SYNTHETIC_LINK_{}\":BLACK, {})\n".format(initial_state, copy,
+                                                                          initial_state + offset))
+
+
+BENCHMARKS = {
+    "parser": benchmark_parser,
+    "memory": benchmark_memory,
+    "cache": benchmark_cache,
+    "stress": benchmark_stress,
+    "coloring": benchmark_coloring,
+    "keying": benchmark_keying,
+    "minimisation": benchmark_minimisation,
+    "batch": benchmark_batch,
+    "loader": benchmark_loader,
+    "census": benchmark_census,
+    "cover": benchmark_cover,
+    "greencover": benchmark_green_cover,
+    "approximation": benchmark_approximation,
+    "reduction": benchmark_reduction,
+    "components": benchmark_components,
+    "enumeration": benchmark_enumeration,
+    "parallel": benchmark_parallel,
+    "pareto": benchmark_pareto,
+    "anytime": benchmark_anytime,
+    "degenerate": benchmark_degenerate,
+    "reachability": benchmark_reachability
+}
+
+
+if __name__ == '__main__':
+    names = sys.argv[1:] if len(sys.argv) > 1 else list(BENCHMARKS)
+
+    for name in names:
+        if name not in BENCHMARKS:
+            print_error("Benchmark |{}| does not exist. Available benchmarks are: {}."
+                        .format(name, ", ".join(BENCHMARKS)))
+            raise Exception()
+
+        BENCHMARKS[name]()
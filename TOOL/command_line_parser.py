@@ -14,6 +14,17 @@ class Argument(Enum):
     WORKING_DIRECTORY = 5
     CLTS = 6
     TIME_BOUND = 7
+    COMPACT = 8
+    CACHE = 9
+    BREADTH_FIRST = 10
+    TRANSITION_KEYING = 11
+    NO_MINIMISATION = 12
+    SEPARATE_LOADING = 13
+    APPROXIMATION = 14
+    NB_PROCESSES = 15
+    PARETO_FRONT = 16
+    CHECKPOINT = 17
+    MAX_NB_PATCHES = 18
 
 
 class Parser:
@@ -22,10 +33,21 @@ class Parser:
             Argument.LTS: None,
             Argument.VERBOSE: False,
             Argument.OVERRIDE: False,
-            Argument.MCL_PROPERTY: None,
+            Argument.MCL_PROPERTY: [],
             Argument.LNT: None,
             Argument.WORKING_DIRECTORY: None,
-            Argument.TIME_BOUND: -1
+            Argument.TIME_BOUND: -1,
+            Argument.COMPACT: False,
+            Argument.CACHE: False,
+            Argument.BREADTH_FIRST: False,
+            Argument.TRANSITION_KEYING: False,
+            Argument.NO_MINIMISATION: False,
+            Argument.SEPARATE_LOADING: False,
+            Argument.APPROXIMATION: False,
+            Argument.NB_PROCESSES: 1,
+            Argument.PARETO_FRONT: False,
+            Argument.CHECKPOINT: False,
+            Argument.MAX_NB_PATCHES: 100
         }
         self.sys_args = arguments
 
@@ -39,14 +61,40 @@ class Parser:
                 self.arguments_map[Argument.LTS] = arg
             elif is_time_bound(arg):
                 self.arguments_map[Argument.TIME_BOUND] = parse_time_bound(arg)
+            elif is_nb_processes(arg):
+                self.arguments_map[Argument.NB_PROCESSES] = parse_nb_processes(arg)
+            elif is_max_nb_patches(arg):
+                self.arguments_map[Argument.MAX_NB_PATCHES] = parse_max_nb_patches(arg)
             elif is_verbose(arg):
                 self.arguments_map[Argument.VERBOSE] = True
             elif is_override(arg):
                 self.arguments_map[Argument.OVERRIDE] = True
+            elif is_compact(arg):
+                self.arguments_map[Argument.COMPACT] = True
+            elif is_cache(arg):
+                # Cache files store compact LTS
+                self.arguments_map[Argument.CACHE] = True
+                self.arguments_map[Argument.COMPACT] = True
+            elif is_breadth_first(arg):
+                self.arguments_map[Argument.BREADTH_FIRST] = True
+            elif is_transition_keying(arg):
+                self.arguments_map[Argument.TRANSITION_KEYING] = True
+            elif is_no_minimisation(arg):
+                self.arguments_map[Argument.NO_MINIMISATION] = True
+            elif is_separate_loading(arg):
+                self.arguments_map[Argument.SEPARATE_LOADING] = True
+            elif is_approximation(arg):
+                self.arguments_map[Argument.APPROXIMATION] = True
+            elif is_pareto_front(arg):
+                self.arguments_map[Argument.PARETO_FRONT] = True
+            elif is_checkpoint(arg):
+                self.arguments_map[Argument.CHECKPOINT] = True
             elif is_mcl_property(arg):
-                if self.arguments_map[Argument.MCL_PROPERTY] is not None:
-                    print_warning("An MCL file has already been specified. It will be overwritten by the current one.")
-                self.arguments_map[Argument.MCL_PROPERTY] = arg
+                # Several properties can be checked at once on the same LTS
+                if arg in self.arguments_map[Argument.MCL_PROPERTY]:
+                    print_warning("MCL file |{}| has already been specified. It has been ignored.".format(arg))
+                else:
+                    self.arguments_map[Argument.MCL_PROPERTY].append(arg)
             elif is_lnt(arg):
                 if self.arguments_map[Argument.LNT] is not None:
                     print_warning("An LNT file has already been specified. It will be overwritten by the current one.")
@@ -59,6 +107,11 @@ class Parser:
             else:
                 print_warning("Argument |{}| was not recognized. It has been ignored.".format(arg))
 
+        if self.arguments_map[Argument.APPROXIMATION] and self.arguments_map[Argument.PARETO_FRONT]:
+            print_warning("Both the approximation and the Pareto front of the patches were asked for. Only the "
+                          "approximation will be computed.")
+            self.arguments_map[Argument.PARETO_FRONT] = False
+
         if not arguments_validated(self.arguments_map):
             print_error("LTS/LNT file or MCL property are missing or invalid. Please try again.")
             raise Exception()
@@ -102,6 +155,51 @@ def is_override(arg):
            or beautiful_arg == "--override" \
 
 
+def is_compact(arg):
+    return arg == "-compact" \
+           or arg == "--compact"
+
+
+def is_cache(arg):
+    return arg == "-cache" \
+           or arg == "--cache"
+
+
+def is_breadth_first(arg):
+    return arg == "-bfs" \
+           or arg == "--bfs"
+
+
+def is_transition_keying(arg):
+    return arg == "-transitionkeys" \
+           or arg == "--transitionkeys"
+
+
+def is_no_minimisation(arg):
+    return arg == "-nominimisation" \
+           or arg == "--nominimisation"
+
+
+def is_separate_loading(arg):
+    return arg == "-separateloading" \
+           or arg == "--separateloading"
+
+
+def is_approximation(arg):
+    return arg == "-approximate" \
+           or arg == "--approximate"
+
+
+def is_pareto_front(arg):
+    return arg == "-pareto" \
+           or arg == "--pareto"
+
+
+def is_checkpoint(arg):
+    return arg == "-checkpoint" \
+           or arg == "--checkpoint"
+
+
 def is_lts(arg):
     return arg.endswith(".aut") or arg.endswith(".daut")
 
@@ -121,6 +219,14 @@ def is_time_bound(arg):
     return arg.startswith("-bound=")
 
 
+def is_nb_processes(arg):
+    return arg.startswith("-processes=")
+
+
+def is_max_nb_patches(arg):
+    return arg.startswith("-patches=")
+
+
 def arguments_validated(arguments):
     if arguments.get(Argument.WORKING_DIRECTORY) is not None:
         if not isdir(arguments.get(Argument.WORKING_DIRECTORY)):
@@ -132,7 +238,7 @@ def arguments_validated(arguments):
         arguments[Argument.LTS] = None
 
     if not (xor(arguments.get(Argument.LTS), arguments.get(Argument.LNT))
-            and arguments[Argument.MCL_PROPERTY] is not None):
+            and len(arguments[Argument.MCL_PROPERTY]) > 0):
         print_error("Either an LTS + an LNT were specified or the MCL property is missing.")
         return False
 
@@ -141,7 +247,7 @@ def arguments_validated(arguments):
     else:
         spec_is_file = isfile(arguments.get(Argument.LTS))
 
-    files_are_valid = spec_is_file and isfile(arguments.get(Argument.MCL_PROPERTY))
+    files_are_valid = spec_is_file and all(isfile(mcl_file) for mcl_file in arguments.get(Argument.MCL_PROPERTY))
 
     if not files_are_valid:
         print_error("The LNT/LTS file or the MCL file are not valid files.")
@@ -191,17 +297,14 @@ def compute_other_args(arguments):
         print_warning("{} AUT/DAUT files were found in the current directory. None of them was used.".format(
             len(aut_files)))
 
-    if len(mcl_files) == 1:
-        mcl_file = next(iter(mcl_files))
-        current_mcl_file = arguments.get(Argument.MCL_PROPERTY)
-
-        if current_mcl_file is not None:
-            print_warning("The specified MCL property will be overwritten by the one found in the given working "
+    if len(mcl_files) > 0:
+        if len(arguments.get(Argument.MCL_PROPERTY)) > 0:
+            print_warning("The specified MCL properties will be overwritten by the ones found in the given working "
                           "directory.")
 
-        arguments[Argument.MCL_PROPERTY] = working_directory + "/" + mcl_file
+        arguments[Argument.MCL_PROPERTY] = [working_directory + "/" + mcl_file for mcl_file in sorted(mcl_files)]
     else:
-        print_warning("{} MCL files were found in the current directory. None of them was used.".format(len(mcl_files)))
+        print_warning("No MCL file was found in the current directory.")
 
     if len(autx_files) == 1:
         autx_file = next(iter(autx_files))
@@ -215,5 +318,21 @@ def parse_time_bound(arg):
 
     return int(bound)
 
+def parse_nb_processes(arg):
+    nb_processes = arg[arg.index('-processes=') + len('-processes='):]
+
+    if not is_an_int(nb_processes) or int(nb_processes) < 1:
+        raise RuntimeError("Number of processes {} is not a positive integer value.".format(nb_processes))
+
+    return int(nb_processes)
+
+def parse_max_nb_patches(arg):
+    max_nb_patches = arg[arg.index('-patches=') + len('-patches='):]
+
+    if not is_an_int(max_nb_patches) or int(max_nb_patches) < 1:
+        raise RuntimeError("Number of patches {} is not a positive integer value.".format(max_nb_patches))
+
+    return int(max_nb_patches)
+
 def xor(arg1, arg2):
     return (arg1 is not None and arg2 is None) or (arg1 is None and arg2 is not None)
@@ -1,128 +1,328 @@
+import time
+from collections import deque
+from enum import Enum
+
 import utils
-from lts_parser import State, TransitionType, Transition, LtsParser, Neighbourhood
-from utils import parse_property, transition_updates_property, print_error, print_verbose
+from lts_parser import State, TransitionType, Transition, LtsParser, Neighbourhood, CompactLtsBuilder
+from property_automaton import PropertyTrie
+from scc import Condensation, compute_successor_arrays
+from transitions_loader import add_to_label_census, compute_compact_label_census
+from utils import print_error, print_verbose, run_without_recursion
+
+
+# Order in which the states of the CLTS are discovered, and thus numbered
+class ExplorationOrder(Enum):
+    DEPTH_FIRST = 0
+    BREADTH_FIRST = 1
+
+
+# Identification of the states of the CLTS:
+# - PRODUCT: a state is a pair (LTS state, advancement in the property), the CLTS being the product of the LTS
+#   and of the property automaton
+# - TRANSITION: a state is identified by the LTS transition leading to it, so that an LTS state reached by
+#   several transitions is duplicated along with its successors (former behaviour)
+class StateKeying(Enum):
+    PRODUCT = 0
+    TRANSITION = 1
 
 
 class CounterexamplesGenerator:
-    def __init__(self, lts_parser, mcl_file):
+    def __init__(self, lts_parser, property_automaton, compact=False, exploration_order=ExplorationOrder.DEPTH_FIRST,
+                 legacy_coloring=False, state_keying=StateKeying.PRODUCT, emit_label_census=False):
         self.red_transitions = []
         self.green_transitions = []
         self.black_transitions = []
         self.states = []
         self.transitions = []
         self.lts_parser = lts_parser
-        # Correspondence between a tuple (state_label, transition_label, transition_type) and a state
+        # Correspondence between a key (see StateKeying) and a state of the CLTS
         self.states_trans_correspondence = dict()
+        self.state_keying = state_keying
         self.current_state_label = 0
-        self.property = parse_property(mcl_file)
+        # Compiled property (see property_automaton.py)
+        self.property = property_automaton
+        # When compact is True, the CLTS is built as a CompactLts instead of a graph of State/Transition objects
+        self.compact = compact
+        self.compact_builder = CompactLtsBuilder() if compact else None
+        self.exploration_order = exploration_order
+        # When legacy_coloring is True, phases 2 and 3 use the former forward searches instead of the condensation
+        self.legacy_coloring = legacy_coloring
+        # Duration of each phase of the generation, in seconds
+        self.phase_durations = dict()
+        # When emit_label_census is True, the census of the labels used to compute ART, FRT and URT (see
+        # transitions_loader.py) is built during the last phase, and attached to the generated CLTS
+        self.label_census = dict() if emit_label_census else None
 
         if utils.VERBOSE:
             print_verbose("Property is: {}".format(self.property))
 
+    # Identifies the CLTS generated from a given LTS, for the cache files
+    def cache_key(self):
+        return "property={}|order={}|legacy_coloring={}|keying={}".format(
+            self.property.label_ids, self.exploration_order.name, self.legacy_coloring, self.state_keying.name)
+
     def generate(self):
         old_initial_state = get_initial_state(self.lts_parser.states)
-        new_initial_state = State(self.current_state_label)
-        self.states.append(new_initial_state)
-        self.update_state_label()
+        new_initial_state = self.add_state()
+
+        if self.state_keying == StateKeying.PRODUCT:
+            self.states_trans_correspondence[(old_initial_state.label, 0, False)] = new_initial_state
+
         # First, we generate the CLTS and color in green all the transitions that are satisfying the property
         # or successors of transitions that are satisfying the property
-        self.generate_rec(old_initial_state, new_initial_state, False, 0)
-        print("1) CLTS generated")
+        phase_start = time.time()
+        self.generate_states(old_initial_state, new_initial_state)
+
+        return self.complete_generation(new_initial_state, phase_start)
+
+    # Phases following the generation of the states and transitions of the CLTS (which started at <phase_start>)
+    def complete_generation(self, new_initial_state, phase_start):
+        if self.compact:
+            clts = self.compact_builder.build(new_initial_state)
+            new_initial_state = clts.get_state(new_initial_state)
+            states = clts.states
+            transitions = clts.transitions
+            # Only the built arrays are needed from now on
+            self.compact_builder = None
+            self.states_trans_correspondence = dict()
+        else:
+            states = self.states
+            transitions = self.transitions
+
+        self.end_phase("1) CLTS generated", phase_start)
         # Then, we color in red all the black transitions that can never reach a green transition
-        self.add_red_transitions(new_initial_state, {}, {})
-        print("2) Red transitions added")
+        phase_start = time.time()
+
+        if self.legacy_coloring:
+            condensation = None
+        elif self.compact:
+            # Reachability questions of the next phases are answered on the condensation of the CLTS
+            condensation = Condensation(clts.nb_states, clts.out_offsets, clts.targets)
+        else:
+            condensation = Condensation(len(states), *compute_successor_arrays(
+                len(states), ((transition.inc_state.label, transition.out_state.label) for transition in transitions)))
+
+        if self.legacy_coloring:
+            self.add_red_transitions_by_forward_search(new_initial_state, {}, {})
+        else:
+            self.add_red_transitions(condensation, transitions)
+
+        self.end_phase("2) Red transitions added", phase_start)
         # Finally, we color in green all the black transitions that can only reach green transitions
-        self.finalize_green_part(new_initial_state, {}, {})
-        print("3) Green part finalized")
+        phase_start = time.time()
+
+        if self.legacy_coloring:
+            self.finalize_green_part_by_forward_search(new_initial_state, {}, {})
+        else:
+            self.finalize_green_part(condensation, transitions)
+
+        self.end_phase("3) Green part finalized", phase_start)
         # One last traversal to compute neighbourhoods
+        phase_start = time.time()
         compute_neighbourhoods(new_initial_state, {})
-        print("4) Neighbourhoods computed")
+        self.end_phase("4) Neighbourhoods computed", phase_start)
+
+        if self.compact:
+            # Colors are read directly from the arrays of the compact CLTS
+            if self.label_census is not None:
+                phase_start = time.time()
+                clts.label_census = compute_compact_label_census(clts)
+                self.end_phase("5) Label census computed", phase_start)
+
+            return clts
+
         # Characterization of the transitions
+        phase_start = time.time()
         self.characterize_transitions()
-        print("5) Transitions characterized")
-
-        return LtsParser(self.red_transitions, self.green_transitions, self.black_transitions, new_initial_state.label,
+        self.end_phase("5) Transitions characterized", phase_start)
+        clts = LtsParser(self.red_transitions, self.green_transitions, self.black_transitions, new_initial_state.label,
                          len(self.transitions), len(self.states), self.states, self.transitions)
+        clts.label_census = self.label_census
 
-    def generate_rec(self, old_state, new_state, property_validated, advancement):
-        for transition in old_state.out_transitions:
-            old_out_state = transition.out_state
-            current_advancement = advancement + 1 \
-                if transition_updates_property(self.property, transition, advancement) \
-                else advancement
-            property_locally_validated = property_validated or (current_advancement == len(self.property))
-            pursue_recursion = True
-
-            if property_locally_validated:
-                transition_type = TransitionType.CORRECT
-            else:
-                transition_type = TransitionType.NEUTRAL
+        return clts
 
-            key = (old_state, transition.label, transition_type, current_advancement)
-            existing_out_state = self.states_trans_correspondence.get(key)
+    def end_phase(self, phase, phase_start):
+        self.phase_durations[phase] = time.time() - phase_start
+        print("{} ({:.3f}s)".format(phase, self.phase_durations[phase]))
 
-            if existing_out_state is not None:
-                new_out_state = existing_out_state
-                pursue_recursion = False
-            else:
-                new_out_state = State(self.current_state_label)
-                self.update_state_label()
-                self.states_trans_correspondence[key] = new_out_state
-                self.states.append(new_out_state)
+    # Depth-first generation uses a stack of (old_state, new_state, property_validated, advancement, iterator on the
+    # outgoing transitions of old_state remaining to process), so that states are created in the same order as
+    # a recursive traversal. Breadth-first generation uses a queue of (old_state, new_state, property_validated,
+    # advancement) whose outgoing transitions are all processed at once.
+    def generate_states(self, old_initial_state, new_initial_state):
+        if self.exploration_order == ExplorationOrder.BREADTH_FIRST:
+            queue = deque([(old_initial_state, new_initial_state, False, 0)])
 
-            new_transition = Transition(new_state, new_out_state, transition.label, transition_type)
-            new_state.add_out_transition(new_transition)
-            new_out_state.add_inc_transition(new_transition)
-            self.transitions.append(new_transition)
+            while queue:
+                old_state, new_state, property_validated, advancement = queue.popleft()
 
-            if pursue_recursion:
-                self.generate_rec(old_out_state, new_out_state, property_locally_validated, current_advancement)
+                for transition in old_state.out_transitions:
+                    new_out_state, pursue_exploration, property_locally_validated, current_advancement = \
+                        self.generate_transition(old_state, new_state, transition, property_validated, advancement)
 
-    def add_red_transitions(self, state, visited_states, computed_transitions):
-        if state.label in visited_states:
-            return
+                    if pursue_exploration:
+                        queue.append((transition.out_state, new_out_state, property_locally_validated,
+                                      current_advancement))
+        else:
+            stack = [(old_initial_state, new_initial_state, False, 0, iter(old_initial_state.out_transitions))]
 
-        visited_states[state.label] = True
+            while stack:
+                old_state, new_state, property_validated, advancement, transitions = stack[-1]
 
-        for transition in state.out_transitions:
-            if transition.transition_type == TransitionType.NEUTRAL:
-                key = (transition.inc_state.label, transition.label, transition.out_state.label)
-                value = computed_transitions.get(key)
+                for transition in transitions:
+                    new_out_state, pursue_exploration, property_locally_validated, current_advancement = \
+                        self.generate_transition(old_state, new_state, transition, property_validated, advancement)
 
-                if value is None:
-                    current_transition_can_reach_green = self.transition_can_reach_green(transition, {},
-                                                                                         computed_transitions)
-                    computed_transitions[key] = current_transition_can_reach_green
+                    if pursue_exploration:
+                        old_out_state = transition.out_state
+                        stack.append((old_out_state, new_out_state, property_locally_validated, current_advancement,
+                                      iter(old_out_state.out_transitions)))
+                        break
                 else:
-                    current_transition_can_reach_green = value
+                    stack.pop()
 
-                if current_transition_can_reach_green:
-                    self.add_red_transitions(transition.out_state, visited_states, computed_transitions)
-                else:
-                    self.color_transition_and_successors_in_red(transition)
+    # Add to the CLTS the copy of <transition> going out of <new_state>, and return its target along with
+    # whether this target was just created and must thus be explored
+    def generate_transition(self, old_state, new_state, transition, property_validated, advancement):
+        current_advancement = self.property.next_advancement(advancement, transition.label_id)
+        property_locally_validated = property_validated or self.property.is_accepting(current_advancement)
+        pursue_exploration = True
 
-    def finalize_green_part(self, state, visited_states, computed_transitions):
+        if property_locally_validated:
+            transition_type = TransitionType.CORRECT
+        else:
+            transition_type = TransitionType.NEUTRAL
+
+        if self.state_keying == StateKeying.PRODUCT:
+            key = (transition.out_state.label, current_advancement, property_locally_validated)
+        else:
+            key = (old_state.label, transition.label_id, transition_type, current_advancement)
+
+        existing_out_state = self.states_trans_correspondence.get(key)
+
+        if existing_out_state is not None:
+            new_out_state = existing_out_state
+            pursue_exploration = False
+        else:
+            new_out_state = self.add_state()
+            self.states_trans_correspondence[key] = new_out_state
+
+        self.add_transition(new_state, new_out_state, transition.label_id, transition_type)
+
+        return new_out_state, pursue_exploration, property_locally_validated, current_advancement
+
+    # Add to the CLTS the product transition going from (<old_inc_label>, <advancement>) to (<old_out_label>,
+    # <current_advancement>). Used when the product is explored for several properties at once (see
+    # BatchCounterexamplesGenerator), each product state of the property being then visited once.
+    def add_product_transition(self, old_inc_label, old_out_label, label_id, advancement, current_advancement):
+        new_state = self.states_trans_correspondence[(old_inc_label, advancement,
+                                                      self.property.is_accepting(advancement))]
+        property_validated = self.property.is_accepting(current_advancement)
+        key = (old_out_label, current_advancement, property_validated)
+        new_out_state = self.states_trans_correspondence.get(key)
+
+        if new_out_state is None:
+            new_out_state = self.add_state()
+            self.states_trans_correspondence[key] = new_out_state
+
+        self.add_transition(new_state, new_out_state, label_id,
+                            TransitionType.CORRECT if property_validated else TransitionType.NEUTRAL)
+
+    # A black transition can reach a green transition if and only if its target can, which is the case when the
+    # component of its target can reach a component containing the source of a green transition.
+    # Successors of a transition that cannot reach a green transition cannot reach one either: they are all
+    # colored by this loop, as color_transition_and_successors_in_red() does.
+    def add_red_transitions(self, condensation, transitions):
+        component_can_reach_green = condensation.can_reach(
+            transition.inc_state.label for transition in transitions
+            if transition.transition_type == TransitionType.CORRECT)
+
+        for transition in transitions:
+            if transition.transition_type == TransitionType.NEUTRAL \
+                    and not component_can_reach_green[condensation.component(transition.out_state.label)]:
+                transition.transition_type = TransitionType.INCORRECT
+
+    # A black transition can only reach green or black transitions if its target cannot reach a red transition.
+    # Coloring such transitions in green does not change which states can reach a red transition, so the answers
+    # do not depend on the order in which transitions are processed.
+    def finalize_green_part(self, condensation, transitions):
+        component_can_reach_red = condensation.can_reach(
+            transition.inc_state.label for transition in transitions
+            if transition.transition_type == TransitionType.INCORRECT)
+
+        for transition in transitions:
+            if transition.transition_type == TransitionType.NEUTRAL \
+                    and not component_can_reach_red[condensation.component(transition.out_state.label)]:
+                transition.transition_type = TransitionType.CORRECT
+
+    # Former implementation of the second phase, kept as a reference: the reachability of a green transition is
+    # searched forward from each black transition, and revisited transitions of a cycle are guessed to be unable
+    # to reach one. The traversal uses a stack of iterators on the outgoing transitions of the states being visited.
+    def add_red_transitions_by_forward_search(self, state, visited_states, computed_transitions):
         if state.label in visited_states:
             return
 
         visited_states[state.label] = True
+        stack = [iter(state.out_transitions)]
+
+        while stack:
+            for transition in stack[-1]:
+                if transition.transition_type == TransitionType.NEUTRAL:
+                    key = (transition.inc_state.label, transition.label_id, transition.out_state.label)
+                    value = computed_transitions.get(key)
+
+                    if value is None:
+                        current_transition_can_reach_green = run_without_recursion(
+                            self.transition_can_reach_green(transition, {}, computed_transitions))
+                        computed_transitions[key] = current_transition_can_reach_green
+                    else:
+                        current_transition_can_reach_green = value
+
+                    if current_transition_can_reach_green:
+                        out_state = transition.out_state
+
+                        if out_state.label not in visited_states:
+                            visited_states[out_state.label] = True
+                            stack.append(iter(out_state.out_transitions))
+                            break
+                    else:
+                        self.color_transition_and_successors_in_red(transition)
+            else:
+                stack.pop()
 
-        for transition in state.out_transitions:
-            if transition.transition_type == TransitionType.NEUTRAL:
-                key = (transition.inc_state.label, transition.label, transition.out_state.label)
-                value = computed_transitions.get(key)
-
-                if value is None:
-                    current_transition_can_reach_green_or_black_only = self.transition_can_reach_green_or_black_only(
-                        transition, {}, computed_transitions)
-                    computed_transitions[key] = current_transition_can_reach_green_or_black_only
-                else:
-                    current_transition_can_reach_green_or_black_only = value
-
-                if current_transition_can_reach_green_or_black_only:
-                    transition.transition_type = TransitionType.CORRECT
+    # Former implementation of the third phase, kept as a reference, which suffers from the same guesses.
+    # The traversal uses a stack of iterators on the outgoing transitions of the states being visited.
+    def finalize_green_part_by_forward_search(self, state, visited_states, computed_transitions):
+        if state.label in visited_states:
+            return
 
-            self.finalize_green_part(transition.out_state, visited_states, computed_transitions)
+        visited_states[state.label] = True
+        stack = [iter(state.out_transitions)]
+
+        while stack:
+            for transition in stack[-1]:
+                if transition.transition_type == TransitionType.NEUTRAL:
+                    key = (transition.inc_state.label, transition.label_id, transition.out_state.label)
+                    value = computed_transitions.get(key)
+
+                    if value is None:
+                        current_transition_can_reach_green_or_black_only = run_without_recursion(
+                            self.transition_can_reach_green_or_black_only(transition, {}, computed_transitions))
+                        computed_transitions[key] = current_transition_can_reach_green_or_black_only
+                    else:
+                        current_transition_can_reach_green_or_black_only = value
+
+                    if current_transition_can_reach_green_or_black_only:
+                        transition.transition_type = TransitionType.CORRECT
+
+                out_state = transition.out_state
+
+                if out_state.label not in visited_states:
+                    visited_states[out_state.label] = True
+                    stack.append(iter(out_state.out_transitions))
+                    break
+            else:
+                stack.pop()
 
     def characterize_transitions(self):
         for transition in self.transitions:
@@ -133,14 +333,38 @@ class CounterexamplesGenerator:
             else:
                 self.red_transitions.append(transition)
 
+            if self.label_census is not None:
+                add_to_label_census(self.label_census, transition)
+
     def update_state_label(self):
         self.current_state_label += 1
 
+    def add_state(self):
+        if self.compact:
+            return self.compact_builder.add_state()
+
+        new_state = State(self.current_state_label)
+        self.update_state_label()
+        self.states.append(new_state)
+
+        return new_state
+
+    def add_transition(self, inc_state, out_state, label_id, transition_type):
+        if self.compact:
+            self.compact_builder.add_transition(inc_state, label_id, out_state, transition_type)
+            return
+
+        new_transition = Transition(inc_state, out_state, label_id, transition_type)
+        inc_state.add_out_transition(new_transition)
+        out_state.add_inc_transition(new_transition)
+        self.transitions.append(new_transition)
+
+    # Written as a generator to be run by utils.run_without_recursion(): each recursive call is yielded
     def transition_can_reach_green(self, transition, visited_transitions, computed_transitions):
-        key = (transition.inc_state.label, transition.label, transition.out_state.label)
+        key = (transition.inc_state.label, transition.label_id, transition.out_state.label)
 
         if key in visited_transitions:
-            return transition == TransitionType.CORRECT
+            return transition.transition_type == TransitionType.CORRECT
 
         visited_transitions[key] = True
 
@@ -154,7 +378,7 @@ class CounterexamplesGenerator:
             return True
 
         for out_transition in transition.out_state.out_transitions:
-            next_key = (out_transition.inc_state.label, out_transition.label, out_transition.out_state.label)
+            next_key = (out_transition.inc_state.label, out_transition.label_id, out_transition.out_state.label)
             next_value = computed_transitions.get(next_key)
 
             if next_value is not None and next_value:
@@ -164,8 +388,9 @@ class CounterexamplesGenerator:
                 computed_transitions[next_key] = True
                 return True
 
-            next_transition_can_reach_green = self.transition_can_reach_green(out_transition, visited_transitions,
-                                                                              computed_transitions)
+            next_transition_can_reach_green = yield self.transition_can_reach_green(out_transition,
+                                                                                    visited_transitions,
+                                                                                    computed_transitions)
             computed_transitions[next_key] = next_transition_can_reach_green
 
             if next_transition_can_reach_green:
@@ -174,8 +399,9 @@ class CounterexamplesGenerator:
         computed_transitions[key] = False
         return False
 
+    # Written as a generator to be run by utils.run_without_recursion(): each recursive call is yielded
     def transition_can_reach_green_or_black_only(self, transition, visited_transitions, computed_transitions):
-        key = (transition.inc_state.label, transition.label, transition.out_state.label)
+        key = (transition.inc_state.label, transition.label_id, transition.out_state.label)
 
         if key in visited_transitions:
             return transition.transition_type != TransitionType.INCORRECT
@@ -192,7 +418,7 @@ class CounterexamplesGenerator:
             return False
 
         for out_transition in transition.out_state.out_transitions:
-            next_key = (out_transition.inc_state.label, out_transition.label, out_transition.out_state.label)
+            next_key = (out_transition.inc_state.label, out_transition.label_id, out_transition.out_state.label)
             next_value = computed_transitions.get(next_key)
 
             if next_value is not None and not next_value:
@@ -202,7 +428,7 @@ class CounterexamplesGenerator:
                 computed_transitions[next_key] = False
                 return False
 
-            next_transition_can_reach_only_black_or_green = self.transition_can_reach_green_or_black_only(
+            next_transition_can_reach_only_black_or_green = yield self.transition_can_reach_green_or_black_only(
                 out_transition, visited_transitions, computed_transitions)
 
             computed_transitions[next_key] = next_transition_can_reach_only_black_or_green
@@ -214,37 +440,119 @@ class CounterexamplesGenerator:
         return True
 
     def color_transition_and_successors_in_red(self, transition):
-        self.color_transition_and_successors_in_red_rec(transition, {})
+        visited_transitions = {}
+        stack = [transition]
 
-    def color_transition_and_successors_in_red_rec(self, transition, visited_transition):
-        key = (transition.inc_state.label, transition.label, transition.out_state.label)
+        while stack:
+            current_transition = stack.pop()
+            key = (current_transition.inc_state.label, current_transition.label_id, current_transition.out_state.label)
 
-        if key in visited_transition:
-            return
+            if key in visited_transitions:
+                continue
 
-        visited_transition[key] = True
-        transition.transition_type = TransitionType.INCORRECT
+            visited_transitions[key] = True
+            current_transition.transition_type = TransitionType.INCORRECT
+            stack.extend(current_transition.out_state.out_transitions)
 
-        for out_transition in transition.out_state.out_transitions:
-            self.color_transition_and_successors_in_red_rec(out_transition, visited_transition)
+
+# Generates the CLTS of an LTS for several properties with a single exploration of the LTS: the explored states are
+# the pairs (LTS state, node of the PropertyTrie of the properties), and each transition of this joint product is
+# projected on the product of the LTS with each property reaching it. The CLTS of each property is then the one
+# produced by a CounterexamplesGenerator using product states, up to the numbering of its states.
+class BatchCounterexamplesGenerator:
+    def __init__(self, lts_parser, property_automata, compact=False, exploration_order=ExplorationOrder.DEPTH_FIRST,
+                 emit_label_census=False):
+        self.lts_parser = lts_parser
+        self.exploration_order = exploration_order
+        self.property_trie = PropertyTrie(property_automata)
+        self.generators = [CounterexamplesGenerator(lts_parser, property_automaton, compact, exploration_order,
+                                                    emit_label_census=emit_label_census)
+                           for property_automaton in property_automata]
+
+    def generate(self):
+        old_initial_state = get_initial_state(self.lts_parser.states)
+        new_initial_states = []
+
+        for generator in self.generators:
+            new_initial_state = generator.add_state()
+            generator.states_trans_correspondence[(old_initial_state.label, 0, False)] = new_initial_state
+            new_initial_states.append(new_initial_state)
+
+        phase_start = time.time()
+        self.explore_joint_product(old_initial_state)
+        print("Joint product of the LTS and of the {} properties explored ({} property prefixes, {} product states)"
+              .format(len(self.generators), len(self.property_trie), self.nb_product_states))
+
+        return [generator.complete_generation(new_initial_state, phase_start)
+                for generator, new_initial_state in zip(self.generators, new_initial_states)]
+
+    # A product state (LTS state, trie node) may be reached by different sets of properties along different paths.
+    # The properties reaching it for the first time are propagated from it, so that each product state of each
+    # property is explored once, while the properties sharing a product state share the iteration over its
+    # transitions.
+    def explore_joint_product(self, old_initial_state):
+        property_trie = self.property_trie
+        depths = property_trie.depths
+        generators = self.generators
+        initial_properties = property_trie.masks[0]
+        reached_properties = {(old_initial_state.label, 0): initial_properties}
+        indexes = {}
+        worklist = deque([(old_initial_state, 0, initial_properties)])
+        next_state = worklist.popleft if self.exploration_order == ExplorationOrder.BREADTH_FIRST else worklist.pop
+
+        while worklist:
+            old_state, node, properties = next_state()
+            advancement = depths[node]
+
+            for transition in old_state.out_transitions:
+                label_id = transition.label_id
+                old_out_state = transition.out_state
+
+                for next_node, next_node_properties in property_trie.successors(node, label_id):
+                    moving_properties = properties & next_node_properties
+
+                    if not moving_properties:
+                        continue
+
+                    property_indexes = indexes.get(moving_properties)
+
+                    if property_indexes is None:
+                        property_indexes = [index for index in range(len(generators)) if moving_properties >> index & 1]
+                        indexes[moving_properties] = property_indexes
+
+                    current_advancement = depths[next_node]
+
+                    for index in property_indexes:
+                        generators[index].add_product_transition(old_state.label, old_out_state.label, label_id,
+                                                                 advancement, current_advancement)
+
+                    key = (old_out_state.label, next_node)
+                    already_reached_properties = reached_properties.get(key, 0)
+                    new_properties = moving_properties & ~already_reached_properties
+
+                    if new_properties:
+                        reached_properties[key] = already_reached_properties | new_properties
+                        worklist.append((old_out_state, next_node, new_properties))
+
+        self.nb_product_states = len(reached_properties)
 
 
 def get_initial_state(states):
     for state in states:
-        if state.inc_transitions == set():
+        if len(state.inc_transitions) == 0:
             return state
 
     print_error("No initial state found in the states list.")
     raise Exception()
 
 
-def state_is_a_neighbourhood(state):
-    return state_has_at_least_one_neutral_incoming_transition(state) \
+def state_is_a_neighbourhood(state, is_initial_state=False):
+    return (is_initial_state or state_has_at_least_one_neutral_incoming_transition(state)) \
            and state_has_at_least_one_non_neutral_outgoing_transition(state)
 
 
 def state_has_at_least_one_neutral_incoming_transition(state):
-    if state.inc_transitions == set():
+    if len(state.inc_transitions) == 0:
         return True  # Initial state case
 
     for inc_transition in state.inc_transitions:
@@ -292,14 +600,20 @@ def compute_neighbourhood_type(state):
 
 
 def compute_neighbourhoods(state, visited_states):
-    if state.label in visited_states:
-        return
+    stack = [state]
 
-    visited_states[state.label] = True
+    while stack:
+        current_state = stack.pop()
 
-    if state_is_a_neighbourhood(state):
-        state.mark_as_neighbourhood()
-        state.set_neighbourhood_color(compute_neighbourhood_type(state))
+        if current_state.label in visited_states:
+            continue
 
-    for out_transition in state.out_transitions:
-        compute_neighbourhoods(out_transition.out_state, visited_states)
+        visited_states[current_state.label] = True
+
+        # With product states, the initial state may have incoming transitions
+        if state_is_a_neighbourhood(current_state, current_state.label == state.label):
+            current_state.mark_as_neighbourhood()
+            current_state.set_neighbourhood_color(compute_neighbourhood_type(current_state))
+
+        for out_transition in current_state.out_transitions:
+            stack.append(out_transition.out_state)
@@ -0,0 +1,204 @@
+import itertools
+
+from set_cover import compute_covering_candidates, popcount
+
+# Reduction of the instances given to the searches of set_cover.py, before searching their optimal covers (the covers of
+# least size, or reaching the fewest green labels and then of least size). A candidate is given by its red mask
+# (the labels of the universe it covers) and its green mask (the green labels it reaches, 0 if they do not matter).
+# - Candidates having the same red and green masks are equivalent: only the first of each class is kept.
+# - A candidate is dominated by another one covering all its labels while reaching none of the green labels it does
+#   not reach: replacing it by the other one in a cover gives a cover at least as good. Only the undominated
+#   candidates are kept, each removed candidate being assigned to one of the kept candidates dominating it.
+# - A label is implied by another one if all the candidates covering the other one cover it: it is then removed from
+#   the universe, as covering the other one suffices to cover it.
+# Removing candidates may imply new labels and removing labels may make new candidates dominated, so that both
+# reductions are repeated until none of them applies.
+# Replacing each candidate of an optimal cover of the original instance by the kept candidate it is assigned to gives
+# an optimal cover of the reduced instance. Conversely, the optimal covers of the original instance are obtained by
+# expanding the optimal covers of the reduced instance: each kept candidate is replaced by any candidate assigned to it,
+# and the combinations that are still optimal covers are kept. The candidates assigned to a kept candidate are grouped
+# into classes of candidates having the same masks in the original instance, which are interchangeable: only the
+# combinations of classes are checked, and each valid combination of classes gives the product of their sizes covers.
+
+
+class CoverReduction:
+    def __init__(self, masks, green_masks, universe):
+        self.original_masks = masks
+        self.original_green_masks = green_masks
+        self.original_universe = universe
+        # assigned[candidate] is the kept candidate replacing the candidate (itself if it is kept)
+        self.assigned = list(range(len(masks)))
+        self.universe = universe
+        self.nb_equivalent_candidates = 0
+        self.nb_dominated_candidates = 0
+        self.nb_implied_labels = 0
+        # Indexes of the kept candidates in the original instance, and their masks restricted to the reduced universe
+        self.kept = None
+        self.masks = None
+        self.green_masks = None
+        # Candidates assigned to each kept candidate, as a list of classes of equivalent candidates in the original
+        # instance, ordered by their first candidate
+        self.assigned_classes = None
+
+    def reduce(self):
+        kept = self.merge_equivalent_candidates(list(range(len(self.original_masks))))
+        changed = True
+
+        while changed:
+            nb_kept = len(kept)
+            universe = self.universe
+            kept = self.remove_dominated_candidates(kept)
+            self.remove_implied_labels(kept)
+            changed = len(kept) != nb_kept or self.universe != universe
+
+        self.kept = kept
+        self.masks = [self.original_masks[candidate] & self.universe for candidate in kept]
+        self.green_masks = [self.original_green_masks[candidate] for candidate in kept]
+        self.assigned_classes = {}
+        classes = {}
+
+        for candidate, kept_candidate in enumerate(self.assigned):
+            signature = (kept_candidate, self.original_masks[candidate] & self.original_universe,
+                         self.original_green_masks[candidate])
+
+            if signature not in classes:
+                classes[signature] = []
+                self.assigned_classes.setdefault(kept_candidate, []).append(classes[signature])
+
+            classes[signature].append(candidate)
+
+    def merge_equivalent_candidates(self, candidates):
+        representatives = {}
+        kept = []
+
+        for candidate in candidates:
+            signature = (self.original_masks[candidate] & self.universe, self.original_green_masks[candidate])
+            representative = representatives.get(signature)
+
+            if representative is None:
+                representatives[signature] = candidate
+                kept.append(candidate)
+            else:
+                self.assign(candidate, representative)
+                self.nb_equivalent_candidates += 1
+
+        return kept
+
+    # A candidate can only be dominated by candidates covering more labels, or as many labels but reaching fewer
+    # green labels: candidates are examined in this order, so that the kept candidates dominating a candidate are
+    # examined before it. If a removed candidate dominates it, the kept candidate dominating the removed one does too.
+    def remove_dominated_candidates(self, candidates):
+        masks = self.original_masks
+        green_masks = self.original_green_masks
+        universe = self.universe
+        kept = []
+        # Candidates which became equivalent after the removal of labels are dominated by the first of them
+        ordered_candidates = sorted(candidates, key=lambda candidate: (-popcount(masks[candidate] & universe),
+                                                                       popcount(green_masks[candidate]), candidate))
+
+        for candidate in ordered_candidates:
+            mask = masks[candidate] & universe
+            green_mask = green_masks[candidate]
+            dominating_candidate = next((other for other in kept
+                                         if mask & ~masks[other] == 0 and green_masks[other] & ~green_mask == 0),
+                                        None)
+
+            if dominating_candidate is None:
+                kept.append(candidate)
+            else:
+                self.assign(candidate, dominating_candidate)
+                self.nb_dominated_candidates += 1
+
+        # The kept candidates stay in their original order
+        return sorted(kept)
+
+    # Labels covered by the same candidates are implied by the first of them
+    def remove_implied_labels(self, candidates):
+        covering = compute_covering_candidates([self.original_masks[candidate] for candidate in candidates],
+                                               self.universe)
+        kept_coverings = []
+
+        for label in sorted(covering, key=lambda label: (popcount(covering[label]), label)):
+            if any(kept_covering & ~covering[label] == 0 for kept_covering in kept_coverings):
+                self.universe &= ~(1 << label)
+                self.nb_implied_labels += 1
+            else:
+                kept_coverings.append(covering[label])
+
+    def assign(self, candidate, kept_candidate):
+        for other in range(len(self.assigned)):
+            if self.assigned[other] == candidate:
+                self.assigned[other] = kept_candidate
+
+    def original_instance(self):
+        return self.original_masks, self.original_green_masks, self.original_universe
+
+    # Return the optimal covers of the original instance, given the optimal covers of the reduced instance, as sorted
+    # tuples of original candidate indexes
+    def expand(self, covers):
+        return [expanded_cover for cover in covers for expanded_cover in self.expand_cover(cover)]
+
+    # Yield the optimal covers of the original instance obtained from an optimal cover of the reduced instance
+    def expand_cover(self, cover):
+        for classes in self.expand_cover_classes(cover):
+            for combination in itertools.product(*classes):
+                yield tuple(sorted(combination))
+
+    # Yield the combinations of classes of candidates (one class assigned to each candidate of an optimal cover of the
+    # reduced instance) whose combinations of candidates are optimal covers of the original instance, so that these
+    # covers can be counted without being enumerated
+    def expand_cover_classes(self, cover):
+        green = 0
+
+        for candidate in cover:
+            green |= self.green_masks[candidate]
+
+        # Equivalent candidates always give optimal covers, but dominated ones may cover fewer labels or reach more
+        # green labels
+        for classes in itertools.product(*(self.assigned_classes[self.kept[candidate]] for candidate in cover)):
+            covered = 0
+            combination_green = 0
+
+            for candidates in classes:
+                covered |= self.original_masks[candidates[0]]
+                combination_green |= self.original_green_masks[candidates[0]]
+
+            if covered & self.original_universe == self.original_universe \
+                    and popcount(combination_green) == popcount(green):
+                yield classes
+
+
+# Split the candidates covering labels of the universe into connected components: two candidates are in the same
+# component if they cover a common label, or reach a common green label (through other candidates). The optimal covers
+# of the instance are the combinations of optimal covers of its components, as the green labels reached by distinct
+# components are disjoint. Candidates covering no label are never in an optimal cover, and are not in any component.
+# Return the lists of candidates of the components, each with the labels they cover.
+def split_into_components(masks, green_masks, universe):
+    components = []
+
+    for candidate, (mask, green_mask) in enumerate(zip(masks, green_masks)):
+        mask &= universe
+
+        if mask == 0:
+            continue
+
+        candidates = [candidate]
+        labels = mask
+        green_labels = green_mask
+        disjoint_components = []
+
+        for component in components:
+            component_candidates, component_labels, component_green_labels = component
+
+            if component_labels & mask or component_green_labels & green_mask:
+                candidates.extend(component_candidates)
+                labels |= component_labels
+                green_labels |= component_green_labels
+            else:
+                disjoint_components.append(component)
+
+        disjoint_components.append((candidates, labels, green_labels))
+        components = disjoint_components
+
+    # Components are ordered by their first candidate
+    return sorted((sorted(candidates), labels) for candidates, labels, _ in components)
@@ -0,0 +1,39 @@
+# Symbol table giving a small integer identifier to each label.
+# Labels are case-insensitive (as in CADP): they are looked up by their upper case spelling, normalised once when
+# interned, but printed as first written.
+# Every module compares label identifiers instead of strings.
+
+
+class LabelTable:
+    def __init__(self):
+        self.names = []
+        self.ids = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def intern(self, label):
+        label_id = self.ids.get(label)
+
+        if label_id is None:
+            normalised_label = label.upper()
+            label_id = self.ids.get(normalised_label)
+
+            if label_id is None:
+                label_id = len(self.names)
+                self.names.append(label)
+                self.ids[normalised_label] = label_id
+
+            # The raw spelling is also registered to avoid normalising it again
+            self.ids[label] = label_id
+
+        return label_id
+
+    def lookup(self, label):
+        return self.ids.get(label.upper())
+
+    def name(self, label_id):
+        return self.names[label_id]
+
+
+LABELS = LabelTable()
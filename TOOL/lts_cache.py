@@ -0,0 +1,184 @@
+import hashlib
+import mmap
+import os
+import struct
+import zlib
+from array import array
+
+import utils
+from label_table import LABELS
+from lts_parser import CompactLts
+from utils import print_warning
+
+# Binary sidecar files storing a CompactLts, so that an unchanged model does not have to be parsed or
+# generated again. The file is memory-mapped and its sections are directly used as the arrays of the
+# CompactLts: no Python object is created per state or per transition when loading it.
+#
+# Layout (little endian, every section being aligned on 8 bytes):
+# - Header: magic, version, kind (LTS or CLTS), initial state, number of states, number of transitions,
+#   number of labels, and a digest of the inputs the file was computed from
+# - Section table: offset, size and CRC32 checksum of each section
+# - Sections:
+#     - LABEL_OFFSETS: nb_labels + 1 int32, label i being LABEL_DATA[LABEL_OFFSETS[i]:LABEL_OFFSETS[i + 1]]
+#     - LABEL_DATA: UTF-8 encoded labels, the label identifiers of the file being their indexes in this table
+#     - TRANSITIONS: one fixed-width record of 4 int32 per transition (source, label id, target, flags), the
+#       flags being the transition color (byte 0) and the neighbourhood flag and color of its source (bytes 1
+#       and 2), as on a .autx line
+#     - OUT_OFFSETS: nb_states + 1 int32 (transitions are sorted by source)
+#     - IN_OFFSETS: nb_states + 1 int32
+#     - IN_TRANSITIONS: nb_transitions int32
+#     - STATES: one record of 2 bytes per state (neighbourhood flag, neighbourhood color)
+
+MAGIC = b"EPPLTS\0\0"
+VERSION = 3
+LTS_KIND = 0
+CLTS_KIND = 1
+HEADER = struct.Struct("<8sIIqqqq32s")
+SECTION = struct.Struct("<qqII")
+LABEL_OFFSETS, LABEL_DATA, TRANSITIONS, OUT_OFFSETS, IN_OFFSETS, IN_TRANSITIONS, STATES = range(7)
+NB_SECTIONS = 7
+TRANSITION_RECORD_SIZE = 16
+STATE_RECORD_SIZE = 2
+LTS_CACHE_EXTENSION = ".ltsc"
+CLTS_CACHE_EXTENSION = ".cltsc"
+
+
+def lts_cache_filename(lts_file):
+    return lts_file + LTS_CACHE_EXTENSION
+
+
+def clts_cache_filename(lts_file):
+    return lts_file + CLTS_CACHE_EXTENSION
+
+
+# The digest identifies the content the cache was computed from: the LTS file (through its size and
+# modification time) and, for a CLTS, the content of the property and the generation options.
+def compute_digest(lts_file, *dependencies):
+    stat = os.stat(lts_file)
+    digest = hashlib.sha256("{}|{}|{}".format(os.path.abspath(lts_file), stat.st_size, stat.st_mtime_ns)
+                            .encode())
+
+    for dependency in dependencies:
+        digest.update(b"|" + str(dependency).encode())
+
+    return digest.digest()
+
+
+def save_compact_lts(lts, filename, kind, digest):
+    encoded_labels = [label.encode() for label in LABELS.names]
+    label_offsets = array("i", [0]) * (len(encoded_labels) + 1)
+
+    for index, encoded_label in enumerate(encoded_labels):
+        label_offsets[index + 1] = label_offsets[index] + len(encoded_label)
+
+    nb_transitions = lts.nb_transitions
+    transitions = bytearray(TRANSITION_RECORD_SIZE * nb_transitions)
+    records = memoryview(transitions).cast("i")
+    records[0::4] = array("i", lts.sources)
+    records[1::4] = array("i", lts.label_ids)
+    records[2::4] = array("i", lts.targets)
+    transitions[12::TRANSITION_RECORD_SIZE] = bytes(lts.colors)
+    transitions[13::TRANSITION_RECORD_SIZE] = bytes(lts.neighbourhoods[source] for source in lts.sources)
+    transitions[14::TRANSITION_RECORD_SIZE] = bytes(lts.neighbourhood_colors[source] for source in lts.sources)
+    records.release()
+
+    states = bytearray(STATE_RECORD_SIZE * lts.nb_states)
+    states[0::STATE_RECORD_SIZE] = bytes(lts.neighbourhoods)
+    states[1::STATE_RECORD_SIZE] = bytes(lts.neighbourhood_colors)
+
+    sections = [None] * NB_SECTIONS
+    sections[LABEL_OFFSETS] = label_offsets.tobytes()
+    sections[LABEL_DATA] = b"".join(encoded_labels)
+    sections[TRANSITIONS] = transitions
+    sections[OUT_OFFSETS] = array("i", lts.out_offsets).tobytes()
+    sections[IN_OFFSETS] = array("i", lts.in_offsets).tobytes()
+    sections[IN_TRANSITIONS] = array("i", lts.in_transitions).tobytes()
+    sections[STATES] = states
+
+    offset = align(HEADER.size + SECTION.size * NB_SECTIONS)
+    section_table = []
+
+    for section in sections:
+        section_table.append(SECTION.pack(offset, len(section), zlib.crc32(section), 0))
+        offset = align(offset + len(section))
+
+    # The file is written under a temporary name, so that an interrupted run never leaves a truncated cache
+    temporary_filename = filename + ".tmp"
+
+    with open(temporary_filename, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, kind, lts.initial_state, lts.nb_states, nb_transitions,
+                               len(encoded_labels), digest))
+        file.write(b"".join(section_table))
+
+        for section in sections:
+            file.write(bytes(align(file.tell()) - file.tell()))
+            file.write(section)
+
+    os.replace(temporary_filename, filename)
+
+
+# Return the CompactLts stored in the given file, or None if the file does not exist or does not correspond
+# to the given kind and digest.
+def load_compact_lts(filename, kind, digest):
+    if not os.path.exists(filename):
+        return None
+
+    if os.path.getsize(filename) < HEADER.size + SECTION.size * NB_SECTIONS:
+        print_warning("Cache file |{}| is truncated. It has been ignored.".format(filename))
+        return None
+
+    with open(filename, "rb") as file:
+        # Copy-on-write mapping: the colors of the transitions can be modified without altering the file
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    magic, version, file_kind, initial_state, nb_states, nb_transitions, nb_labels, file_digest = \
+        HEADER.unpack_from(buffer, 0)
+
+    if magic != MAGIC or version != VERSION or file_kind != kind:
+        print_warning("Cache file |{}| has an unsupported format. It has been ignored.".format(filename))
+        return None
+
+    if file_digest != digest:
+        if utils.VERBOSE:
+            utils.print_verbose("Cache file |{}| is outdated.".format(filename))
+        return None
+
+    view = memoryview(buffer)
+    sections = []
+
+    for index in range(NB_SECTIONS):
+        offset, size, checksum, _ = SECTION.unpack_from(buffer, HEADER.size + SECTION.size * index)
+
+        if offset + size > len(buffer) or zlib.crc32(view[offset: offset + size]) != checksum:
+            print_warning("Cache file |{}| is corrupted. It has been ignored.".format(filename))
+            return None
+
+        sections.append(view[offset: offset + size])
+
+    label_offsets = sections[LABEL_OFFSETS].cast("i")
+    label_data = sections[LABEL_DATA]
+    label_ids = [LABELS.intern(str(label_data[label_offsets[index]: label_offsets[index + 1]], "utf-8"))
+                 for index in range(nb_labels)]
+
+    records = sections[TRANSITIONS].cast("i")
+    states = sections[STATES]
+    transition_labels = records[1::4]
+
+    if label_ids != list(range(nb_labels)):
+        # Labels were already interned in a different order: the label identifiers of the file are translated
+        transition_labels = array("i", (label_ids[label_id] for label_id in transition_labels))
+
+    lts = CompactLts(initial_state, nb_states,
+                     records[0::4], transition_labels, records[2::4],
+                     sections[TRANSITIONS][12::TRANSITION_RECORD_SIZE],
+                     sections[OUT_OFFSETS].cast("i"),
+                     states[0::STATE_RECORD_SIZE], states[1::STATE_RECORD_SIZE],
+                     sections[IN_OFFSETS].cast("i"), sections[IN_TRANSITIONS].cast("i"))
+    # The mapping must stay open as long as the arrays are used
+    lts.buffer = buffer
+
+    return lts
+
+
+def align(offset):
+    return (offset + 7) & ~7
@@ -1,6 +1,10 @@
+import gc
+import re
+from array import array
 from enum import Enum
 
-from utils import is_an_int, print_error, print_warning
+from label_table import LABELS
+from utils import print_error, print_warning
 
 
 class TransitionType(Enum):
@@ -90,15 +94,16 @@ class State:
 
 
 class Transition:
-    def __init__(self, inc_state, out_state, label, transition_type):
-        self.label = label
+    def __init__(self, inc_state, out_state, label_id, transition_type):
+        self.label_id = label_id
         self.transition_type = transition_type
         self.inc_state = inc_state
         self.out_state = out_state
 
     def __eq__(self, other):
         if isinstance(other, Transition):
-            return self.inc_state == other.inc_state and self.out_state == other.out_state and self.label == other.label
+            return self.inc_state == other.inc_state and self.out_state == other.out_state \
+                and self.label_id == other.label_id
         return False
 
     def __ne__(self, other):
@@ -111,6 +116,10 @@ class Transition:
     def __hash__(self):
         return hash(self.inc_state) + hash(self.out_state)
 
+    @property
+    def label(self):
+        return LABELS.names[self.label_id]
+
 
 class LtsParser:
     def __init__(self, red_transitions=None, green_transitions=None, black_transitions=None, initial_state=None,
@@ -144,179 +153,461 @@ class LtsParser:
         self.initial_state = initial_state
         self.nb_transitions = nb_transitions
         self.nb_states = nb_states
+        # Census of the labels of a CLTS computed while generating it (see transitions_loader.py), if any
+        self.label_census = None
 
-    # Read the .autx file line by line to retrieve red, green and black transitions
+    # Read the whole .autx file at once and match each line against a compiled pattern to retrieve
+    # red, green and black transitions, along with the neighbourhood suffixes of the states
     def parse(self, filename):
         with open(filename) as file:
-            while line := file.readline().strip():
-                if line.startswith("des"):
-                    self.setup_general_infos(line)
-                else:
-                    self.add_transition(line)
+            lines = file.read().splitlines()
+
+        # The cyclic garbage collector is paused while the graph is built: it would otherwise be triggered
+        # repeatedly by the millions of allocated objects while none of them can be freed.
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+
+        try:
+            self.build_graph(lines)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
 
         self.states = list(self.temp_states.values())
         del self.temp_states
 
-    def setup_general_infos(self, line):
-        opened_parenthesis = False
-        nb_comas = 0
-        initial_state = ""
-        nb_transitions = ""
-        nb_states = ""
-
-        for char in line:
-            if char == '(':
-                opened_parenthesis = True
-            elif char == ',':
-                nb_comas += 1
-            elif char == ')':
-                opened_parenthesis = False
-            else:
-                if opened_parenthesis:
-                    if nb_comas == 0:
-                        initial_state += char
-                    elif nb_comas == 1:
-                        nb_transitions += char
-                    else:
-                        nb_states += char
+    def build_graph(self, lines):
+        states = self.temp_states
+        transitions = self.transitions
+        transitions_by_type = {
+            TransitionType.NEUTRAL: self.black_transitions,
+            TransitionType.CORRECT: self.green_transitions,
+            TransitionType.INCORRECT: self.red_transitions
+        }
 
-        initial_state = initial_state.strip()
-        nb_transitions = nb_transitions.strip()
-        nb_states = nb_states.strip()
+        intern = LABELS.intern
 
-        if is_an_int(initial_state):
-            self.initial_state = int(initial_state)
+        for inc_label, inc_neighbourhood, inc_color, label, transition_type, out_label \
+                in scan_transitions(lines, self.setup_general_infos):
+            inc_state = states.get(inc_label)
 
-        if is_an_int(nb_transitions):
-            self.nb_transitions = int(nb_transitions)
+            if inc_state is None:
+                inc_state = State(inc_label)
+                states[inc_label] = inc_state
 
-        if is_an_int(nb_states):
-            self.nb_states = int(nb_states)
+            if inc_neighbourhood is not None:
+                update_neighbourhood(inc_state, inc_neighbourhood, inc_color)
 
-    def add_transition(self, line):
-        first_coma = line.find(',')
-        incoming_state = line[1: first_coma].strip()
-        line2 = line[first_coma + 1:]
-        second_coma = line2.rfind(',')
-        transition = line2[0: second_coma].strip()
-        outgoing_state = line2[second_coma + 1: len(line2) - 1]
+            out_state = states.get(out_label)
 
-        inc_state = parse_state(incoming_state)
-        out_state = parse_state(outgoing_state)
+            if out_state is None:
+                out_state = State(out_label)
+                states[out_label] = out_state
 
-        existing_inc_state = self.temp_states.get(inc_state.label)
-        existing_out_state = self.temp_states.get(out_state.label)
+            trans = Transition(inc_state, out_state, intern(label), transition_type)
+            out_state.inc_transitions.add(trans)
+            inc_state.out_transitions.add(trans)
+            transitions_by_type[transition_type].append(trans)
+            transitions.append(trans)
 
-        if existing_inc_state is not None:
-            final_inc_state = existing_inc_state
+    def setup_general_infos(self, line):
+        match = DES_PATTERN.fullmatch(line)
 
-            if inc_state.is_a_neighbourhood:
-                final_inc_state.mark_as_neighbourhood()
+        if match is None:
+            print_warning("Header |{}| is not a valid AUT header. It has been ignored.".format(line))
+            return
 
-            if inc_state.color is not None:
-                final_inc_state.set_neighbourhood_color(inc_state.color)
-        else:
-            final_inc_state = inc_state
-            self.temp_states[inc_state.label] = inc_state
+        self.initial_state = int(match.group(1))
+        self.nb_transitions = int(match.group(2))
+        self.nb_states = int(match.group(3))
 
-        if existing_out_state is not None:
-            final_out_state = existing_out_state
 
-            if out_state.is_a_neighbourhood:
-                final_out_state.mark_as_neighbourhood()
+# Matches the header "des (<initial_state>, <nb_transitions>, <nb_states>)"
+DES_PATTERN = re.compile(r"des\s*\(\s*(-?\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\)")
+# Matches a transition "(<state>[:N:<neighbourhood>], <label>[:<color>], <state>)", where the label may be quoted
+TRANSITION_PATTERN = re.compile(
+    r"\(\s*(-?\d+)\s*(?::\s*(\w*)\s*(?::\s*(\w*)\s*)?)?,"
+    r"\s*(?:\"([^\"]*)\"|([^\",]*?))\s*(?::\s*(\w*)\s*)?,"
+    r"\s*(-?\d+)\s*\)"
+)
+TRANSITION_TYPES = {
+    None: TransitionType.NEUTRAL,
+    "": TransitionType.NEUTRAL,
+    "BLACK": TransitionType.NEUTRAL,
+    "GREEN": TransitionType.CORRECT,
+    "RED": TransitionType.INCORRECT
+}
+NEIGHBOURHOOD_TYPES = {neighbourhood.value: neighbourhood for neighbourhood in Neighbourhood
+                       if neighbourhood != Neighbourhood.NONE}
 
-            if out_state.color is not None:
-                final_out_state.set_neighbourhood_color(out_state.color)
-        else:
-            final_out_state = out_state
-            self.temp_states[out_state.label] = out_state
 
-        trans = parse_transition(transition, final_inc_state, final_out_state)
-        final_out_state.add_inc_transition(trans)
-        final_inc_state.add_out_transition(trans)
+# Yield a tuple (inc_state, inc_neighbourhood, inc_neighbourhood_color, label, transition_type, out_state) for each
+# transition line. The "des" header is given to <header_callback>.
+def scan_transitions(lines, header_callback):
+    match_transition = TRANSITION_PATTERN.fullmatch
+    transition_types = TRANSITION_TYPES
 
-        if trans.transition_type == TransitionType.CORRECT:
-            self.green_transitions.append(trans)
-        elif trans.transition_type == TransitionType.INCORRECT:
-            self.red_transitions.append(trans)
-        else:
-            self.black_transitions.append(trans)
+    for line in lines:
+        line = line.strip()
 
-        self.transitions.append(trans)
+        if not line:
+            continue
 
+        match = match_transition(line)
 
-def parse_state(line):
-    nb_dot = 0
-    label = ""
-    neighbourhood = ""
-    neighbourhood_color = ""
+        if match is None:
+            if line.startswith("des"):
+                header_callback(line)
+                continue
 
-    for char in line:
-        if char == ':':
-            nb_dot += 1
-        else:
-            if nb_dot == 0:
-                label += char
-            elif nb_dot == 1:
-                neighbourhood += char
-            else:
-                neighbourhood_color += char
-
-    label = label.strip()
-
-    if is_an_int(label):
-        label_int = int(label)
-    else:
-        print_error("Label must be an integer. Current is |{}|".format(label))
-        raise Exception()
-
-    is_a_neighbourhood = neighbourhood.strip() == "N"
-
-    if neighbourhood_color.strip() == "G":
-        neighbourhood_enum = Neighbourhood.GREEN
-    elif neighbourhood_color.strip() == "R":
-        neighbourhood_enum = Neighbourhood.RED
-    elif neighbourhood_color.strip() == "GR":
-        neighbourhood_enum = Neighbourhood.GREEN_RED
-    elif neighbourhood_color.strip() == "GRB":
-        neighbourhood_enum = Neighbourhood.GREEN_RED_BLACK
-    else:
+            print_error("Line |{}| is not a valid AUT transition.".format(line))
+            raise Exception()
+
+        inc_label, inc_neighbourhood, inc_color, quoted_label, label, color, out_label = match.groups()
+        transition_type = transition_types.get(color)
+
+        if transition_type is None:
+            print_error("Transition type |{}| does not match any existing transition type.".format(color))
+            raise Exception()
+
+        yield int(inc_label), inc_neighbourhood, inc_color, label if quoted_label is None else quoted_label, \
+            transition_type, int(out_label)
+
+
+def parse_neighbourhood(neighbourhood, neighbourhood_color):
+    neighbourhood_enum = NEIGHBOURHOOD_TYPES.get(neighbourhood_color)
+
+    if neighbourhood_enum is None:
         if neighbourhood.strip() != "":
             print_warning("Neighbourhood type |{}| is unknown. Switched to no neighbourhood."
-                          .format(neighbourhood_color.strip()))
+                          .format(neighbourhood_color))
         neighbourhood_enum = Neighbourhood.NONE
 
-    return State(label_int, is_a_neighbourhood, neighbourhood_enum)
+    return neighbourhood.strip() == "N", neighbourhood_enum
+
+
+def update_neighbourhood(state, neighbourhood, neighbourhood_color):
+    is_a_neighbourhood, neighbourhood_enum = parse_neighbourhood(neighbourhood, neighbourhood_color)
+
+    if is_a_neighbourhood:
+        state.mark_as_neighbourhood()
+
+    state.set_neighbourhood_color(neighbourhood_enum)
+
 
+# Codes used to store transition types and neighbourhood colors in byte arrays
+TRANSITION_TYPE_CODES = {transition_type: code for code, transition_type in enumerate(TransitionType)}
+TRANSITION_TYPES_BY_CODE = list(TransitionType)
+NEIGHBOURHOOD_CODES = {neighbourhood: code for code, neighbourhood in enumerate(Neighbourhood)}
+NEIGHBOURHOODS_BY_CODE = list(Neighbourhood)
 
-def parse_transition(line, inc_state, out_state):
-    color_parsing = False
-    label = ""
-    color = ""
 
-    for char in line:
-        if char == ":":
-            color_parsing = True
+def parse_compact_lts(filename):
+    builder = CompactLtsBuilder()
+    header = {}
+
+    def setup_general_infos(line):
+        match = DES_PATTERN.fullmatch(line)
+
+        if match is None:
+            print_warning("Header |{}| is not a valid AUT header. It has been ignored.".format(line))
         else:
-            if color_parsing:
-                color += char
-            else:
-                if char != '"':
-                    label += char
+            header["initial_state"] = int(match.group(1))
+
+    # The file is streamed rather than loaded at once, so that its lines are never all held in memory
+    with open(filename) as file:
+        for inc_label, inc_neighbourhood, inc_color, label, transition_type, out_label \
+                in scan_transitions(file, setup_general_infos):
+            if inc_label < 0 or out_label < 0:
+                print_error("Compact LTS only support non-negative state numbers. Current are |{}| and |{}|."
+                            .format(inc_label, out_label))
+                raise Exception()
+
+            builder.ensure_state(max(inc_label, out_label))
+
+            if inc_neighbourhood is not None:
+                is_a_neighbourhood, neighbourhood_enum = parse_neighbourhood(inc_neighbourhood, inc_color)
+                builder.set_neighbourhood(inc_label, is_a_neighbourhood, neighbourhood_enum)
+
+            builder.add_transition(inc_label, LABELS.intern(label), out_label, transition_type)
+
+    return builder.build(header.get("initial_state", 0))
+
+
+# Builds a CompactLts by appending states and transitions in any order.
+# Transitions are sorted by source state when the LTS is built.
+class CompactLtsBuilder:
+    def __init__(self):
+        self.nb_states = 0
+        self.sources = array("i")
+        self.transition_labels = array("i")
+        self.targets = array("i")
+        self.colors = bytearray()
+        self.neighbourhoods = bytearray()
+        self.neighbourhood_colors = bytearray()
+
+    def add_state(self):
+        self.nb_states += 1
+        self.neighbourhoods.append(0)
+        self.neighbourhood_colors.append(NEIGHBOURHOOD_CODES[Neighbourhood.NONE])
+
+        return self.nb_states - 1
+
+    def ensure_state(self, state):
+        while self.nb_states <= state:
+            self.add_state()
+
+    def set_neighbourhood(self, state, is_a_neighbourhood, neighbourhood_color):
+        if is_a_neighbourhood:
+            self.neighbourhoods[state] = 1
+
+        self.neighbourhood_colors[state] = NEIGHBOURHOOD_CODES[neighbourhood_color]
+
+    def add_transition(self, inc_state, label_id, out_state, transition_type):
+        self.sources.append(inc_state)
+        self.transition_labels.append(label_id)
+        self.targets.append(out_state)
+        self.colors.append(TRANSITION_TYPE_CODES[transition_type])
+
+    def build(self, initial_state):
+        nb_states = self.nb_states
+        nb_transitions = len(self.sources)
+
+        # Counting sort of the transitions by source state (CSR layout)
+        out_offsets = array("i", [0]) * (nb_states + 1)
+
+        for source in self.sources:
+            out_offsets[source + 1] += 1
+
+        for state in range(nb_states):
+            out_offsets[state + 1] += out_offsets[state]
+
+        positions = out_offsets[:-1]
+        sources = array("i", [0]) * nb_transitions
+        label_ids = array("i", sources)
+        targets = array("i", sources)
+        colors = bytearray(nb_transitions)
+
+        for transition in range(nb_transitions):
+            source = self.sources[transition]
+            position = positions[source]
+            positions[source] += 1
+            sources[position] = source
+            label_ids[position] = self.transition_labels[transition]
+            targets[position] = self.targets[transition]
+            colors[position] = self.colors[transition]
+
+        return CompactLts(initial_state, nb_states, sources, label_ids, targets, colors, out_offsets,
+                          self.neighbourhoods, self.neighbourhood_colors)
+
+
+# Array-backed LTS. States are integers from 0 to nb_states - 1, and transitions are indexes in parallel arrays
+# (source, label identifier in LABELS, target, color) sorted by source state (compressed sparse row), so that the
+# outgoing transitions of state s are the indexes out_offsets[s] to out_offsets[s + 1] - 1. Incoming transitions are
+# stored in a second, reversed, CSR.
+# The attributes of LtsParser (states, transitions, red_transitions, ...) are exposed as lazy sequences of
+# CompactState and CompactTransition views, so that the rest of the tool can use this LTS unchanged.
+class CompactLts:
+    def __init__(self, initial_state, nb_states, sources, label_ids, targets, colors, out_offsets,
+                 neighbourhoods, neighbourhood_colors, in_offsets=None, in_transitions=None):
+        self.initial_state = initial_state
+        self.sources = sources
+        self.label_ids = label_ids
+        self.targets = targets
+        self.colors = colors
+        self.out_offsets = out_offsets
+        self.neighbourhoods = neighbourhoods
+        self.neighbourhood_colors = neighbourhood_colors
+
+        if in_offsets is None:
+            in_offsets, in_transitions = compute_reverse_csr(targets, nb_states)
+
+        self.in_offsets = in_offsets
+        self.in_transitions = in_transitions
+        # Census of the labels of a CLTS computed while generating it (see transitions_loader.py), if any
+        self.label_census = None
+
+    @property
+    def nb_states(self):
+        return len(self.out_offsets) - 1
+
+    @property
+    def nb_transitions(self):
+        return len(self.sources)
+
+    @property
+    def states(self):
+        return CompactStates(self, range(self.nb_states))
+
+    @property
+    def transitions(self):
+        return CompactTransitions(self, range(self.nb_transitions))
+
+    @property
+    def black_transitions(self):
+        return self.transitions_of_type(TransitionType.NEUTRAL)
+
+    @property
+    def green_transitions(self):
+        return self.transitions_of_type(TransitionType.CORRECT)
+
+    @property
+    def red_transitions(self):
+        return self.transitions_of_type(TransitionType.INCORRECT)
+
+    def transitions_of_type(self, transition_type):
+        code = TRANSITION_TYPE_CODES[transition_type]
+        colors = self.colors
+
+        return CompactTransitions(self, array("i", (transition for transition in range(self.nb_transitions)
+                                                    if colors[transition] == code)))
+
+    def get_state(self, state):
+        return CompactState(self, state)
+
+
+def compute_reverse_csr(targets, nb_states):
+    in_offsets = array("i", [0]) * (nb_states + 1)
+
+    for target in targets:
+        in_offsets[target + 1] += 1
+
+    for state in range(nb_states):
+        in_offsets[state + 1] += in_offsets[state]
+
+    positions = in_offsets[:-1]
+    in_transitions = array("i", [0]) * len(targets)
+
+    for transition, target in enumerate(targets):
+        in_transitions[positions[target]] = transition
+        positions[target] += 1
+
+    return in_offsets, in_transitions
+
+
+class CompactStates:
+    def __init__(self, lts, indexes):
+        self.lts = lts
+        self.indexes = indexes
+
+    def __len__(self):
+        return len(self.indexes)
+
+    def __iter__(self):
+        lts = self.lts
+
+        for state in self.indexes:
+            yield CompactState(lts, state)
+
+    def __getitem__(self, index):
+        return CompactState(self.lts, self.indexes[index])
+
+
+class CompactTransitions:
+    def __init__(self, lts, indexes):
+        self.lts = lts
+        self.indexes = indexes
+
+    def __len__(self):
+        return len(self.indexes)
+
+    def __iter__(self):
+        lts = self.lts
+
+        for transition in self.indexes:
+            yield CompactTransition(lts, transition)
+
+    def __getitem__(self, index):
+        return CompactTransition(self.lts, self.indexes[index])
+
+
+# Lightweight view on a state of a CompactLts, offering the same interface as State
+class CompactState:
+    __slots__ = ("lts", "label")
+
+    def __init__(self, lts, label):
+        self.lts = lts
+        self.label = label
+
+    __str__ = State.__str__
+    stringify = State.stringify
+
+    def __eq__(self, other):
+        if isinstance(other, CompactState):
+            return self.label == other.label
+        return False
+
+    def __hash__(self):
+        return hash(self.label)
+
+    @property
+    def out_transitions(self):
+        lts = self.lts
+
+        return [CompactTransition(lts, transition)
+                for transition in range(lts.out_offsets[self.label], lts.out_offsets[self.label + 1])]
+
+    @property
+    def inc_transitions(self):
+        lts = self.lts
+        in_transitions = lts.in_transitions
+
+        return [CompactTransition(lts, in_transitions[index])
+                for index in range(lts.in_offsets[self.label], lts.in_offsets[self.label + 1])]
+
+    @property
+    def is_a_neighbourhood(self):
+        return self.lts.neighbourhoods[self.label] == 1
+
+    @property
+    def color(self):
+        return NEIGHBOURHOODS_BY_CODE[self.lts.neighbourhood_colors[self.label]]
+
+    def mark_as_neighbourhood(self):
+        self.lts.neighbourhoods[self.label] = 1
+
+    def set_neighbourhood_color(self, color):
+        self.lts.neighbourhood_colors[self.label] = NEIGHBOURHOOD_CODES[color]
+
+
+# Lightweight view on a transition of a CompactLts, offering the same interface as Transition
+class CompactTransition:
+    __slots__ = ("lts", "index")
+
+    def __init__(self, lts, index):
+        self.lts = lts
+        self.index = index
+
+    __str__ = Transition.__str__
+
+    def __eq__(self, other):
+        if isinstance(other, CompactTransition):
+            return self.index == other.index and self.lts is other.lts
+        return False
+
+    def __hash__(self):
+        return self.index
+
+    @property
+    def label_id(self):
+        return self.lts.label_ids[self.index]
+
+    @property
+    def label(self):
+        return LABELS.names[self.lts.label_ids[self.index]]
 
-    label = label.strip()
-    color = color.strip()
+    @property
+    def transition_type(self):
+        return TRANSITION_TYPES_BY_CODE[self.lts.colors[self.index]]
 
-    if not color or color == "BLACK":
-        transition_type = TransitionType.NEUTRAL
-    elif color == "GREEN":
-        transition_type = TransitionType.CORRECT
-    elif color == "RED":
-        transition_type = TransitionType.INCORRECT
-    else:
-        print_error("Transition type |{}| does not match any existing transition type.".format(color))
-        raise Exception()
+    @transition_type.setter
+    def transition_type(self, transition_type):
+        self.lts.colors[self.index] = TRANSITION_TYPE_CODES[transition_type]
 
-    # print(label)
+    @property
+    def inc_state(self):
+        return CompactState(self.lts, self.lts.sources[self.index])
 
-    return Transition(inc_state, out_state, label, transition_type)
+    @property
+    def out_state(self):
+        return CompactState(self.lts, self.lts.targets[self.index])
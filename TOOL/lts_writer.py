@@ -1,12 +1,13 @@
 import os.path
 
+from label_table import LABELS
 from utils import print_warning
 
 
 class LtsWriter:
-    def __init__(self, full_filename, lts_parser, override, truncated):
+    def __init__(self, full_filename, lts_parser, override, truncated, suffix=""):
         filename_with_path = compute_filename_and_path(full_filename)
-        self.filename = filename_with_path[0].replace(".daut", "") + ("_truncated" if truncated else "")
+        self.filename = filename_with_path[0].replace(".daut", "") + suffix + ("_truncated" if truncated else "")
         self.path = filename_with_path[1]
         self.full_autx_filename = self.path + "/" + self.filename + ".autx"
         self.lts_parser = lts_parser
@@ -18,6 +19,9 @@ class LtsWriter:
                           "has not been given.".format(self.filename))
             return
 
+        # Labels are stored in upper case in the label table
+        label_names = LABELS.names
+
         with open(self.full_autx_filename, "w") as full_lts:
             full_lts.write("des ({}, {}, {})\n".format(
                 self.lts_parser.initial_state,
@@ -29,7 +33,7 @@ class LtsWriter:
                 full_lts.write("({}{}, \"{}\":{}, {})\n".format(
                     transition.inc_state.label,
                     ":N:" + transition.inc_state.color.value if transition.inc_state.is_a_neighbourhood else "",
-                    transition.label.upper(),
+                    label_names[transition.label_id],
                     transition.transition_type.value,
                     transition.out_state.label
                 ))
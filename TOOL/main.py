@@ -5,10 +5,15 @@ import time
 import subprocess
 
 from command_line_parser import Parser, Argument
-from counterexamples_generator import CounterexamplesGenerator
-from lts_parser import LtsParser
+from counterexamples_generator import CounterexamplesGenerator, BatchCounterexamplesGenerator, ExplorationOrder, \
+    StateKeying
+from lts_cache import load_compact_lts, save_compact_lts, compute_digest, lts_cache_filename, \
+    clts_cache_filename, LTS_KIND, CLTS_KIND
+from lts_parser import LtsParser, parse_compact_lts
 from lts_writer import LtsWriter
-from patcher import Patcher, Heuristic
+from minimiser import Minimiser
+from patcher import Patcher, Heuristic, CHECKPOINT_EXTENSION
+from property_automaton import compile_property
 from transitions_loader import TransitionsLoader
 from truncator import Truncator, Truncation
 from verifier import Verifier
@@ -21,15 +26,52 @@ DAUT_GENERATION_FAILED = 4
 BAD_USAGE = 5
 
 
+# The CLTS is reduced modulo bisimulation before being written and analysed, unless minimisation is False
+def generate_clts(generator, minimisation):
+    clts = generator.generate()
+
+    if minimisation:
+        clts = Minimiser(clts).minimise()
+
+    return clts
+
+
 def launch_patcher(cmd_line_parser, conversion_time):
     # Parse LTS
     print("Parsing LTS...")
     parse_start = time.time()
-    ltsParser = LtsParser()
-    ltsParser.parse(cmd_line_parser.get(Argument.LTS))
+    compact = cmd_line_parser.get(Argument.COMPACT)
+    cache = cmd_line_parser.get(Argument.CACHE)
+    exploration_order = ExplorationOrder.BREADTH_FIRST if cmd_line_parser.get(Argument.BREADTH_FIRST) \
+        else ExplorationOrder.DEPTH_FIRST
+    state_keying = StateKeying.TRANSITION if cmd_line_parser.get(Argument.TRANSITION_KEYING) else StateKeying.PRODUCT
+    minimisation = not cmd_line_parser.get(Argument.NO_MINIMISATION)
+    # Unless required otherwise, the census of the labels used to compute ART, FRT and URT is built with the CLTS
+    emit_label_census = not cmd_line_parser.get(Argument.SEPARATE_LOADING)
+    lts_file = cmd_line_parser.get(Argument.LTS)
+    clts_loaded_from_cache = False
+
+    if cache:
+        ltsParser = load_compact_lts(lts_cache_filename(lts_file), LTS_KIND, compute_digest(lts_file))
+
+        if ltsParser is None:
+            ltsParser = parse_compact_lts(lts_file)
+            save_compact_lts(ltsParser, lts_cache_filename(lts_file), LTS_KIND, compute_digest(lts_file))
+        else:
+            print("LTS loaded from cache file |{}|.".format(lts_cache_filename(lts_file)))
+    elif compact:
+        ltsParser = parse_compact_lts(lts_file)
+    else:
+        ltsParser = LtsParser()
+        ltsParser.parse(lts_file)
+
     parse_end = time.time()
     parse_time = parse_end - parse_start
     print("Parsing LTS: DONE ({}s)".format(parse_time))
+    # Properties are compiled once the labels of the LTS are known, and shared by the generator and the truncator
+    mcl_files = cmd_line_parser.get(Argument.MCL_PROPERTY)
+    property_automata = [compile_property(mcl_file) for mcl_file in mcl_files]
+    property_automaton = property_automata[0]
 
     if TEST:
         if commandLineParser.get(Argument.CLTS) is not None:
@@ -46,23 +88,78 @@ def launch_patcher(cmd_line_parser, conversion_time):
             # Compute CLTS
             print("Computing CLTS...")
             compute_clts_start = time.time()
-            generator = CounterexamplesGenerator(ltsParser, cmd_line_parser.get(Argument.MCL_PROPERTY))
+            generator = CounterexamplesGenerator(ltsParser, property_automaton, compact, exploration_order,
+                                                 state_keying=state_keying)
             cltsParser = generator.generate()
             initial_state = None
             compute_clts_end = time.time()
             compute_clts_time = compute_clts_end - compute_clts_start
             print("Computing CLTS: DONE ({}s)".format(compute_clts_time))
+    elif len(property_automata) > 1:
+        # Compute the CLTS of each property
+        print("Computing CLTS...")
+        compute_clts_start = time.time()
+
+        if state_keying == StateKeying.PRODUCT:
+            # The LTS is explored once for all the properties
+            cltsParsers = BatchCounterexamplesGenerator(ltsParser, property_automata, compact, exploration_order,
+                                                        emit_label_census).generate()
+        else:
+            cltsParsers = [CounterexamplesGenerator(ltsParser, property_automaton, compact, exploration_order,
+                                                    state_keying=state_keying,
+                                                    emit_label_census=emit_label_census).generate()
+                           for property_automaton in property_automata]
+
+        if minimisation:
+            cltsParsers = [Minimiser(cltsParser).minimise() for cltsParser in cltsParsers]
+
+        compute_clts_end = time.time()
+        compute_clts_time = compute_clts_end - compute_clts_start
+        print("Computing CLTS: DONE ({}s)".format(compute_clts_time))
+
+        for mcl_file, property_automaton, cltsParser in zip(mcl_files, property_automata, cltsParsers):
+            print("==================================================")
+            print("Property |{}|: {}".format(mcl_file, property_automaton))
+            analyse_clts(cmd_line_parser, cltsParser, property_automaton, property_suffix(mcl_file), False,
+                         conversion_time, parse_time, compute_clts_time)
+
+        return
     else:
         # Compute CLTS
         print("Computing CLTS...")
         compute_clts_start = time.time()
-        generator = CounterexamplesGenerator(ltsParser, cmd_line_parser.get(Argument.MCL_PROPERTY))
-        cltsParser = generator.generate()
+        generator = CounterexamplesGenerator(ltsParser, property_automaton, compact, exploration_order,
+                                             state_keying=state_keying, emit_label_census=emit_label_census)
+
+        if cache:
+            clts_digest = compute_digest(lts_file, generator.cache_key(), "minimisation={}".format(minimisation))
+            cltsParser = load_compact_lts(clts_cache_filename(lts_file), CLTS_KIND, clts_digest)
+
+            if cltsParser is None:
+                cltsParser = generate_clts(generator, minimisation)
+                save_compact_lts(cltsParser, clts_cache_filename(lts_file), CLTS_KIND, clts_digest)
+            else:
+                clts_loaded_from_cache = True
+                print("CLTS loaded from cache file |{}|.".format(clts_cache_filename(lts_file)))
+        else:
+            cltsParser = generate_clts(generator, minimisation)
+
         initial_state = None
         compute_clts_end = time.time()
         compute_clts_time = compute_clts_end - compute_clts_start
         print("Computing CLTS: DONE ({}s)".format(compute_clts_time))
 
+    analyse_clts(cmd_line_parser, cltsParser, property_automaton, "", clts_loaded_from_cache, conversion_time,
+                 parse_time, compute_clts_time)
+
+
+# Verify, write and patch the CLTS of a property. The CLTS file of the property is named after the LTS file, followed
+# by <suffix>.
+def analyse_clts(cmd_line_parser, cltsParser, property_automaton, suffix, clts_loaded_from_cache, conversion_time,
+                 parse_time, compute_clts_time):
+    lts_file = cmd_line_parser.get(Argument.LTS)
+    initial_state = None
+
     if not TEST:
         for state in cltsParser.states:
             if state.label == 0:
@@ -81,8 +178,15 @@ def launch_patcher(cmd_line_parser, conversion_time):
     # Write generated CLTS to file
     print("Writing CLTS to file...")
     write_start = time.time()
-    ltsWriter = LtsWriter(cmd_line_parser.get(Argument.LTS), cltsParser, cmd_line_parser.get(Argument.OVERRIDE), False)
-    ltsWriter.generate_aut()
+    ltsWriter = LtsWriter(lts_file, cltsParser, cmd_line_parser.get(Argument.OVERRIDE), False, suffix)
+
+    if clts_loaded_from_cache and os.path.exists(ltsWriter.full_autx_filename) \
+            and os.path.getmtime(ltsWriter.full_autx_filename) >= os.path.getmtime(clts_cache_filename(lts_file)):
+        # The existing file was written after the cache file, thus from the same CLTS
+        print("CLTS file |{}| is up to date.".format(ltsWriter.full_autx_filename))
+    else:
+        ltsWriter.generate_aut()
+
     write_end = time.time()
     write_time = write_end - write_start
     print("Writing CLTS to file: DONE ({}s)".format(write_time))
@@ -90,7 +194,8 @@ def launch_patcher(cmd_line_parser, conversion_time):
     # Compute ART, FRT, URT
     print("Computing ART, FRT, UFRT...")
     compute_subsets_start = time.time()
-    transitionsLoader = TransitionsLoader(cltsParser.transitions)
+    # The census is None if the CLTS was not generated by this run (or if -separateloading was given)
+    transitionsLoader = TransitionsLoader(cltsParser.transitions, cltsParser.label_census)
     transitionsLoader.load_subsets()
     compute_subsets_end = time.time()
     compute_subsets_time = compute_subsets_end - compute_subsets_start
@@ -99,9 +204,31 @@ def launch_patcher(cmd_line_parser, conversion_time):
     # Patch
     print("Computing patches...")
     patch_start = time.time()
-    patcher = Patcher(transitionsLoader.art, transitionsLoader.frt, transitionsLoader.urt,
-                      Heuristic.LESS_IMPACT_ON_GREEN_PART, cltsParser.green_transitions,
-                      cltsParser.red_transitions, cltsParser.transitions, Argument.TIME_BOUND)
+    if cmd_line_parser.get(Argument.APPROXIMATION):
+        heuristic = Heuristic.GREEDY_APPROXIMATION
+    elif cmd_line_parser.get(Argument.PARETO_FRONT):
+        heuristic = Heuristic.PARETO_FRONT
+    else:
+        heuristic = Heuristic.LESS_IMPACT_ON_GREEN_PART
+
+    # The search of the patches is checkpointed in a file named after the CLTS file
+    checkpoint_file = lts_file + suffix + CHECKPOINT_EXTENSION if cmd_line_parser.get(Argument.CHECKPOINT) else None
+
+    # Better patches are printed as soon as they are found
+    def print_better_patch(patch, component, nb_components):
+        if nb_components == 1:
+            print("Better patch found after {:.3f}s: {}".format(
+                time.time() - patch_start, " + ".join(enhanced_trans.transition.label for enhanced_trans in patch)))
+        else:
+            print("Better patch of the independent group n°{}/{} of red transitions found after {:.3f}s: {}".format(
+                component + 1, nb_components, time.time() - patch_start,
+                " + ".join(enhanced_trans.transition.label for enhanced_trans in patch)))
+
+    patcher = Patcher(transitionsLoader.art, transitionsLoader.frt, transitionsLoader.urt, heuristic,
+                      cltsParser.green_transitions, cltsParser.red_transitions, cltsParser.transitions,
+                      cmd_line_parser.get(Argument.TIME_BOUND),
+                      nb_processes=cmd_line_parser.get(Argument.NB_PROCESSES), checkpoint_file=checkpoint_file,
+                      listener=print_better_patch, max_nb_patches=cmd_line_parser.get(Argument.MAX_NB_PATCHES))
     result = patcher.patch()
     patch_end = time.time()
     patch_time = patch_end - patch_start
@@ -112,7 +239,7 @@ def launch_patcher(cmd_line_parser, conversion_time):
     # Generate truncated CLTS (remove green part)
     print("Truncating CLTS...")
     truncate_start = time.time()
-    truncator = Truncator(cltsParser, cmd_line_parser.get(Argument.OVERRIDE), cmd_line_parser.get(Argument.MCL_PROPERTY))
+    truncator = Truncator(cltsParser, cmd_line_parser.get(Argument.OVERRIDE), property_automaton)
     #truncator.truncate(Truncation.FULL_AFTER_LIVENESS)
     #ltsWriter = LtsWriter(cmd_line_parser.get(Argument.LTS), cltsParser, cmd_line_parser.get(Argument.OVERRIDE), True)
     #ltsWriter.generate_aut()
@@ -120,10 +247,12 @@ def launch_patcher(cmd_line_parser, conversion_time):
     truncate_time = truncate_end - truncate_start
     print("Truncating CLTS: DONE ({}s)".format(truncate_time))
 
-    if patches is None or patches == set():
+    # The patches found by components are only built while being printed. When too many patches were found, only the
+    # first ones are returned and printed.
+    if patches is None or patcher.nb_patches == 0:
         print("\nNo patch could be found.")
     else:
-        if len(patches) == 1:
+        if patcher.nb_patches == 1:
             print("\n1 patch was found for the current specification.")
 
             if not clean_patch:
@@ -132,12 +261,17 @@ def launch_patcher(cmd_line_parser, conversion_time):
 
             print("Patch found:\n")
         else:
-            print("\n{} patches were found for the current specification.".format(len(patches)))
+            print("\n{} patches were found for the current specification.".format(patcher.nb_patches))
 
             if not clean_patch:
                 utils.print_warning("Applying one of these patches will necessarily impact\none or many "
                                     "already correct parts of the specification.")
 
+            if len(patches) == 1:
+                print("Only the first of them is printed.")
+            elif len(patches) < patcher.nb_patches:
+                print("Only the first {} of them are printed.".format(len(patches)))
+
             print("Patches found:\n")
 
         patch_index = 1
@@ -174,6 +308,11 @@ def launch_patcher(cmd_line_parser, conversion_time):
     # print(str(ltsGraph))
 
 
+# Suffix of the files generated for a property when several properties are checked at once
+def property_suffix(mcl_file):
+    return "_" + os.path.basename(mcl_file).replace(".mcl", "")
+
+
 # The script expects as input a file in .fautx (full autx), meaning
 # that the green part of the LTS is not truncated (as done by CLEAR).
 if __name__ == '__main__':
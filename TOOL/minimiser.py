@@ -0,0 +1,279 @@
+from array import array
+
+import utils
+from lts_parser import LtsParser, CompactLts, CompactLtsBuilder, State, Transition, TransitionType, \
+    TRANSITION_TYPE_CODES, TRANSITION_TYPES_BY_CODE, NEIGHBOURHOOD_CODES, NEIGHBOURHOODS_BY_CODE
+from transitions_loader import add_to_label_census, compute_compact_label_census
+
+
+# This class reduces a colored CLTS modulo strong bisimulation, two states being equivalent when they have the same
+# neighbourhood flag and color, and when they can perform the same (label, color) actions towards equivalent
+# states. The sets of labels of the green/black/red transitions reachable from a state, and the neighbourhood flags of
+# the sources of these transitions, are preserved, so ART, FRT, URT and the patches are the same on the reduced CLTS.
+#
+# The equivalence is computed by partition refinement. Blocks are ranges of an array of states, the states of a block
+# marked as predecessors of a splitter being moved at the beginning of its range, so that splitting a block costs the
+# number of marked states. When the CLTS is deterministic (at most one transition per action going out of each state),
+# only the smaller half of a split block is added to the splitters to process (Hopcroft's "process the smaller half"),
+# which makes the refinement O(|T| log |S|). Otherwise, both halves are processed again.
+# When the census of the labels was computed during the generation of the CLTS, the census of the reduced CLTS is
+# computed while building it.
+
+
+class Minimiser:
+    def __init__(self, clts):
+        self.clts = clts
+
+    def minimise(self):
+        clts = self.clts
+
+        if isinstance(clts, CompactLts):
+            nb_states = clts.nb_states
+            initial_state = clts.initial_state
+            sources = clts.sources
+            label_ids = clts.label_ids
+            targets = clts.targets
+            colors = clts.colors
+            neighbourhoods = clts.neighbourhoods
+            neighbourhood_colors = clts.neighbourhood_colors
+        else:
+            # States of a generated CLTS are numbered from 0 to nb_states - 1
+            nb_states = len(clts.states)
+            initial_state = clts.initial_state
+            sources = array("i", (transition.inc_state.label for transition in clts.transitions))
+            label_ids = array("i", (transition.label_id for transition in clts.transitions))
+            targets = array("i", (transition.out_state.label for transition in clts.transitions))
+            colors = bytes(TRANSITION_TYPE_CODES[transition.transition_type] for transition in clts.transitions)
+            neighbourhoods = bytearray(nb_states)
+            neighbourhood_colors = bytearray(nb_states)
+
+            for state in clts.states:
+                neighbourhoods[state.label] = state.is_a_neighbourhood
+                neighbourhood_colors[state.label] = NEIGHBOURHOOD_CODES[state.color]
+
+        blocks = compute_bisimulation(nb_states, sources, label_ids, targets, colors,
+                                      [(neighbourhoods[state], neighbourhood_colors[state])
+                                       for state in range(nb_states)])
+        quotient_states, quotient_transitions = compute_quotient(initial_state, blocks, sources, label_ids, targets,
+                                                                 colors)
+
+        if isinstance(clts, CompactLts):
+            builder = CompactLtsBuilder()
+
+            for state in quotient_states:
+                new_state = builder.add_state()
+                builder.set_neighbourhood(new_state, neighbourhoods[state],
+                                          NEIGHBOURHOODS_BY_CODE[neighbourhood_colors[state]])
+
+            for inc_state, label_id, out_state, color in quotient_transitions:
+                builder.add_transition(inc_state, label_id, out_state, TRANSITION_TYPES_BY_CODE[color])
+
+            minimised_clts = builder.build(0)
+            nb_minimised_states = minimised_clts.nb_states
+            nb_minimised_transitions = minimised_clts.nb_transitions
+
+            if clts.label_census is not None:
+                minimised_clts.label_census = compute_compact_label_census(minimised_clts)
+        else:
+            states = [State(new_state, neighbourhoods[state] == 1,
+                            NEIGHBOURHOODS_BY_CODE[neighbourhood_colors[state]])
+                      for new_state, state in enumerate(quotient_states)]
+            transitions = []
+            transitions_by_type = {
+                TransitionType.NEUTRAL: [],
+                TransitionType.CORRECT: [],
+                TransitionType.INCORRECT: []
+            }
+            label_census = None if clts.label_census is None else dict()
+
+            for inc_state, label_id, out_state, color in quotient_transitions:
+                transition = Transition(states[inc_state], states[out_state], label_id, TRANSITION_TYPES_BY_CODE[color])
+                states[inc_state].add_out_transition(transition)
+                states[out_state].add_inc_transition(transition)
+                transitions_by_type[transition.transition_type].append(transition)
+                transitions.append(transition)
+
+                if label_census is not None:
+                    add_to_label_census(label_census, transition)
+
+            minimised_clts = LtsParser(transitions_by_type[TransitionType.INCORRECT],
+                                       transitions_by_type[TransitionType.CORRECT],
+                                       transitions_by_type[TransitionType.NEUTRAL], 0, len(transitions), len(states),
+                                       states, transitions)
+            minimised_clts.label_census = label_census
+            nb_minimised_states = len(states)
+            nb_minimised_transitions = len(transitions)
+
+        print("Minimised CLTS has {} states and {} transitions (instead of {} and {}, reduction ratio: {:.2f})."
+              .format(nb_minimised_states, nb_minimised_transitions, nb_states, len(sources),
+                      len(sources) / nb_minimised_transitions if nb_minimised_transitions > 0 else 1))
+
+        return minimised_clts
+
+
+# Return the block (equivalence class) of each state
+def compute_bisimulation(nb_states, sources, label_ids, targets, colors, state_signatures):
+    # Actions are the (label, color) pairs of the transitions
+    action_ids = {}
+    actions = array("i", (action_ids.setdefault((label_id, color), len(action_ids))
+                          for label_id, color in zip(label_ids, colors)))
+    nb_transitions = len(actions)
+    deterministic = is_deterministic(nb_states, sources, actions)
+
+    # Incoming transitions of each state (reverse CSR)
+    in_offsets = array("i", [0]) * (nb_states + 1)
+
+    for target in targets:
+        in_offsets[target + 1] += 1
+
+    for state in range(nb_states):
+        in_offsets[state + 1] += in_offsets[state]
+
+    positions = in_offsets[:-1]
+    in_transitions = array("i", [0]) * nb_transitions
+
+    for transition in range(nb_transitions):
+        target = targets[transition]
+        in_transitions[positions[target]] = transition
+        positions[target] += 1
+
+    # Initial partition: states having the same signature
+    elements = array("i", sorted(range(nb_states), key=lambda state: state_signatures[state]))
+    position_of = array("i", [0]) * nb_states
+    block_of = array("i", [0]) * nb_states
+    block_starts = array("i")
+    block_ends = array("i")
+
+    for position, state in enumerate(elements):
+        position_of[state] = position
+
+        if position == 0 or state_signatures[state] != state_signatures[elements[position - 1]]:
+            block_starts.append(position)
+            block_ends.append(position)
+
+        block_of[state] = len(block_starts) - 1
+        block_ends[-1] += 1
+
+    # End of the marked states of each block, which are the first ones of its range
+    marked_ends = array("i", block_starts)
+    splitters = list(range(len(block_starts)))
+    is_a_splitter = bytearray([1]) * len(block_starts)
+
+    while splitters:
+        splitter = splitters.pop()
+        is_a_splitter[splitter] = False
+        predecessors_by_action = {}
+
+        for state in elements[block_starts[splitter]:block_ends[splitter]]:
+            for index in range(in_offsets[state], in_offsets[state + 1]):
+                transition = in_transitions[index]
+                predecessors_by_action.setdefault(actions[transition], []).append(sources[transition])
+
+        for predecessors in predecessors_by_action.values():
+            touched_blocks = []
+
+            for state in predecessors:
+                block = block_of[state]
+                position = position_of[state]
+
+                if position < marked_ends[block]:
+                    # Already marked
+                    continue
+
+                if marked_ends[block] == block_starts[block]:
+                    touched_blocks.append(block)
+
+                # Swap the state with the first unmarked state of its block
+                other_state = elements[marked_ends[block]]
+                elements[position] = other_state
+                position_of[other_state] = position
+                elements[marked_ends[block]] = state
+                position_of[state] = marked_ends[block]
+                marked_ends[block] += 1
+
+            for block in touched_blocks:
+                start = block_starts[block]
+                middle = marked_ends[block]
+                end = block_ends[block]
+                marked_ends[block] = start
+
+                if middle == end:
+                    # All the states of the block are marked: it is not split
+                    continue
+
+                # The smaller part becomes the new block, so that relabelling its states is cheap
+                new_block = len(block_starts)
+
+                if middle - start <= end - middle:
+                    block_starts.append(start)
+                    block_ends.append(middle)
+                    block_starts[block] = middle
+                else:
+                    block_starts.append(middle)
+                    block_ends.append(end)
+                    block_ends[block] = middle
+
+                marked_ends.append(block_starts[new_block])
+                marked_ends[block] = block_starts[block]
+
+                for state in elements[block_starts[new_block]:block_ends[new_block]]:
+                    block_of[state] = new_block
+
+                splitters.append(new_block)
+                is_a_splitter.append(True)
+
+                if not deterministic and not is_a_splitter[block]:
+                    splitters.append(block)
+                    is_a_splitter[block] = True
+
+    return block_of
+
+
+def is_deterministic(nb_states, sources, actions):
+    seen = set()
+
+    for source, action in zip(sources, actions):
+        if (source, action) in seen:
+            return False
+
+        seen.add((source, action))
+
+    return True
+
+
+# Return the representative state of each block, numbered by order of discovery from the initial state (which is thus
+# the state 0), and the transitions (inc_state, label_id, out_state, color) between these new states
+def compute_quotient(initial_state, blocks, sources, label_ids, targets, colors):
+    out_transitions = {}
+
+    for transition in range(len(sources)):
+        out_transitions.setdefault(blocks[sources[transition]], []).append(transition)
+
+    new_states = {blocks[initial_state]: 0}
+    representatives = [initial_state]
+    quotient_transitions = []
+    stack = [blocks[initial_state]]
+
+    while stack:
+        block = stack.pop()
+        added_transitions = set()
+
+        for transition in out_transitions.get(block, ()):
+            target_block = blocks[targets[transition]]
+
+            if target_block not in new_states:
+                new_states[target_block] = len(representatives)
+                representatives.append(targets[transition])
+                stack.append(target_block)
+
+            quotient_transition = (new_states[block], label_ids[transition], new_states[target_block],
+                                   colors[transition])
+
+            if quotient_transition not in added_transitions:
+                added_transitions.add(quotient_transition)
+                quotient_transitions.append(quotient_transition)
+
+    if utils.VERBOSE:
+        utils.print_verbose("{} blocks of bisimilar states were found.".format(len(representatives)))
+
+    return representatives, quotient_transitions
@@ -1,27 +1,54 @@
 import itertools
-import sys
 import time
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum
 
 import utils
+from cover_reduction import CoverReduction, split_into_components
 from lts_parser import TransitionType
-from utils import transition_in_set
+from scc import Condensation, compute_successor_arrays
+from set_cover import MinimumCoverSearch, LeastGreenImpactSearch, ApproximateCoverSearch, ParetoFrontSearch, \
+    exhaustive_minimum_covers, exhaustive_least_green_impact_covers, exhaustive_pareto_front, can_be_covered, \
+    popcount, search_in_parallel, compute_deadline
 
 # As this class is dealing with transitions, but consider them uniquely defined by their labels,
 # and not by the tuple (inc_state, out_state, label), all operations dealing with equalities
 # between Transitions (resp. EnhancedTransitions) have been rewritten manually, to consider
-# that 2 transitions are equal as long as they share the same label
+# that 2 transitions are equal as long as they share the same label (i.e., the same label identifier)
+# In the search for patches, the labels of the red (resp. green) transitions reachable from a transition of FRT are
+# represented by a bitmask (a Python integer) over the labels of ART (resp. of the green transitions), so that the
+# union of the transitions reachable from a combination is an OR of integers, and its size a popcount. The masks of all
+# the labels of FRT are computed together, by a single traversal of the CLTS (see compute_reachable_label_masks()).
 
 class Heuristic(Enum):
     MINIMAL_NUMBER_OF_CORRECTIONS = 0
     LESS_IMPACT_ON_GREEN_PART = 1
+    # Approximation for large FRT (see ApproximateCoverSearch in set_cover.py): a single patch is returned, minimising
+    # approximately the number of transitions to patch plus the number of green transitions reachable from each of them
+    GREEDY_APPROXIMATION = 2
+    # All the patches of the Pareto front of (number of transitions, number of green transitions reached), which
+    # contains the patches of the two first heuristics (see ParetoFrontSearch in set_cover.py)
+    PARETO_FRONT = 3
+
+
+# Search of the minimum covers (see set_cover.py):
+# - EXHAUSTIVE: all the combinations of 1, 2, ... transitions are tested (former search, kept as reference)
+# - BRANCH_AND_BOUND: only the combinations that may be smaller than the best ones found so far are explored
+class SearchStrategy(Enum):
+    EXHAUSTIVE = 0
+    BRANCH_AND_BOUND = 1
+
+
+# Extension of the checkpoint files of the searches of patches
+CHECKPOINT_EXTENSION = ".patchc"
 
 
 class EnhancedTransition:
-    def __init__(self, transition, transitions):
+    def __init__(self, transition, red_mask, green_mask):
         self.transition = transition
-        self.reachable_incorrect_transitions = self.compute_reachable_incorrect_transitions(transitions)
-        self.reachable_correct_transitions = None
+        # Bitmasks of the labels of the reachable red/green transitions (see Patcher)
+        self.red_mask = red_mask
+        self.green_mask = green_mask
 
     def __eq__(self, other):
         if isinstance(other, EnhancedTransition):
@@ -34,98 +61,50 @@ class EnhancedTransition:
     def __str__(self):
         return str(self.transition)
 
-    def compute_reachable_incorrect_transitions(self, transitions):
-        reachable_incorrect_transitions = set()
-        # reachable_incorrect_transitions.add(self.transition)
-        transitions_labels = {}
-        visited_states = {}
-
-        for transition in transitions:
-            if transition.label == self.transition.label:
-                if transition.transition_type == TransitionType.INCORRECT and not\
-                        (transition.label in transitions_labels):
-                    reachable_incorrect_transitions.add(transition)
-                    transitions_labels[transition.label] = 1
-                if not transition.transition_type == TransitionType.CORRECT:
-                    self.compute_reachable_incorrect_transitions_rec(transition.out_state,
-                                                                     reachable_incorrect_transitions, visited_states,
-                                                                     transitions_labels)
-
-        return reachable_incorrect_transitions
-
-    # This function now uses a dict to store already visited states and transitions + calls itself recursively only if
-    # the current transition is not a correct transition (performance issues)
-    def compute_reachable_incorrect_transitions_rec(self, current_state, reachable_incorrect_transitions,
-                                                    visited_states, transitions_labels):
-        if current_state.label in visited_states:
-            return
-
-        visited_states[current_state.label] = 1
-
-        for transition in current_state.out_transitions:
-            if transition.transition_type == TransitionType.INCORRECT and \
-                    not (transition.label in transitions_labels):
-                reachable_incorrect_transitions.add(transition)
-                transitions_labels[transition.label] = 1
-            if not transition.transition_type == TransitionType.CORRECT:
-                self.compute_reachable_incorrect_transitions_rec(transition.out_state, reachable_incorrect_transitions,
-                                                                 visited_states, transitions_labels)
-
-    def compute_reachable_correct_transitions(self, transitions):
-        if self.reachable_correct_transitions is not None:
-            # Avoid useless re-computations
-            return
-
-        self.reachable_correct_transitions = set()
-
-        transitions_labels = {}
-        visited_states = {}
-
-        for transition in transitions:
-            if transition.label == self.transition.label:
-                if transition.transition_type == TransitionType.CORRECT and not\
-                        (transition.label in transitions_labels):
-                    self.reachable_correct_transitions.add(transition)
-                    transitions_labels[transition.label] = 1
-                if not transition.transition_type == TransitionType.INCORRECT:
-                    self.compute_reachable_correct_transitions_rec(transition.out_state, visited_states,
-                                                                   transitions_labels)
-
-    # This function now uses a dict to store already visited states and transitions + calls itself recursively only if
-    # the current transition is not an incorrect transition (performance issues)
-    def compute_reachable_correct_transitions_rec(self, current_state, visited_states, transitions_labels):
-        if current_state.label in visited_states:
-            return
-
-        visited_states[current_state.label] = 1
-
-        for transition in current_state.out_transitions:
-            if transition.transition_type == TransitionType.CORRECT and \
-                    not (transition.label in transitions_labels):
-                self.reachable_correct_transitions.add(transition)
-                transitions_labels[transition.label] = 1
-            if not transition.transition_type == TransitionType.INCORRECT:
-                self.compute_reachable_correct_transitions_rec(transition.out_state, visited_states, transitions_labels)
-
 
 class Patcher:
-    def __init__(self, art, frt, urt, heuristic, green_transitions, red_transitions, transitions, time_bound):
+    # The listener (if any) is called with each patch better than the patches found so far, as soon as it is found by
+    # the branch and bound search, along with the index of the component it patches and the number of components. The
+    # searches of the components are checkpointed in the checkpoint file (if any), followed by the index of the
+    # component if there are several of them. If the number of patches is limited, only the first <max_nb_patches>
+    # patches are returned (see BestCovers in set_cover.py), the others being only counted. The time bound starts
+    # with the construction of the Patcher, and all its searches stop at the resulting deadline.
+    def __init__(self, art, frt, urt, heuristic, green_transitions, red_transitions, transitions, time_bound,
+                 search_strategy=SearchStrategy.BRANCH_AND_BOUND, nb_processes=1, checkpoint_file=None, listener=None,
+                 max_nb_patches=None):
+        self.deadline = compute_deadline(time_bound, time.time())
         self.art = art
         self.frt = frt
         self.urt = urt
         self.transitions = transitions
         self.green_transitions = green_transitions
         self.red_transitions = red_transitions
+        # Bit of each label of ART, and of each label of a green transition
+        self.red_bits = compute_label_bits(art)
+        self.green_bits = compute_label_bits(green_transitions)
+        self.art_mask = (1 << len(self.red_bits)) - 1
+        # Masks of the labels of the red and green transitions reachable from each label of FRT
+        self.reachable_label_masks = compute_reachable_label_masks(transitions,
+                                                                   set(transition.label_id for transition in frt),
+                                                                   self.red_bits, self.green_bits)
         self.enhanced_frt = self.compute_enhanced_frt()
         self.enhanced_urt = self.compute_enhanced_urt()
         self.heuristic = heuristic
-        self.time_bound = time_bound
+        self.search_strategy = search_strategy
+        self.nb_processes = nb_processes
+        self.checkpoint_file = checkpoint_file
+        self.listener = listener
+        # False if the search was stopped by the time bound before proving that the patches found are optimal
+        self.optimal = True
+        self.max_nb_patches = max_nb_patches
+        # Number of patches found, including the patches which were not returned
+        self.nb_patches = None
 
     def compute_enhanced_frt(self):
         enhanced_frt = set()
 
         for transition in self.frt:
-            enhanced_transition = EnhancedTransition(transition, self.transitions)
+            enhanced_transition = EnhancedTransition(transition, *self.reachable_label_masks[transition.label_id])
             # if not enhanced_transition_in_set(enhanced_frt, enhanced_transition):
             enhanced_frt.add(enhanced_transition)
 
@@ -159,185 +138,225 @@ class Patcher:
                     utils.print_verbose("Bad case. Some already green transitions will be patched.")
                 possible_patches = (self.patch_red_and_green(self.heuristic), False)
 
+        # All the patches found are returned if their number is not limited
+        if self.nb_patches is None:
+            self.nb_patches = len(possible_patches[0])
+
         return possible_patches
 
     def patch_red_only(self, combination_set):
-        patched = False
-        nb_transitions_to_take = 1
-        patches = set()
+        if self.heuristic == Heuristic.GREEDY_APPROXIMATION:
+            return self.patch_approximately(combination_set, False)
+
+        # Candidates are sorted by label, so that the patches are found in a deterministic order
+        candidates = sorted(combination_set, key=lambda enhanced_transition: enhanced_transition.transition.label)
+        masks = [enhanced_transition.red_mask for enhanced_transition in candidates]
 
         if utils.VERBOSE:
             utils.print_verbose("Combination set has {} elements.".format(len(combination_set)))
+            print_enhanced_transitions("\nCombination set:", candidates)
+            utils.print_verbose("Total number of red transitions: " + str(len(self.art)))
 
-        # Here, we check whether patching a subset of <nb_transitions_to_take> transitions belonging to FRT
-        # suffices to patch all incorrect actions in ART.
-        # If so, we return this subset and all the subsets of same size having the same property.
-        # Otherwise, we go to the next subset.
-        # Once all subsets of size <nb_transitions_to_take> have been tested, we start a new iteration
-        # with all the subsets of size <nb_transitions_to_take + 1>, until reaching the FRT subset itself.
-        while (not patched) and (nb_transitions_to_take <= len(combination_set)):
-            transitions_tuples = set(itertools.combinations(combination_set, nb_transitions_to_take))
-
-            if utils.VERBOSE:
-                # print(combination_set)
-                # print(transitions_tuples)
-                print_enhanced_transitions("\nCombination set:", combination_set)
-                # print_enhanced_transitions_tuples("Transition tuples:", transitions_tuples)
-                utils.print_verbose("Patched: " + str(patched))
-                utils.print_verbose("Tuples size: " + str(nb_transitions_to_take))
-                utils.print_verbose("Total number of red transitions: " + str(len(self.art)))
-
-            for tuple in transitions_tuples:
-                reachable_transitions = set()
-
-                for enhanced_transition in tuple:
-                    for transition in enhanced_transition.reachable_incorrect_transitions:
-                        if not transition_in_set(reachable_transitions, transition):
-                            reachable_transitions.add(transition)
-
-                if utils.VERBOSE:
-                    print_enhanced_transitions("Transition tuples:", tuple)
-                    utils.print_verbose("Number of red transitions reachable from the current tuple: " + str(
-                        len(reachable_transitions)))
-
-                if is_transition_subset(self.art, reachable_transitions):
-                    # This means that patching all the red transitions of the current tuple
-                    # patches all the red transitions in ART
-                    patched = True
-                    # We add the current patch to the list of patches of size <nb_transitions_to_take>
-                    patches.add(tuple)
+        # Here, we look for the smallest subsets of transitions belonging to the combination set
+        # whose patching suffices to patch all incorrect actions in ART, and return all of them.
+        if self.search_strategy == SearchStrategy.EXHAUSTIVE:
+            covers = exhaustive_minimum_covers(masks, self.art_mask, limit=self.max_nb_patches)
+            self.nb_patches = covers.count
 
-            nb_transitions_to_take += 1
+            return [tuple(candidates[candidate] for candidate in cover) for cover in covers]
 
-        return patches
+        # The green part is not impacted: only the red masks matter
+        return self.patch_by_component(candidates, masks, [0] * len(masks), False)
 
     def patch_red_and_green(self, heuristic):
         if heuristic == Heuristic.MINIMAL_NUMBER_OF_CORRECTIONS:
             return self.patch_red_only(self.enhanced_frt)
         elif heuristic == Heuristic.LESS_IMPACT_ON_GREEN_PART:
             return self.patch_red_and_green_with_less_impact_on_green()
+        elif heuristic == Heuristic.GREEDY_APPROXIMATION:
+            return self.patch_approximately(self.enhanced_frt, True)
+        elif heuristic == Heuristic.PARETO_FRONT:
+            return self.patch_red_and_green_on_pareto_front()
         else:
             utils.print_error("Heuristic |{}| is not implemented (yet).".format(heuristic))
             raise Exception()
 
     def patch_red_and_green_with_less_impact_on_green(self):
-        nb_transitions_to_take = 1
-        nb_already_green_transitions_repatched = sys.maxsize  # Infinite
-        patches = set()
+        # In this case, patching 3 transitions may have a smaller impact on the already green part than patching
+        # only 1 or 2 transitions. Thus, a patch is considered better if and only if its impact on the already green
+        # part is strictly smaller than the impact of the current best patch, or if it is equal and the patch is
+        # smaller.
+        candidates = sorted(self.enhanced_frt, key=lambda enhanced_transition: enhanced_transition.transition.label)
+        masks = [enhanced_transition.red_mask for enhanced_transition in candidates]
+        green_masks = [enhanced_transition.green_mask for enhanced_transition in candidates]
 
         if utils.VERBOSE:
             utils.print_verbose("Enhanced FRT has {} elements.".format(len(self.enhanced_frt)))
+            print_enhanced_transitions("\nCombination set:", candidates)
+            utils.print_verbose("Total number of red transitions: " + str(len(self.art)))
+            utils.print_verbose("Total number of green transitions: " + str(len(self.green_bits)))
+
+        if self.search_strategy == SearchStrategy.EXHAUSTIVE:
+            covers = exhaustive_least_green_impact_covers(masks, green_masks, self.art_mask, self.deadline,
+                                                          self.max_nb_patches)
+            self.nb_patches = covers.count
+
+            return [tuple(candidates[candidate] for candidate in cover) for cover in covers]
+
+        return self.patch_by_component(candidates, masks, green_masks, True)
+
+    # The components of the instance (see split_into_components() in cover_reduction.py) are searched independently,
+    # and their patches are combined lazily. The first patches of the components give the first combinations.
+    def patch_by_component(self, candidates, masks, green_masks, least_green_impact):
+        if not can_be_covered(masks, self.art_mask):
+            return set()
+
+        # Without red transitions, the model already satisfies the property: there is nothing to patch
+        if self.art_mask == 0:
+            self.nb_patches = 0
+            return set()
+
+        if self.listener is None:
+            listener = None
+        else:
+            def listener(component, nb_components, cover):
+                self.listener(tuple(candidates[candidate] for candidate in cover), component, nb_components)
+
+        component_covers = search_by_component(masks, green_masks, self.art_mask, least_green_impact,
+                                               self.deadline, self.nb_processes, self.checkpoint_file, listener,
+                                               self.max_nb_patches)
+        self.check_optimality(component_covers, green_masks, least_green_impact)
+        self.nb_patches = 1
+
+        for _, covers, _ in component_covers:
+            self.nb_patches *= covers.count
+
+        return ComponentPatches([[tuple(candidates[component_candidates[candidate]] for candidate in cover)
+                                  for cover in covers]
+                                 for component_candidates, covers, _ in component_covers], self.max_nb_patches)
+
+    # The costs of the patches of the components add up, as do their lower bounds (the green transitions reached by
+    # distinct components being distinct), the lower bound of a completely searched component being its cost
+    def check_optimality(self, component_covers, green_masks, least_green_impact):
+        if all(lower_bound is None for _, _, lower_bound in component_covers):
+            return
 
-        start_time = time.time()
+        nb_green_labels, size, green_lower_bound, size_lower_bound = 0, 0, 0, 0
 
-        # In this case, we need to verify all possible combinations, because
-        # patching 3 transitions may have a smaller impact on the already green part
-        # than patching only 1 or 2 transitions.
-        # Thus, a patch is considered better if and only if its impact on the already
-        # green part is strictly smaller than the impact of the current best patch
-        while nb_transitions_to_take <= len(self.enhanced_frt):
-            time_bound_hit = False
-            executed_time = time.time() - start_time
+        for component_candidates, covers, lower_bound in component_covers:
+            cover = next(iter(covers))
+            green = 0
 
-            #TIME BOUND HITS
-            if len(patches) != 0:
-                if 0 < self.time_bound < executed_time:
-                    break
+            for candidate in cover:
+                green |= green_masks[component_candidates[candidate]]
 
-            transitions_tuples = self.get_transitions_tuples(nb_transitions_to_take, patches)
+            cost = (popcount(green), len(cover)) if least_green_impact else (0, len(cover))
 
-            if transitions_tuples is None:
-                break
+            if lower_bound is None:
+                lower_bound = cost
+            elif not least_green_impact:
+                lower_bound = (0, lower_bound)
 
-            executed_time = time.time() - start_time
+            nb_green_labels, size = nb_green_labels + cost[0], size + cost[1]
+            green_lower_bound, size_lower_bound = green_lower_bound + lower_bound[0], size_lower_bound + lower_bound[1]
 
-            # TIME BOUND HITS
-            if len(patches) != 0:
-                if 0 < self.time_bound < executed_time:
-                    break
+        if (green_lower_bound, size_lower_bound) == (nb_green_labels, size):
+            utils.print_warning("The time bound was reached, but the patches found are optimal. Other optimal "
+                                "patches may be missing.")
+        else:
+            self.optimal = False
+
+            if least_green_impact:
+                utils.print_warning("The time bound was reached: the patches found reach {} green transitions with {} "
+                                    "transitions, and the optimal patches reach at least {} green transitions (with "
+                                    "at least {} transitions if they reach exactly that many).".format(
+                                        nb_green_labels, size, green_lower_bound, size_lower_bound))
+            else:
+                utils.print_warning("The time bound was reached: the patches found have {} transitions, and the "
+                                    "optimal patches at least {}.".format(size, size_lower_bound))
+
+    # The front is printed, and its patches are returned by increasing number of transitions (the first
+    # <max_nb_patches> of them, if their number is limited)
+    def patch_red_and_green_on_pareto_front(self):
+        candidates = sorted(self.enhanced_frt, key=lambda enhanced_transition: enhanced_transition.transition.label)
+        masks = [enhanced_transition.red_mask for enhanced_transition in candidates]
+        green_masks = [enhanced_transition.green_mask for enhanced_transition in candidates]
+
+        if utils.VERBOSE:
+            utils.print_verbose("Enhanced FRT has {} elements.".format(len(self.enhanced_frt)))
+            print_enhanced_transitions("\nCombination set:", candidates)
+
+        if self.search_strategy == SearchStrategy.EXHAUSTIVE:
+            front = exhaustive_pareto_front(masks, green_masks, self.art_mask, self.deadline, self.max_nb_patches)
+        else:
+            reduction = reduce_instance(masks, green_masks, self.art_mask)
+            search = ParetoFrontSearch(reduction.masks, reduction.green_masks, reduction.universe,
+                                       limit=self.max_nb_patches)
+            search.deadline = self.deadline
+            search.reduction = reduction
+            search.checkpoint_file = self.checkpoint_file
+
+            if self.listener is not None:
+                search.listener = lambda cover: self.listener(tuple(candidates[candidate] for candidate in cover), 0, 1)
+
+            front = search.search()
+            self.optimal = search.complete
+
+            if not search.complete:
+                utils.print_warning("The time bound was reached: some points of the Pareto front may be missing, "
+                                    "and the points found may not be on it.")
 
             if utils.VERBOSE:
-                # print(combination_set)
-                # print(transitions_tuples)
-                print_enhanced_transitions("\nCombination set:", self.enhanced_frt)
-                # print_enhanced_transitions_tuples("Transition tuples:", transitions_tuples)
-                # print("Patched: " + str(patched))
-                utils.print_verbose("Tuples size: " + str(nb_transitions_to_take))
-                utils.print_verbose("Total number of red transitions: " + str(len(self.art)))
-
-            for tuple in transitions_tuples:
-                reachable_correct_transitions = set()
-                reachable_incorrect_transitions = set()
-
-                executed_time = time.time() - start_time
-
-                # TIME BOUND HITS
-                if len(patches) != 0:
-                    if 0 < self.time_bound < executed_time:
-                        time_bound_hit = True
-                        break
-
-                for enhanced_transition in tuple:
-                    try:
-                        for elem in enhanced_transition:
-                            print("Current transition is iterable: " + str(elem))
-                    except TypeError:
-                        pass
-                        #print(enhanced_transition, 'is not iterable')
-
-                    if not isinstance(enhanced_transition, EnhancedTransition):
-                        print(type(enhanced_transition))
-                        print(enhanced_transition)
-
-                    enhanced_transition.compute_reachable_correct_transitions(self.transitions)
-
-                    for transition in enhanced_transition.reachable_correct_transitions:
-                        if not transition_in_set(reachable_correct_transitions, transition):
-                            reachable_correct_transitions.add(transition)
-
-                    for transition in enhanced_transition.reachable_incorrect_transitions:
-                        if not transition_in_set(reachable_incorrect_transitions, transition):
-                            reachable_incorrect_transitions.add(transition)
-
-                executed_time = time.time() - start_time
-
-                # TIME BOUND HITS
-                if len(patches) != 0:
-                    if 0 < self.time_bound < executed_time:
-                        time_bound_hit = True
-                        break
+                utils.print_verbose("Branch and bound search explored {} nodes.".format(search.nb_nodes))
 
-                if utils.VERBOSE:
-                    print_enhanced_transitions("Transition tuples:", tuple)
-                    utils.print_verbose("Number of red transitions reachable from the current tuple: " + str(
-                        len(reachable_incorrect_transitions)))
-                    utils.print_verbose("Number of green transitions reachable from the current tuple: " + str(
-                        len(reachable_correct_transitions)))
-
-                if is_transition_subset(self.art, reachable_incorrect_transitions):
-                    if len(reachable_correct_transitions) < nb_already_green_transitions_repatched:
-                        # A better patch (i.e., correcting less already green parts) was found.
-                        # Remove all patches previously found, and store the current one.
-                        nb_already_green_transitions_repatched = len(reachable_correct_transitions)
-                        patches.clear()
-                        patches.add(tuple)
-                    elif len(reachable_correct_transitions) == nb_already_green_transitions_repatched:
-                        # A patch touching the same number of already green parts was found.
-                        # If it has the same size, put it in the list
-                        # If it is smaller, clear the list and put it in
-                        # If it is bigger, ignore it
-                        if len(patches) == 0 or len(next(iter(patches))) == nb_transitions_to_take:
-                            patches.add(tuple)
-                        elif nb_transitions_to_take < len(next(iter(patches))):
-                            patches.clear()
-                            patches.add(tuple)
-
-            if time_bound_hit:
-                break
-
-            nb_transitions_to_take += 1
-
-        return patches
+        print("Pareto front of the patches:")
+
+        for size, nb_green_labels in sorted(front):
+            print("    - {} transitions reaching {} green transitions: {} patches".format(
+                size, nb_green_labels, front[size, nb_green_labels].count))
+
+        self.nb_patches = sum(covers.count for covers in front.values())
+
+        return list(itertools.islice((tuple(candidates[candidate] for candidate in cover)
+                                      for point in sorted(front) for cover in front[point]), self.max_nb_patches))
+
+    # The weight of a transition is 1, plus the number of green transitions reachable from it if the green part is
+    # impacted. The quality of the patch found is printed, as it may not be optimal.
+    def patch_approximately(self, combination_set, impacts_green):
+        candidates = sorted(combination_set, key=lambda enhanced_transition: enhanced_transition.transition.label)
+        masks = [enhanced_transition.red_mask for enhanced_transition in candidates]
+
+        if impacts_green:
+            weights = [1 + popcount(enhanced_transition.green_mask) for enhanced_transition in candidates]
+        else:
+            weights = [1] * len(candidates)
+
+        if utils.VERBOSE:
+            utils.print_verbose("Combination set has {} elements.".format(len(combination_set)))
+            print_enhanced_transitions("\nCombination set:", candidates)
+            utils.print_verbose("Total number of red transitions: " + str(len(self.art)))
+
+        search = ApproximateCoverSearch(masks, weights, self.art_mask)
+        cover = search.search()
+
+        if cover is None:
+            return set()
+
+        # Without red transitions, the model already satisfies the property: there is nothing to patch
+        if not cover:
+            self.nb_patches = 0
+            return set()
+
+        print("Approximate patch of weight {} (weight of the greedy patch: {}, {} transitions dropped and {} "
+              "replaced).".format(search.weight, search.greedy_weight, search.nb_drops, search.nb_swaps))
+        print("The optimal patches weigh at least {}: the patch is at most {:.2f} times heavier than them (greedy "
+              "guarantee: H({}) = {:.2f} <= ln({}) + 1 = {:.2f}).".format(search.lower_bound,
+                                                                         search.weight / search.lower_bound,
+                                                                         search.max_coverage, search.harmonic_bound,
+                                                                         search.max_coverage,
+                                                                         search.logarithmic_bound))
+
+        return {tuple(candidates[candidate] for candidate in cover)}
 
     def all_transitions_can_be_corrected_without_patching_green(self):
         # Here, we check whether there exists a set of actions belonging
@@ -347,105 +366,217 @@ class Patcher:
         # correct all incorrect actions in ART.
         # Can maybe be improved by taking a smaller subset of actions
         # belonging to URT instead of URT itself (more complex).
-        art_copy = deepcopy(self.art)
+        patched_transitions = 0
 
-        for enhanced_trans in self.enhanced_frt:
-            if art_copy == set():
-                # All actions belonging to ART have been patched
-                break
-
-            if transition_in_set(self.urt, enhanced_trans.transition):
-                # We remove all transitions patched by patching the current URT transition
-                for transition in enhanced_trans.reachable_incorrect_transitions:
-                    discard_transition(art_copy, transition)
+        for enhanced_trans in self.enhanced_urt:
+            # We add all transitions patched by patching the current URT transition
+            patched_transitions |= enhanced_trans.red_mask
 
         # Return True if all ART actions have been patched, False otherwise
-        return art_copy == set()
-
-    def get_transitions_tuples(self, nb_transitions_to_take, current_patches):
-        if True and current_patches == set():
-            return set(itertools.combinations(self.enhanced_frt, nb_transitions_to_take))
-        else:
-            print("V2")
-            set_list = set()
-
-            for patch in current_patches:
-                copied_frt = deepcopy(self.enhanced_frt)
-
-                for copied_transition in set(copied_frt):
-                    for patch_transition in patch:
-                        if patch_transition.transition.label == copied_transition.transition.label:
-                            copied_frt.remove(copied_transition)
-
-                max_nb_actions = len(patch) - 1
-                min_frt_size = nb_transitions_to_take - max_nb_actions
+        return patched_transitions == self.art_mask
 
-                print(str(copied_frt))
 
-                if len(copied_frt) < min_frt_size:
-                    return None
+# Patches obtained by combining one patch of each component of the instance. They are only built when iterated,
+# and their number is the product of the numbers of patches of the components (at most <limit>, the first combinations
+# being kept, if it is not None). There is no patch without components.
+class ComponentPatches:
+    def __init__(self, component_patches, limit=None):
+        self.component_patches = component_patches
+        self.limit = limit
 
-                final_combinations = set()
+    def __len__(self):
+        if not self.component_patches:
+            return 0
 
-                for size in range(min_frt_size, nb_transitions_to_take):
-                    frt_subset = set(itertools.combinations(copied_frt, size))
-                    print(str(frt_subset))
-                    patch_subset = set() if min_frt_size == nb_transitions_to_take else set(itertools.combinations(patch, nb_transitions_to_take - size))
-                    print(str(patch_subset))
-                    combinations = frt_subset if patch_subset == set() else set(itertools.product(frt_subset, patch_subset))
-                    final_combinations.update(combinations)
+        nb_patches = 1
 
-                if set_list == set():
-                    set_list = final_combinations
-                else:
-                    set_list = set_list.intersection(final_combinations)
+        for patches in self.component_patches:
+            nb_patches *= len(patches)
 
-            return set_list
+        return nb_patches if self.limit is None else min(nb_patches, self.limit)
 
+    def __iter__(self):
+        if not self.component_patches:
+            return
 
-def deepcopy(transitions_set):
-    new_set = set()
-
-    for transition in transitions_set:
-        new_set.add(transition)
-
-    return new_set
+        for combination in itertools.islice(itertools.product(*self.component_patches), self.limit):
+            yield tuple(itertools.chain.from_iterable(combination))
+
+
+# Return the candidates of each component of the instance, with the optimal covers of the component (a BestCovers of
+# tuples of indexes in its candidates, keeping at most <limit> covers) and the lower bound of their cost if the search
+# was stopped by the deadline (a time as returned by time.time(), or None), which is the same for all the components.
+# If several processes are allowed, the components are searched in parallel, or the branches of the search of the
+# component if there is a single one. The listener is called with the index of the component, the number of
+# components, and each better cover of the component (as indexes in the candidates of the instance), unless components
+# are searched in parallel.
+def search_by_component(masks, green_masks, universe, least_green_impact, deadline, nb_processes,
+                        checkpoint_file=None, listener=None, limit=None):
+    components = split_into_components(masks, green_masks, universe)
+    instances = [([masks[candidate] for candidate in component_candidates],
+                  [green_masks[candidate] for candidate in component_candidates], labels, least_green_impact,
+                  deadline, limit) for component_candidates, labels in components]
+    checkpoint_files = [checkpoint_file if checkpoint_file is None or len(components) == 1
+                        else "{}.{}".format(checkpoint_file, component) for component in range(len(components))]
+
+    if utils.VERBOSE:
+        utils.print_verbose("Instance split into {} independent components of {} transitions.".format(
+            len(components), ", ".join(str(len(component_candidates)) for component_candidates, _ in components)))
+
+    if nb_processes > 1 and len(components) > 1:
+        with ProcessPoolExecutor(min(nb_processes, len(components))) as executor:
+            component_covers = list(executor.map(search_component, *zip(*instances), itertools.repeat(1),
+                                                 checkpoint_files))
+    else:
+        # The search of a single component is itself split between the processes
+        component_covers = [search_component(*instance, nb_processes, component_checkpoint_file,
+                                             component_listener(listener, component, len(components),
+                                                                component_candidates))
+                            for component, (instance, component_checkpoint_file, (component_candidates, _))
+                            in enumerate(zip(instances, checkpoint_files, components))]
+
+    return [(component_candidates, covers, lower_bound)
+            for (component_candidates, _), (covers, lower_bound) in zip(components, component_covers)]
+
+
+def component_listener(listener, component, nb_components, component_candidates):
+    if listener is None:
+        return None
+
+    return lambda cover: listener(component, nb_components,
+                                  tuple(component_candidates[candidate] for candidate in cover))
+
+
+# Search of the optimal covers of a component, run in a separate process in parallel mode: only integers are exchanged.
+# Return the covers, and the lower bound of their cost if the search was stopped by the deadline. The search expands
+# the covers of the reduced instance into covers of the component, with which the listener is called.
+def search_component(masks, green_masks, universe, least_green_impact, deadline, limit=None, nb_processes=1,
+                     checkpoint_file=None, listener=None):
+    reduction = reduce_instance(masks, green_masks, universe)
+
+    if least_green_impact:
+        search = LeastGreenImpactSearch(reduction.masks, reduction.green_masks, reduction.universe, limit=limit)
+    else:
+        search = MinimumCoverSearch(reduction.masks, reduction.universe, limit=limit)
+
+    search.deadline = deadline
+    search.reduction = reduction
+    search.checkpoint_file = checkpoint_file
+    search.listener = listener
+
+    if nb_processes > 1:
+        covers = search_in_parallel(search, nb_processes)
+    else:
+        covers = search.search()
+
+    if utils.VERBOSE:
+        utils.print_verbose("Branch and bound search explored {} nodes.".format(search.nb_nodes))
+
+        if least_green_impact and search.covers:
+            utils.print_verbose("Best patches reach {} green transitions.".format(search.best_cost[0]))
+
+    return covers, search.lower_bound
+
+
+# The searches run on the instance reduced by merging equivalent transitions, removing dominated transitions, and
+# removing the red labels implied by others (see cover_reduction.py)
+def reduce_instance(masks, green_masks, universe):
+    reduction = CoverReduction(masks, green_masks, universe)
+    reduction.reduce()
+
+    if utils.VERBOSE:
+        utils.print_verbose("Reduced instance has {} transitions ({} equivalent and {} dominated transitions removed) "
+                            "and {} red labels ({} implied labels removed).".format(
+                                len(reduction.kept), reduction.nb_equivalent_candidates,
+                                reduction.nb_dominated_candidates, popcount(reduction.universe),
+                                reduction.nb_implied_labels))
+
+    return reduction
 
 
 def enhanced_transition_in_set(set, enhanced_transition):
     for current_transition in set:
-        if enhanced_transition.transition.label == current_transition.transition.label:
+        if enhanced_transition.transition.label_id == current_transition.transition.label_id:
             return True
     return False
 
 
-# Used to check whether all the transitions (~ label) belonging to set a
-# belong to set b.
-def is_transition_subset(a, b):
-    for this_transition in a:
-        found = False
+# Return the masks of the labels of the red and green transitions reachable from each of the given labels, computed for
+# all of them at once. The red transitions reachable from a transition are reached through the transitions which are not
+# green, and the green ones through the transitions which are not red: each state of these two subgraphs is given the
+# mask of the labels of the red (resp. green) transitions leaving it, and the masks are propagated over the
+# condensation of the subgraph (see scc.py). A transition then reaches its own label if it is red (resp. green), and the
+# labels reachable from its target state if it is not green (resp. not red).
+def compute_reachable_label_masks(transitions, label_ids, red_bits, green_bits):
+    # Transitions of each of the given labels
+    label_transitions = {label_id: [] for label_id in label_ids}
+    red_edges = []
+    green_edges = []
+    # Masks of the labels of the red (resp. green) transitions leaving each state having some
+    red_leaving = {}
+    green_leaving = {}
+    nb_states = 0
+
+    for transition in transitions:
+        label_id = transition.label_id
+        transition_type = transition.transition_type
+        source = transition.inc_state.label
+        target = transition.out_state.label
+        nb_states = max(nb_states, source + 1, target + 1)
+
+        if label_id in label_transitions:
+            label_transitions[label_id].append((transition_type, target))
+
+        if transition_type == TransitionType.INCORRECT:
+            red_leaving[source] = red_leaving.get(source, 0) | red_bits[label_id]
+            red_edges.append((source, target))
+        elif transition_type == TransitionType.CORRECT:
+            green_leaving[source] = green_leaving.get(source, 0) | green_bits[label_id]
+            green_edges.append((source, target))
+        else:
+            red_edges.append((source, target))
+            green_edges.append((source, target))
+
+    red_reachable = propagate_leaving_masks(nb_states, red_edges, red_leaving)
+    green_reachable = propagate_leaving_masks(nb_states, green_edges, green_leaving)
+    masks = {}
+
+    for label_id, targets in label_transitions.items():
+        red_mask = 0
+        green_mask = 0
+
+        for transition_type, target in targets:
+            if transition_type == TransitionType.INCORRECT:
+                red_mask |= red_bits[label_id] | red_reachable[target]
+            elif transition_type == TransitionType.CORRECT:
+                green_mask |= green_bits[label_id] | green_reachable[target]
+            else:
+                red_mask |= red_reachable[target]
+                green_mask |= green_reachable[target]
+
+        masks[label_id] = (red_mask, green_mask)
+
+    return masks
+
 
-        for that_transition in b:
-            if this_transition.label == that_transition.label:
-                found = True
-                break
+# Return, for each state, the union of the masks of the states it reaches through the given edges (itself included)
+def propagate_leaving_masks(nb_states, edges, leaving_masks):
+    condensation = Condensation(nb_states, *compute_successor_arrays(nb_states, edges))
+    values = [0] * condensation.nb_components
 
-        if not found:
-            return False
+    for state, mask in leaving_masks.items():
+        values[condensation.component(state)] |= mask
 
-    return True
+    condensation.propagate(values)
 
+    return [values[component] for component in condensation.components]
 
-def discard_transition(set, transition):
-    element = None
 
-    for current_trans in set:
-        if current_trans.label == transition.label:
-            element = current_trans
-            break
+# Give a bit to each label of the given transitions, by increasing label identifier
+def compute_label_bits(transitions):
+    label_ids = sorted(set(transition.label_id for transition in transitions))
 
-    if element is not None:
-        set.discard(element)
+    return {label_id: 1 << index for index, label_id in enumerate(label_ids)}
 
 
 def print_enhanced_transitions(msg, transitions):
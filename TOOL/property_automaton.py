@@ -0,0 +1,98 @@
+from array import array
+
+from label_table import LABELS
+from utils import parse_property_label_ids
+
+
+# Automaton recognizing the sequences of labels containing the sequence of an INEVITABLE("<task1>", "<task2>", ...)
+# property. Its states are the advancements 0..len(property) in the property, the last one being accepting.
+# Transitions are stored in a dense table indexed by advancement and label identifier, so that the advancement
+# reached by a transition of the LTS is a single lookup. Labels interned after the compilation (which thus do
+# not appear in the property) do not change the advancement.
+class PropertyAutomaton:
+    def __init__(self, label_ids):
+        self.label_ids = list(label_ids)
+        self.length = len(self.label_ids)
+        self.nb_labels = len(LABELS)
+        self.table = array("i", [0]) * ((self.length + 1) * self.nb_labels)
+
+        for advancement in range(self.length + 1):
+            row = advancement * self.nb_labels
+            self.table[row: row + self.nb_labels] = array("i", [advancement]) * self.nb_labels
+
+            if advancement < self.length:
+                self.table[row + self.label_ids[advancement]] = advancement + 1
+
+    def __str__(self):
+        return "INEVITABLE({})".format(", ".join("\"{}\"".format(LABELS.name(label_id))
+                                                 for label_id in self.label_ids))
+
+    def next_advancement(self, advancement, label_id):
+        if label_id >= self.nb_labels:
+            return advancement
+
+        return self.table[advancement * self.nb_labels + label_id]
+
+    def is_accepting(self, advancement):
+        return advancement == self.length
+
+
+def compile_property(mcl_file):
+    return PropertyAutomaton(parse_property_label_ids(mcl_file))
+
+
+# Trie of several properties, used to explore the product of an LTS with all of them at once.
+# Properties sharing a prefix (such as INEVITABLE("F", "H", "B") and INEVITABLE("F", "H", "X")) share the nodes of
+# this prefix, the advancement of a property being the depth of its node. Sets of properties are represented by
+# integers used as bitsets (bit i for the i-th property), so that the properties reaching the same product state
+# (LTS state, trie node) can be explored together.
+class PropertyTrie:
+    def __init__(self, property_automata):
+        self.property_automata = property_automata
+        self.children = [{}]
+        self.depths = [0]
+        # masks[n] is the set of the properties whose path contains the node n
+        self.masks = [(1 << len(property_automata)) - 1]
+        self.next_nodes = {}
+
+        for index, property_automaton in enumerate(property_automata):
+            node = 0
+
+            for label_id in property_automaton.label_ids:
+                child = self.children[node].get(label_id)
+
+                if child is None:
+                    child = len(self.children)
+                    self.children.append({})
+                    self.depths.append(self.depths[node] + 1)
+                    self.masks.append(0)
+                    self.children[node][label_id] = child
+
+                node = child
+                self.masks[node] |= 1 << index
+
+    def __len__(self):
+        return len(self.children)
+
+    # Return the pairs (next node, set of properties reaching it) obtained by reading the given label from the given
+    # node: the properties continuing with this label move to the child, the others stay on the node
+    def successors(self, node, label_id):
+        key = (node, label_id)
+        successors = self.next_nodes.get(key)
+
+        if successors is not None:
+            return successors
+
+        child = self.children[node].get(label_id)
+
+        if child is None:
+            successors = [(node, self.masks[node])]
+        else:
+            successors = [(child, self.masks[child])]
+
+            if self.masks[node] & ~self.masks[child]:
+                successors.append((node, self.masks[node] & ~self.masks[child]))
+
+        self.next_nodes[key] = successors
+
+        return successors
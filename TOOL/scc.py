@@ -0,0 +1,161 @@
+from array import array
+
+# Condensation of a graph whose vertices are the integers 0..nb_vertices - 1 and whose edges are given as
+# compressed sparse rows: the successors of vertex v are targets[offsets[v]:offsets[v + 1]].
+# Strongly connected components are computed by an iterative version of Tarjan's algorithm, which numbers them
+# in reverse topological order: the successors of a component always have smaller numbers. Reachability facts
+# can thus be computed for all the vertices by a single pass over the components (see propagate()).
+
+
+class Condensation:
+    def __init__(self, nb_vertices, offsets, targets):
+        self.nb_vertices = nb_vertices
+        self.components, self.nb_components = compute_components(nb_vertices, offsets, targets)
+        self.dag_offsets, self.dag_targets = compute_dag(self.components, self.nb_components, nb_vertices, offsets,
+                                                         targets)
+
+    def component(self, vertex):
+        return self.components[vertex]
+
+    # <values> contains one value per component (booleans, or integers used as bitsets). Each value is replaced
+    # by the union (|) of the values of all the components reachable from this component, itself included.
+    def propagate(self, values):
+        dag_offsets = self.dag_offsets
+        dag_targets = self.dag_targets
+
+        for component in range(self.nb_components):
+            value = values[component]
+
+            for successor in dag_targets[dag_offsets[component]:dag_offsets[component + 1]]:
+                value |= values[successor]
+
+            values[component] = value
+
+        return values
+
+    # Return, for each component, whether it can reach one of the given vertices
+    def can_reach(self, vertices):
+        values = bytearray(self.nb_components)
+
+        for vertex in vertices:
+            values[self.components[vertex]] = True
+
+        return self.propagate(values)
+
+
+# Build the compressed sparse rows of the graph made of the given (source, target) edges
+def compute_successor_arrays(nb_vertices, edges):
+    edges = list(edges)
+    offsets = array("i", [0]) * (nb_vertices + 1)
+
+    for source, _ in edges:
+        offsets[source + 1] += 1
+
+    for vertex in range(nb_vertices):
+        offsets[vertex + 1] += offsets[vertex]
+
+    positions = array("i", offsets)
+    targets = array("i", [0]) * len(edges)
+
+    for source, target in edges:
+        targets[positions[source]] = target
+        positions[source] += 1
+
+    return offsets, targets
+
+
+# Each frame of the explicit call stack is a pair (vertex, position of the next successor to explore)
+def compute_components(nb_vertices, offsets, targets):
+    indexes = array("i", [-1]) * nb_vertices
+    lowlinks = array("i", [0]) * nb_vertices
+    on_stack = bytearray(nb_vertices)
+    components = array("i", [-1]) * nb_vertices
+    stack = []
+    nb_indexes = 0
+    nb_components = 0
+
+    for root in range(nb_vertices):
+        if indexes[root] != -1:
+            continue
+
+        indexes[root] = lowlinks[root] = nb_indexes
+        nb_indexes += 1
+        stack.append(root)
+        on_stack[root] = True
+        call_stack = [(root, offsets[root])]
+
+        while call_stack:
+            vertex, position = call_stack[-1]
+            end = offsets[vertex + 1]
+
+            while position < end:
+                successor = targets[position]
+                position += 1
+
+                if indexes[successor] == -1:
+                    call_stack[-1] = (vertex, position)
+                    indexes[successor] = lowlinks[successor] = nb_indexes
+                    nb_indexes += 1
+                    stack.append(successor)
+                    on_stack[successor] = True
+                    call_stack.append((successor, offsets[successor]))
+                    break
+                elif on_stack[successor] and indexes[successor] < lowlinks[vertex]:
+                    lowlinks[vertex] = indexes[successor]
+            else:
+                call_stack.pop()
+
+                if lowlinks[vertex] == indexes[vertex]:
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        components[member] = nb_components
+
+                        if member == vertex:
+                            break
+
+                    nb_components += 1
+
+                if call_stack:
+                    parent = call_stack[-1][0]
+
+                    if lowlinks[vertex] < lowlinks[parent]:
+                        lowlinks[parent] = lowlinks[vertex]
+
+    return components, nb_components
+
+
+# Edges between distinct components, without duplicates, as compressed sparse rows indexed by component
+def compute_dag(components, nb_components, nb_vertices, offsets, targets):
+    members_offsets = array("i", [0]) * (nb_components + 1)
+
+    for vertex in range(nb_vertices):
+        members_offsets[components[vertex] + 1] += 1
+
+    for component in range(nb_components):
+        members_offsets[component + 1] += members_offsets[component]
+
+    positions = array("i", members_offsets)
+    members = array("i", [0]) * nb_vertices
+
+    for vertex in range(nb_vertices):
+        members[positions[components[vertex]]] = vertex
+        positions[components[vertex]] += 1
+
+    # last_source[d] == c when the edge c -> d has already been added
+    last_source = array("i", [-1]) * nb_components
+    dag_offsets = array("i", [0]) * (nb_components + 1)
+    dag_targets = array("i")
+
+    for component in range(nb_components):
+        for vertex in members[members_offsets[component]:members_offsets[component + 1]]:
+            for successor in targets[offsets[vertex]:offsets[vertex + 1]]:
+                successor_component = components[successor]
+
+                if successor_component != component and last_source[successor_component] != component:
+                    last_source[successor_component] = component
+                    dag_targets.append(successor_component)
+
+        dag_offsets[component + 1] = len(dag_targets)
+
+    return dag_offsets, dag_targets
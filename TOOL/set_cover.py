@@ -0,0 +1,1242 @@
+import hashlib
+import heapq
+import itertools
+import math
+import multiprocessing
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+import utils
+from utils import run_without_recursion, print_warning
+
+# Search engines used by the Patcher to find the combinations of FRT transitions (the candidates) patching all the
+# red transitions of ART (the universe). Each candidate is given by the bitmask of the ART labels it covers (and, when
+# the green part may be patched, by the bitmask of the green labels it reaches), and the engines return combinations
+# as sorted tuples of candidate indexes.
+#
+# The searches are branch and bound searches:
+# - Each node of the search chooses one of the candidates covering the uncovered label covered by the fewest
+#   candidates. In the i-th branch, the i - 1 previous candidates are forbidden, so that each cover is enumerated once.
+#   Every irredundant cover (in which each candidate covers a label that the others do not cover) is found this way,
+#   which includes all the optimal covers.
+# - A node is pruned when the number of chosen candidates, plus a lower bound of the number of candidates still
+#   needed, exceeds the size of the best covers found so far. The lower bound is the largest of the number of
+#   uncovered labels divided by the largest number of them covered by an allowed candidate, and of the number of
+#   uncovered labels pairwise covered by distinct candidates.
+# - The search starts with the cost of a greedy cover as bound.
+# - The covers found are kept in a BestCovers, which only keeps the first covers in lexicographic order when the number
+#   of covers is limited. When the instance of the search is a reduced instance (see cover_reduction.py), each cover
+#   found is replaced by its expansions, so that the covers of the original instance are kept and counted. Expansions
+#   made of equivalent candidates are counted together, only those which may be kept being enumerated.
+#
+# The searches are anytime searches:
+# - The listener of a search (if any) is called with each cover better than all the covers found so far, as soon as it
+#   is found.
+# - The time bound is a hard limit: it gives the deadline of the search (see compute_deadline()), which may also be
+#   set before the search, so that several searches stop at the same time. Once the deadline is exceeded, the covers
+#   found so far (or the initial cover, if none was found) are returned, and the search is marked as incomplete. The
+#   lower bound of the cost of the optimal covers is then computed, giving the optimality gap of the covers returned.
+#   The deadline is also checked while a cover is expanded (see add_cover()).
+# - The search can be checkpointed: its state (the branches left to search, the best covers found so far and their
+#   cost) is saved in the checkpoint file every CHECKPOINT_PERIOD seconds, when the search is stopped, and when it
+#   ends. A search of the same instance given the same checkpoint file resumes from the saved state. The search is
+#   only stopped or checkpointed at the beginning of a node: the branches left to search are then this node, followed
+#   by the siblings not searched yet of the node and of each of its ancestors (see remaining_branches()), so that no
+#   node is searched twice. When it is stopped while expanding the cover of a leaf, the leaf itself is not left to
+#   search.
+# As in the former exhaustive search, the exhaustive searches ignore the deadline while no cover was found.
+
+# The deadline is only checked every TIME_CHECK_PERIOD nodes (or expanded covers)
+TIME_CHECK_PERIOD = 1024
+# The bound shared by the processes of a parallel search is read every SHARED_BOUND_PERIOD nodes
+SHARED_BOUND_PERIOD = 64
+BRANCHES_PER_PROCESS = 8
+# In seconds
+CHECKPOINT_PERIOD = 60
+# Number of bits from which a mask is considered large by iterate_bits()
+LARGE_MASK_LENGTH = 256
+
+
+# Covers of the same cost found by a search. Only the first <limit> of them in lexicographic order are kept (all of them
+# if <limit> is None), the others being only counted, so that the memory used does not depend on the number of covers
+# found. The covers of the same cost having the same size, the negations of the kept covers are stored in a heap, whose
+# root is the negation of the last kept cover.
+class BestCovers:
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.kept = []
+        # Last kept cover, once <limit> covers are kept: most covers found are then compared to it and dropped
+        self.last = None
+        # Number of covers found, kept or not
+        self.count = 0
+
+    def __len__(self):
+        return len(self.kept)
+
+    # The kept covers are iterated in lexicographic order
+    def __iter__(self):
+        if self.limit is None:
+            return iter(sorted(self.kept))
+
+        return iter(sorted(negate(negation) for negation in self.kept))
+
+    def add(self, cover):
+        self.count += 1
+        self.keep(cover)
+
+    def keep(self, cover):
+        if self.limit is None:
+            self.kept.append(cover)
+        elif len(self.kept) < self.limit:
+            heapq.heappush(self.kept, negate(cover))
+
+            if len(self.kept) == self.limit:
+                self.last = negate(self.kept[0])
+        elif cover < self.last:
+            heapq.heapreplace(self.kept, negate(cover))
+            self.last = negate(self.kept[0])
+
+    # Add the covers made of one candidate of each list, the lists being sorted and disjoint. They are counted by the
+    # product of the sizes of the lists, and only the covers which may be kept are enumerated, in lexicographic order.
+    def add_combinations(self, lists):
+        self.count += math.prod(len(candidates) for candidates in lists)
+
+        if self.limit is None:
+            self.kept.extend(tuple(sorted(combination)) for combination in itertools.product(*lists))
+            return
+
+        for cover in iterate_sorted_combinations(lists):
+            if self.last is not None and cover >= self.last:
+                break
+
+            self.keep(cover)
+
+    # Add the covers of the same cost found by another search
+    def merge(self, covers):
+        self.count += covers.count
+
+        for cover in covers:
+            self.keep(cover)
+
+
+class CoverSearch:
+    def __init__(self, masks, universe, time_bound=-1, limit=None):
+        self.masks = masks
+        self.universe = universe
+        self.time_bound = time_bound
+        # covering[label] is the bitmask of the candidates covering the label
+        self.covering = compute_covering_candidates(masks, universe)
+        # Number of covers kept (see BestCovers)
+        self.limit = limit
+        self.covers = BestCovers(limit)
+        # Reduction of the original instance into the instance of the search (see cover_reduction.py), if any
+        self.reduction = None
+        self.nb_nodes = 0
+        self.complete = True
+        self.start_time = None
+        # Time (as returned by time.time()) at which the search stops, which is the time bound after the start of the
+        # search unless it is set before (e.g. by a Patcher, so that all its searches stop at the same time)
+        self.deadline = None
+        # Bound shared with the other processes searching the same instance (see search_in_parallel())
+        self.shared_bound = None
+        # Function called with each cover better than the covers found so far
+        self.listener = None
+        # Cover returned if the time bound is reached before any cover is found
+        self.initial_cover = None
+        # Lower bound of the cost of the optimal covers, when the search is incomplete (None if it is not known)
+        self.lower_bound = None
+        self.checkpoint_file = None
+        self.checkpoint_time = None
+        # Branches left to search, the next one being the last, and branch being searched
+        self.pending = []
+        self.branch = None
+        # Branches left to search when the search was stopped, in the order of the search
+        self.remaining = None
+
+    def search(self):
+        if not can_be_covered(self.masks, self.universe):
+            return self.covers
+
+        self.initialise_bound()
+        self.start_time = time.time()
+        self.checkpoint_time = self.start_time
+
+        if self.deadline is None:
+            self.deadline = compute_deadline(self.time_bound, self.start_time)
+
+        remaining = self.load_checkpoint()
+        self.pending = [(self.universe, 0, [], self.initial_cost())] if remaining is None else remaining[::-1]
+
+        while self.pending and self.complete:
+            self.branch = self.pending.pop()
+            run_without_recursion(self.search_branch_rec())
+
+        if self.complete:
+            self.save_checkpoint([])
+        else:
+            self.lower_bound = self.compute_lower_bound(self.remaining)
+            self.save_checkpoint(self.remaining)
+
+        if not self.covers and self.initial_cover is not None:
+            self.use_initial_cover()
+
+        return self.covers
+
+    # Set the initial bound, and the initial cover
+    def initialise_bound(self):
+        pass
+
+    def use_initial_cover(self):
+        self.add_cover(self.covers, tuple(sorted(self.initial_cover)))
+
+    # Cost of the best covers found so far, as defined by the subclass (None if it has no single best cost)
+    def best(self):
+        return None
+
+    def initial_cost(self):
+        return 0
+
+    # Written as a generator to be run by utils.run_without_recursion(): each recursive call is yielded.
+    # <cost> is the cost of the chosen candidates, as defined by the subclass.
+    def search_rec(self, uncovered, forbidden, chosen, cost):
+        return
+        yield
+
+    # Return the candidates to branch on, in the order in which they are tried
+    def branching_order(self, branching_candidates, uncovered, cost):
+        return list(iterate_bits(branching_candidates))
+
+    # Return the cost of the chosen candidates once the given candidate is chosen
+    def branch_cost(self, cost, candidate):
+        return cost
+
+    # Return a lower bound of the costs of the covers found by a call of search_rec() (None if it finds none, or if
+    # the subclass has no such bound)
+    def branch_lower_bound(self, uncovered, forbidden, chosen, cost):
+        return None
+
+    # The branches searched before the given ones were completely searched
+    def compute_lower_bound(self, branches):
+        if self.best() is None:
+            return None
+
+        lower_bounds = (self.branch_lower_bound(*branch) for branch in branches)
+
+        return min([lower_bound for lower_bound in lower_bounds if lower_bound is not None] + [self.best()])
+
+    # The bound of the subclass (the cost of the best covers found so far), encoded as an integer so that it can be
+    # shared between processes: lower codes are better bounds
+    def bound_code(self):
+        return 0
+
+    def set_bound_code(self, code):
+        pass
+
+    # Return the arguments of at least <min_nb_branches> calls of search_rec() (if the search has enough nodes) whose
+    # searches cover the given branches (the whole search by default), in the order of the search, so that these
+    # branches can be searched separately. The search is unfolded level by level, without pruning.
+    def branches(self, min_nb_branches, branches=None):
+        if branches is None:
+            branches = [(self.universe, 0, [], self.initial_cost())]
+
+        unfolded = True
+
+        while len(branches) < min_nb_branches and unfolded:
+            unfolded = False
+            next_branches = []
+
+            for branch in branches:
+                sub_branches = self.sub_branches(*branch)
+
+                if sub_branches is None:
+                    next_branches.append(branch)
+                else:
+                    next_branches.extend(sub_branches)
+                    unfolded = True
+
+            branches = next_branches
+
+        return branches
+
+    # The chosen candidates of the branch are copied, as search_rec() modifies them while searching it
+    def search_branch_rec(self):
+        uncovered, forbidden, chosen, cost = self.branch
+
+        return self.search_rec(uncovered, forbidden, list(chosen), cost)
+
+    # Return the branches left to search when the search reaches the node of the given chosen candidates, before
+    # searching it: the node, the siblings of the node and of its ancestors in the current branch which follow them, and
+    # the pending branches, in the order of the search
+    def remaining_branches(self, chosen):
+        branch = self.branch
+        following_siblings = []
+
+        for candidate in chosen[len(branch[2]):]:
+            sub_branches = self.sub_branches(*branch)
+            index = next(index for index, sub_branch in enumerate(sub_branches) if sub_branch[2][-1] == candidate)
+            following_siblings.append(sub_branches[index + 1:])
+            branch = sub_branches[index]
+
+        return [branch] + [sibling for siblings in reversed(following_siblings) for sibling in siblings] \
+            + self.pending[::-1]
+
+    # Return the arguments of the calls of search_rec() made by a node (None if it is a leaf)
+    def sub_branches(self, uncovered, forbidden, chosen, cost):
+        if uncovered == 0:
+            return None
+
+        branching_candidates, _ = self.analyse_uncovered_labels(uncovered, forbidden)
+
+        if branching_candidates is None:
+            return []
+
+        sub_branches = []
+
+        for candidate in self.branching_order(branching_candidates, uncovered, cost):
+            sub_branches.append((uncovered & ~self.masks[candidate], forbidden, chosen + [candidate],
+                                 self.branch_cost(cost, candidate)))
+            forbidden |= 1 << candidate
+
+        return sub_branches
+
+    # Single pass over the uncovered labels, returning the allowed candidates covering the rarest one (None if one
+    # of them cannot be covered anymore), and a lower bound of the number of candidates needed to cover them
+    def analyse_uncovered_labels(self, uncovered, forbidden):
+        covering = self.covering
+        branching_candidates = None
+        nb_branching_candidates = None
+        useful_candidates = 0
+        packing_candidates = 0
+        nb_packed_labels = 0
+
+        for label in iterate_bits(uncovered):
+            candidates = covering[label] & ~forbidden
+            nb_candidates = popcount(candidates)
+
+            if nb_candidates == 0:
+                return None, 0
+
+            if nb_branching_candidates is None or nb_candidates < nb_branching_candidates:
+                branching_candidates = candidates
+                nb_branching_candidates = nb_candidates
+
+            # Labels pairwise covered by distinct candidates each need their own candidate
+            if candidates & packing_candidates == 0:
+                packing_candidates |= candidates
+                nb_packed_labels += 1
+
+            useful_candidates |= candidates
+
+        masks = self.masks
+        max_coverage = max(popcount(masks[candidate] & uncovered) for candidate in iterate_bits(useful_candidates))
+
+        return branching_candidates, max(nb_packed_labels, ceil_division(popcount(uncovered), max_coverage))
+
+    # Called at the beginning of each node of the search, with its chosen candidates: the bound is exchanged with the
+    # other processes, the deadline checked, and the search checkpointed. Once the deadline is reached, every node
+    # stops, so that the search returns as soon as possible.
+    def must_stop(self, chosen):
+        if not self.complete:
+            return True
+
+        if self.shared_bound is not None and self.nb_nodes % SHARED_BOUND_PERIOD == 0:
+            self.read_shared_bound()
+
+        if self.nb_nodes % TIME_CHECK_PERIOD != 0:
+            return False
+
+        current_time = time.time()
+
+        if self.deadline is not None and current_time > self.deadline:
+            self.complete = False
+            self.remaining = self.remaining_branches(chosen)
+        elif self.checkpoint_file is not None and current_time - self.checkpoint_time > CHECKPOINT_PERIOD:
+            self.save_checkpoint(self.remaining_branches(chosen))
+            self.checkpoint_time = current_time
+
+        return not self.complete
+
+    # Add the cover to the covers, or its expansions if the instance is reduced, and return the first of them. The
+    # expansions are added by combinations of classes of equivalent candidates (see cover_reduction.py). The deadline is
+    # also checked while expanding the cover of the leaf of the given chosen candidates (if any): the search then stops
+    # after this leaf, whose expansions are only partly kept and counted.
+    def add_cover(self, covers, cover, chosen=None):
+        if self.reduction is None:
+            covers.add(cover)
+            return cover
+
+        first_cover = None
+
+        for nb_combinations, classes in enumerate(self.reduction.expand_cover_classes(cover), 1):
+            covers.add_combinations(classes)
+
+            if first_cover is None:
+                first_cover = tuple(sorted(candidates[0] for candidates in classes))
+
+            if chosen is not None and nb_combinations % TIME_CHECK_PERIOD == 0 and self.deadline is not None \
+                    and time.time() > self.deadline:
+                self.complete = False
+                self.remaining = self.remaining_branches(chosen)[1:]
+                break
+
+        return first_cover
+
+    # Called with the first cover found having the cost of the best covers, which is better than the covers found before
+    def notify_listener(self, cover):
+        if self.listener is not None:
+            self.listener(cover)
+
+    # Called when better covers are found
+    def share_bound(self):
+        if self.shared_bound is None:
+            return
+
+        with self.shared_bound.get_lock():
+            if self.bound_code() < self.shared_bound.value:
+                self.shared_bound.value = self.bound_code()
+
+    # The covers found so far are not optimal anymore if another process found better ones
+    def read_shared_bound(self):
+        code = self.shared_bound.value
+
+        if code < self.bound_code():
+            self.set_bound_code(code)
+            self.covers = BestCovers(self.limit)
+
+    # The branches of a checkpointed search depend on the kind of search and on its instance, and its covers on the
+    # number of covers kept and on the original instance
+    def checkpoint_digest(self):
+        original_instance = None if self.reduction is None else self.reduction.original_instance()
+
+        return hashlib.sha256(repr((type(self).__name__, self.instance(), self.limit,
+                                    original_instance)).encode()).digest()
+
+    def instance(self):
+        return self.masks, self.universe
+
+    # The file is replaced atomically, so that a process killed while saving it keeps the previous state
+    def save_checkpoint(self, remaining):
+        if self.checkpoint_file is None:
+            return
+
+        with open(self.checkpoint_file + ".tmp", "wb") as checkpoint:
+            pickle.dump((self.checkpoint_digest(), remaining, self.bound_code(), self.covers, self.nb_nodes),
+                        checkpoint)
+
+        os.replace(self.checkpoint_file + ".tmp", self.checkpoint_file)
+
+    # Restore the state saved in the checkpoint file by a search of the same instance, and return the branches left to
+    # search (None if there is no such state)
+    def load_checkpoint(self):
+        if self.checkpoint_file is None or not os.path.isfile(self.checkpoint_file):
+            return None
+
+        try:
+            with open(self.checkpoint_file, "rb") as checkpoint:
+                digest, remaining, bound_code, covers, nb_nodes = pickle.load(checkpoint)
+        except (pickle.UnpicklingError, EOFError, ValueError):
+            print_warning("Checkpoint file |{}| is corrupted. It has been ignored.".format(self.checkpoint_file))
+            return None
+
+        if digest != self.checkpoint_digest():
+            print_warning("Checkpoint file |{}| was saved by the search of another instance. It has been ignored."
+                          .format(self.checkpoint_file))
+            return None
+
+        self.set_bound_code(bound_code)
+        self.covers = covers
+        self.nb_nodes = nb_nodes
+
+        if utils.VERBOSE:
+            utils.print_verbose("Search resumed from checkpoint file |{}| ({} nodes searched, {} branches left)."
+                                .format(self.checkpoint_file, nb_nodes, len(remaining)))
+
+        return remaining
+
+
+# Search of all the covers having the smallest number of candidates
+class MinimumCoverSearch(CoverSearch):
+    def __init__(self, masks, universe, time_bound=-1, limit=None):
+        super().__init__(masks, universe, time_bound, limit)
+        self.best_size = None
+
+    def initialise_bound(self):
+        self.initial_cover = greedy_cover(self.masks, self.universe)
+        self.best_size = len(self.initial_cover)
+
+    def best(self):
+        return self.best_size
+
+    def bound_code(self):
+        return self.best_size
+
+    def set_bound_code(self, code):
+        self.best_size = code
+
+    def search_rec(self, uncovered, forbidden, chosen, cost):
+        self.nb_nodes += 1
+
+        if self.must_stop(chosen):
+            return
+
+        if uncovered == 0:
+            if len(chosen) < self.best_size:
+                self.best_size = len(chosen)
+                self.covers = BestCovers(self.limit)
+                self.share_bound()
+
+            # The bound may have been lowered by another process since the parent node was examined
+            if len(chosen) == self.best_size:
+                first = not self.covers
+                cover = self.add_cover(self.covers, tuple(sorted(chosen)), chosen)
+
+                if first:
+                    self.notify_listener(cover)
+
+            return
+
+        branching_candidates, size_lower_bound = self.analyse_uncovered_labels(uncovered, forbidden)
+
+        if branching_candidates is None or len(chosen) + size_lower_bound > self.best_size:
+            return
+
+        masks = self.masks
+
+        for candidate in iterate_bits(branching_candidates):
+            chosen.append(candidate)
+            yield self.search_rec(uncovered & ~masks[candidate], forbidden, chosen, cost)
+            chosen.pop()
+            forbidden |= 1 << candidate
+
+    def branch_lower_bound(self, uncovered, forbidden, chosen, cost):
+        if uncovered == 0:
+            return len(chosen)
+
+        branching_candidates, size_lower_bound = self.analyse_uncovered_labels(uncovered, forbidden)
+
+        return None if branching_candidates is None else len(chosen) + size_lower_bound
+
+
+# Search of all the covers reaching the fewest green labels, and among them of the smallest ones: covers are compared
+# on (number of green labels reached, number of candidates). The cost of a node is the union of the green labels
+# reached by its chosen candidates. Besides the size bound, a node is pruned when its green labels, plus the fewest
+# new green labels reached by a candidate covering the rarest uncovered label (one of them has to be chosen), exceed
+# the green labels of the best covers. Candidates are tried by increasing number of new green labels reached, and
+# then by decreasing number of uncovered labels covered, so that good covers are found first.
+class LeastGreenImpactSearch(CoverSearch):
+    def __init__(self, masks, green_masks, universe, time_bound=-1, limit=None):
+        super().__init__(masks, universe, time_bound, limit)
+        self.green_masks = green_masks
+        self.best_cost = None
+
+    def initialise_bound(self):
+        self.initial_cover = greedy_weighted_cover(self.masks, self.green_masks, self.universe)
+        self.best_cost = (popcount(self.cover_green(self.initial_cover)), len(self.initial_cover))
+
+    def best(self):
+        return self.best_cost
+
+    def instance(self):
+        return self.masks, self.green_masks, self.universe
+
+    def cover_green(self, cover):
+        green = 0
+
+        for candidate in cover:
+            green |= self.green_masks[candidate]
+
+        return green
+
+    def branching_order(self, branching_candidates, uncovered, green):
+        return self.order_by_new_green_labels({candidate: popcount(self.green_masks[candidate] & ~green)
+                                               for candidate in iterate_bits(branching_candidates)}, uncovered)
+
+    def order_by_new_green_labels(self, new_green_labels, uncovered):
+        masks = self.masks
+
+        return sorted(new_green_labels, key=lambda candidate: (new_green_labels[candidate],
+                                                               -popcount(masks[candidate] & uncovered), candidate))
+
+    def branch_cost(self, green, candidate):
+        return green | self.green_masks[candidate]
+
+    # A cover has at most one candidate of each kind
+    def bound_code(self):
+        nb_green_labels, size = self.best_cost
+
+        return nb_green_labels * (len(self.masks) + 1) + size
+
+    def set_bound_code(self, code):
+        self.best_cost = divmod(code, len(self.masks) + 1)
+
+    def search_rec(self, uncovered, forbidden, chosen, green):
+        self.nb_nodes += 1
+
+        if self.must_stop(chosen):
+            return
+
+        nb_green_labels = popcount(green)
+
+        if uncovered == 0:
+            cost = (nb_green_labels, len(chosen))
+
+            if cost < self.best_cost:
+                self.best_cost = cost
+                self.covers = BestCovers(self.limit)
+                self.share_bound()
+
+            if cost == self.best_cost:
+                first = not self.covers
+                cover = self.add_cover(self.covers, tuple(sorted(chosen)), chosen)
+
+                if first:
+                    self.notify_listener(cover)
+
+            return
+
+        best_nb_green_labels, best_size = self.best_cost
+
+        if nb_green_labels > best_nb_green_labels:
+            return
+
+        branching_candidates, size_lower_bound = self.analyse_uncovered_labels(uncovered, forbidden)
+
+        if branching_candidates is None:
+            return
+
+        masks = self.masks
+        green_masks = self.green_masks
+        new_green_labels = {candidate: popcount(green_masks[candidate] & ~green)
+                            for candidate in iterate_bits(branching_candidates)}
+        green_lower_bound = nb_green_labels + min(new_green_labels.values())
+
+        if green_lower_bound > best_nb_green_labels \
+                or (green_lower_bound == best_nb_green_labels and len(chosen) + size_lower_bound > best_size):
+            return
+
+        for candidate in self.order_by_new_green_labels(new_green_labels, uncovered):
+            chosen.append(candidate)
+            yield self.search_rec(uncovered & ~masks[candidate], forbidden, chosen, green | green_masks[candidate])
+            chosen.pop()
+            forbidden |= 1 << candidate
+
+    # Covers reaching the fewest green labels are compared on their size, so that the lower bound of the size only
+    # holds for the covers reaching exactly the lower bound of the number of green labels
+    def branch_lower_bound(self, uncovered, forbidden, chosen, green):
+        if uncovered == 0:
+            return popcount(green), len(chosen)
+
+        branching_candidates, size_lower_bound = self.analyse_uncovered_labels(uncovered, forbidden)
+
+        if branching_candidates is None:
+            return None
+
+        green_lower_bound = popcount(green) + min(popcount(self.green_masks[candidate] & ~green)
+                                                  for candidate in iterate_bits(branching_candidates))
+
+        return green_lower_bound, len(chosen) + size_lower_bound
+
+
+# Search of the Pareto front of the covers compared on (number of candidates, number of green labels reached): all the
+# covers such that no other cover is at least as good on both criteria and better on one of them. The front is a dict
+# associating each of its points (number of candidates, number of green labels) with its covers (a BestCovers). A node
+# is pruned when a point of the front is better than the lower bounds of both criteria for the covers of the node, and
+# better on one of them. The front thus contains the covers of least size, and the covers having the least impact on
+# the green part.
+class ParetoFrontSearch(LeastGreenImpactSearch):
+    def __init__(self, masks, green_masks, universe, time_bound=-1, limit=None):
+        super().__init__(masks, green_masks, universe, time_bound, limit)
+        self.covers = {}
+
+    # The front is not bounded by the greedy cover, which is only returned if the time bound is reached before any
+    # cover is found
+    def initialise_bound(self):
+        self.initial_cover = greedy_weighted_cover(self.masks, self.green_masks, self.universe)
+
+    def use_initial_cover(self):
+        self.add_to_front((len(self.initial_cover), popcount(self.cover_green(self.initial_cover))),
+                          tuple(sorted(self.initial_cover)))
+
+    def best(self):
+        return None
+
+    def bound_code(self):
+        return 0
+
+    def set_bound_code(self, code):
+        pass
+
+    # The listener is called with each cover of a new point of the front
+    def search_rec(self, uncovered, forbidden, chosen, green):
+        self.nb_nodes += 1
+
+        if self.must_stop(chosen):
+            return
+
+        nb_green_labels = popcount(green)
+
+        if uncovered == 0:
+            cover = self.add_to_front((len(chosen), nb_green_labels), tuple(sorted(chosen)), chosen)
+
+            if cover is not None:
+                self.notify_listener(cover)
+
+            return
+
+        branching_candidates, size_lower_bound = self.analyse_uncovered_labels(uncovered, forbidden)
+
+        if branching_candidates is None:
+            return
+
+        masks = self.masks
+        green_masks = self.green_masks
+        new_green_labels = {candidate: popcount(green_masks[candidate] & ~green)
+                            for candidate in iterate_bits(branching_candidates)}
+
+        if self.dominated((len(chosen) + size_lower_bound, nb_green_labels + min(new_green_labels.values()))):
+            return
+
+        for candidate in self.order_by_new_green_labels(new_green_labels, uncovered):
+            chosen.append(candidate)
+            yield self.search_rec(uncovered & ~masks[candidate], forbidden, chosen, green | green_masks[candidate])
+            chosen.pop()
+            forbidden |= 1 << candidate
+
+    def dominated(self, point):
+        size, nb_green_labels = point
+
+        for front_point in self.covers:
+            front_size, front_nb_green_labels = front_point
+
+            if front_size <= size and front_nb_green_labels <= nb_green_labels and front_point != point:
+                return True
+
+        return False
+
+    # Return the first cover added if the cover is the first one of its point (None otherwise). The chosen candidates
+    # are those of the leaf of the cover, if it is found by the search (see add_cover()).
+    def add_to_front(self, point, cover, chosen=None):
+        if self.dominated(point):
+            return None
+
+        size, nb_green_labels = point
+
+        for front_point in list(self.covers):
+            front_size, front_nb_green_labels = front_point
+
+            if size <= front_size and nb_green_labels <= front_nb_green_labels and front_point != point:
+                del self.covers[front_point]
+
+        if point in self.covers:
+            self.add_cover(self.covers[point], cover, chosen)
+            return None
+
+        self.covers[point] = BestCovers(self.limit)
+
+        return self.add_cover(self.covers[point], cover, chosen)
+
+
+# Search of the covers of a CoverSearch by several processes, each one searching some of the first branches of the
+# search (about BRANCHES_PER_PROCESS per process, so that they get similar amounts of work). The instance is sent once
+# to each process, and the processes share the cost of the best covers found so far, each one reading it every
+# SHARED_BOUND_PERIOD nodes. As the bound never gets below the cost of the optimal covers, and as the branches are
+# returned in their order in the search, the covers found are the same as (and in the same order as) those of the
+# search by a single process.
+# The processes return the branches left to search when they are stopped by the deadline, and this process checkpoints
+# the search (see CoverSearch): the branches left to search are those left by the processes, followed by the branches
+# whose results were not received yet. A search resumed from a checkpoint splits these branches between the processes.
+def search_in_parallel(search, nb_processes):
+    if not can_be_covered(search.masks, search.universe) or search.universe == 0:
+        return search.search()
+
+    search.initialise_bound()
+    search.start_time = time.time()
+    search.checkpoint_time = search.start_time
+
+    # The deadline is sent to the processes with the search
+    if search.deadline is None:
+        search.deadline = compute_deadline(search.time_bound, search.start_time)
+
+    remaining = search.load_checkpoint()
+
+    if remaining is None:
+        search.nb_nodes = 1
+
+    branches = search.branches(BRANCHES_PER_PROCESS * nb_processes, remaining)
+    shared_bound = multiprocessing.Value("q", search.bound_code())
+    # The listener is called by this process, with the first cover of each branch improving the previous branches
+    listener = search.listener
+    search.listener = None
+    best_code = search.bound_code()
+    found = bool(search.covers)
+    remaining = []
+
+    with ProcessPoolExecutor(nb_processes, initializer=initialise_worker, initargs=(search, shared_bound)) as executor:
+        futures = [executor.submit(search_branch, branch) for branch in branches]
+
+        for index, future in enumerate(futures):
+            # The search is checkpointed while waiting for the result of the branch
+            while search.checkpoint_file is not None \
+                    and not wait([future], search.checkpoint_time + CHECKPOINT_PERIOD - time.time()).done:
+                search.set_bound_code(best_code)
+                search.save_checkpoint(remaining + branches[index:])
+                search.checkpoint_time = time.time()
+
+            code, covers, nb_nodes, complete, branch_remaining = future.result()
+
+            if covers and (code < best_code or not found):
+                if listener is not None:
+                    listener(next(iter(covers)))
+
+                best_code = code
+                found = True
+                search.covers = BestCovers(search.limit)
+
+            if covers and code == best_code:
+                search.covers.merge(covers)
+
+            search.nb_nodes += nb_nodes
+            search.complete = search.complete and complete
+            remaining.extend(branch_remaining)
+
+    search.listener = listener
+    search.set_bound_code(best_code)
+    search.save_checkpoint(remaining)
+
+    if not search.complete:
+        search.remaining = remaining
+        search.lower_bound = search.compute_lower_bound(remaining)
+
+        if not search.covers:
+            search.use_initial_cover()
+
+    return search.covers
+
+
+# Search of each process of search_in_parallel()
+WORKER_SEARCH = None
+
+
+def initialise_worker(search, shared_bound):
+    global WORKER_SEARCH
+    search.shared_bound = shared_bound
+    search.checkpoint_file = None
+    WORKER_SEARCH = search
+
+
+def search_branch(branch):
+    search = WORKER_SEARCH
+    search.covers = BestCovers(search.limit)
+    search.nb_nodes = 0
+    search.set_bound_code(search.shared_bound.value)
+
+    # Once the deadline is reached, the next branches are not searched
+    if not search.complete:
+        return search.bound_code(), [], 0, False, [branch]
+
+    search.branch = branch
+    run_without_recursion(search.search_branch_rec())
+
+    return search.bound_code(), search.covers, search.nb_nodes, search.complete, \
+        [] if search.complete else search.remaining
+
+
+# Approximation of the cover of least weight, for instances too large for the exact searches. The weight of a cover is
+# the sum of the (positive) weights of its candidates. The greedy algorithm repeatedly takes the candidate of least
+# weight per uncovered label covered, which gives a cover of weight at most H(d) times the optimum, H(d) being the d-th
+# harmonic number (H(d) <= ln(d) + 1) and d the largest number of labels covered by a candidate. This cover is then
+# improved by local search, removing the candidates whose labels are covered by the others (drop moves), and
+# replacing a candidate by a lighter one covering the labels that only it covers (swap moves).
+# The lower bound of the optimum is the largest of the greedy weight divided by H(d), and of the sum, over the labels,
+# of the least weight per label of a candidate covering them (a feasible solution of the dual of the relaxation).
+class ApproximateCoverSearch:
+    def __init__(self, masks, weights, universe):
+        self.masks = masks
+        self.weights = weights
+        self.universe = universe
+        self.greedy_weight = None
+        self.weight = None
+        self.lower_bound = None
+        self.max_coverage = None
+        self.harmonic_bound = None
+        self.logarithmic_bound = None
+        self.nb_drops = 0
+        self.nb_swaps = 0
+
+    def search(self):
+        if not can_be_covered(self.masks, self.universe):
+            return None
+
+        if self.universe == 0:
+            self.greedy_weight = self.weight = self.lower_bound = 0
+            return ()
+
+        self.max_coverage = max(popcount(mask & self.universe) for mask in self.masks)
+        self.harmonic_bound = sum(1 / coverage for coverage in range(1, self.max_coverage + 1))
+        self.logarithmic_bound = math.log(self.max_coverage) + 1
+
+        cover = self.greedy_cover()
+        self.greedy_weight = self.cover_weight(cover)
+        self.lower_bound = max(self.dual_lower_bound(), math.ceil(self.greedy_weight / self.harmonic_bound - 1e-9))
+        self.improve(cover)
+        self.weight = self.cover_weight(cover)
+
+        return tuple(sorted(cover))
+
+    # The weights per uncovered label only increase, so that the candidates are kept in a heap of possibly outdated
+    # weights per label, and a popped candidate is only taken if its updated weight per label is still the least
+    def greedy_cover(self):
+        masks = self.masks
+        weights = self.weights
+        uncovered = self.universe
+        heap = [(weights[candidate] / popcount(mask & uncovered), candidate)
+                for candidate, mask in enumerate(masks) if mask & uncovered]
+        heapq.heapify(heap)
+        cover = []
+
+        while uncovered:
+            _, candidate = heapq.heappop(heap)
+            coverage = popcount(masks[candidate] & uncovered)
+
+            if coverage == 0:
+                continue
+
+            ratio = weights[candidate] / coverage
+
+            if heap and (ratio, candidate) > heap[0]:
+                heapq.heappush(heap, (ratio, candidate))
+                continue
+
+            cover.append(candidate)
+            uncovered &= ~masks[candidate]
+
+        return cover
+
+    def dual_lower_bound(self):
+        masks = self.masks
+        weights = self.weights
+        universe = self.universe
+        lower_bound = 0
+        uncovered = universe
+
+        # Each label is charged with the least weight per label of the candidates covering it
+        for candidate in sorted((candidate for candidate in range(len(masks)) if masks[candidate] & universe),
+                                key=lambda candidate: weights[candidate] / popcount(masks[candidate] & universe)):
+            newly_covered = popcount(masks[candidate] & uncovered)
+
+            if newly_covered:
+                lower_bound += newly_covered * weights[candidate] / popcount(masks[candidate] & universe)
+                uncovered &= ~masks[candidate]
+
+        return math.ceil(lower_bound - 1e-9)
+
+    # Apply drop and swap moves to the cover until none of them decreases its weight
+    def improve(self, cover):
+        masks = self.masks
+        weights = self.weights
+        # A replacement covers in particular the lowest label only covered by the replaced candidate: the candidates
+        # covering each label are listed by increasing weight
+        covering = {label: [] for label in iterate_bits(self.universe)}
+
+        for candidate in sorted(range(len(masks)), key=lambda candidate: (weights[candidate], candidate)):
+            for label in iterate_bits(masks[candidate] & self.universe):
+                covering[label].append(candidate)
+
+        improved = True
+
+        while improved:
+            improved = False
+            # Heaviest candidates first
+            cover.sort(key=lambda candidate: (-weights[candidate], candidate))
+            covered_once = self.labels_covered_once(cover)
+            position = 0
+
+            while position < len(cover):
+                candidate = cover[position]
+                uniquely_covered = masks[candidate] & covered_once
+
+                if uniquely_covered == 0:
+                    del cover[position]
+                    self.nb_drops += 1
+                    improved = True
+                    covered_once = self.labels_covered_once(cover)
+                    continue
+
+                lowest_label = (uniquely_covered & -uniquely_covered).bit_length() - 1
+
+                for replacement in covering[lowest_label]:
+                    if weights[replacement] >= weights[candidate]:
+                        break
+
+                    if masks[replacement] & uniquely_covered == uniquely_covered:
+                        cover[position] = replacement
+                        self.nb_swaps += 1
+                        improved = True
+                        covered_once = self.labels_covered_once(cover)
+                        break
+
+                position += 1
+
+    # Labels of the universe covered by a single candidate of the cover
+    def labels_covered_once(self, cover):
+        covered = 0
+        covered_several_times = 0
+
+        for candidate in cover:
+            covered_several_times |= covered & self.masks[candidate]
+            covered |= self.masks[candidate]
+
+        return covered & ~covered_several_times & self.universe
+
+    def cover_weight(self, cover):
+        return sum(self.weights[candidate] for candidate in cover)
+
+
+# Former search: all the combinations of 1, 2, ... candidates are tested until one of them covers the universe
+def exhaustive_minimum_covers(masks, universe, deadline=None, limit=None):
+    covers = BestCovers(limit)
+    green_masks = [0] * len(masks)
+
+    for nb_candidates in range(1, len(masks) + 1):
+        for nb_combinations, (combination, covered, _) in enumerate(
+                iterate_combinations(masks, green_masks, nb_candidates, nb_candidates)):
+            if covered & universe == universe:
+                covers.add(tuple(combination))
+
+            if covers and nb_combinations % TIME_CHECK_PERIOD == 0 and deadline is not None \
+                    and time.time() > deadline:
+                return covers
+
+        if covers:
+            break
+
+    return covers
+
+
+# Former search of the least impact on the green part: all the combinations of candidates covering the universe are
+# compared on (number of green labels reached, number of candidates)
+def exhaustive_least_green_impact_covers(masks, green_masks, universe, deadline=None, limit=None):
+    best_cost = None
+    covers = BestCovers(limit)
+
+    for nb_combinations, (combination, covered, green) in enumerate(
+            iterate_combinations(masks, green_masks, 1, len(masks))):
+        if covers and nb_combinations % TIME_CHECK_PERIOD == 0 and deadline is not None and time.time() > deadline:
+            break
+
+        if covered & universe != universe:
+            continue
+
+        cost = (popcount(green), len(combination))
+
+        if best_cost is None or cost < best_cost:
+            best_cost = cost
+            covers = BestCovers(limit)
+
+        if cost == best_cost:
+            covers.add(tuple(combination))
+
+    return covers
+
+
+# Former search of the Pareto front (see ParetoFrontSearch): all the combinations of candidates covering the universe
+# are compared
+def exhaustive_pareto_front(masks, green_masks, universe, deadline=None, limit=None):
+    front = ParetoFrontSearch(masks, green_masks, universe, limit=limit)
+
+    for nb_combinations, (combination, covered, green) in enumerate(
+            iterate_combinations(masks, green_masks, 1, len(masks))):
+        if front.covers and nb_combinations % TIME_CHECK_PERIOD == 0 and deadline is not None \
+                and time.time() > deadline:
+            break
+
+        if covered & universe == universe:
+            front.add_to_front((len(combination), popcount(green)), tuple(combination))
+
+    return front.covers
+
+
+# Enumerate the combinations of <min_nb_candidates> to <max_nb_candidates> candidates, by a depth-first traversal of
+# the candidates carrying the unions of the masks (and of the green masks) of the candidates chosen so far, so that
+# each combination costs a single OR of each kind and no combination is stored. Yield each combination (a list
+# modified by the next steps, in increasing order) with its unions.
+def iterate_combinations(masks, green_masks, min_nb_candidates, max_nb_candidates):
+    nb_masks = len(masks)
+    combination = []
+    covered_unions = [0]
+    green_unions = [0]
+    candidate = 0
+
+    while True:
+        # Enough candidates must remain after the candidate to reach <min_nb_candidates>
+        if candidate < nb_masks and len(combination) < max_nb_candidates \
+                and candidate <= nb_masks - min_nb_candidates + len(combination):
+            combination.append(candidate)
+            covered_unions.append(covered_unions[-1] | masks[candidate])
+            green_unions.append(green_unions[-1] | green_masks[candidate])
+            candidate += 1
+
+            if len(combination) >= min_nb_candidates:
+                yield combination, covered_unions[-1], green_unions[-1]
+
+            continue
+
+        # Backtrack to the next candidate of the last chosen position
+        if not combination:
+            return
+
+        candidate = combination.pop() + 1
+        covered_unions.pop()
+        green_unions.pop()
+
+
+# Return the candidates chosen by the greedy algorithm, which repeatedly takes the candidate covering the most
+# uncovered labels
+def greedy_cover(masks, universe):
+    uncovered = universe
+    chosen = []
+
+    while uncovered:
+        best_candidate = max(range(len(masks)), key=lambda candidate: popcount(masks[candidate] & uncovered))
+
+        if masks[best_candidate] & uncovered == 0:
+            return None
+
+        chosen.append(best_candidate)
+        uncovered &= ~masks[best_candidate]
+
+    return chosen
+
+
+# Same as greedy_cover(), the candidates being compared on the number of new green labels they reach per uncovered
+# label they cover
+def greedy_weighted_cover(masks, green_masks, universe):
+    uncovered = universe
+    green = 0
+    chosen = []
+
+    while uncovered:
+        best_candidate = None
+        best_ratio = None
+
+        for candidate, mask in enumerate(masks):
+            coverage = popcount(mask & uncovered)
+
+            if coverage == 0:
+                continue
+
+            ratio = (popcount(green_masks[candidate] & ~green) / coverage, -coverage)
+
+            if best_ratio is None or ratio < best_ratio:
+                best_candidate = candidate
+                best_ratio = ratio
+
+        if best_candidate is None:
+            return None
+
+        chosen.append(best_candidate)
+        uncovered &= ~masks[best_candidate]
+        green |= green_masks[best_candidate]
+
+    return chosen
+
+
+def can_be_covered(masks, universe):
+    covered = 0
+
+    for mask in masks:
+        covered |= mask
+
+    return covered & universe == universe
+
+
+def compute_covering_candidates(masks, universe):
+    covering = {label: 0 for label in iterate_bits(universe)}
+
+    for candidate, mask in enumerate(masks):
+        for label in iterate_bits(mask & universe):
+            covering[label] |= 1 << candidate
+
+    return covering
+
+
+# Removing the lowest bit copies the mask, so that the bits of large masks are found in their binary string instead
+def iterate_bits(mask):
+    if mask.bit_length() > LARGE_MASK_LENGTH:
+        bits = bin(mask)[:1:-1]
+        position = bits.find("1")
+
+        while position != -1:
+            yield position
+            position = bits.find("1", position + 1)
+
+        return
+
+    while mask:
+        lowest_bit = mask & -mask
+        yield lowest_bit.bit_length() - 1
+        mask ^= lowest_bit
+
+
+# int.bit_count() only exists since Python 3.10
+if hasattr(int, "bit_count"):
+    popcount = int.bit_count
+else:
+    def popcount(mask):
+        return bin(mask).count("1")
+
+
+# Time at which a search started at <start_time> stops, given its time bound (None if it has no time bound)
+def compute_deadline(time_bound, start_time):
+    if time_bound <= 0:
+        return None
+
+    return start_time + time_bound
+
+
+# Enumerate the sorted tuples made of one element of each list (the lists being sorted and disjoint) in lexicographic
+# order, by a depth-first traversal choosing their elements by increasing value. An element can only be chosen if each
+# list without a chosen element has a larger element, so that every path of the traversal yields a tuple.
+def iterate_sorted_combinations(lists):
+    elements = sorted((element, index) for index, list_elements in enumerate(lists) for element in list_elements)
+    maxima = [list_elements[-1] for list_elements in lists]
+    used = [False] * len(lists)
+    combination = []
+    chosen_lists = []
+    # Position in the elements of the next element to try at each depth
+    positions = [0]
+
+    while positions:
+        if len(combination) < len(lists):
+            bound = min(maximum for maximum, list_used in zip(maxima, used) if not list_used)
+            position = positions[-1]
+
+            while position < len(elements) and elements[position][0] <= bound and used[elements[position][1]]:
+                position += 1
+
+            if position < len(elements) and elements[position][0] <= bound:
+                element, index = elements[position]
+                positions[-1] = position + 1
+                combination.append(element)
+                chosen_lists.append(index)
+                used[index] = True
+                positions.append(position + 1)
+                continue
+        else:
+            yield tuple(combination)
+
+        positions.pop()
+
+        if combination:
+            combination.pop()
+            used[chosen_lists.pop()] = False
+
+
+def ceil_division(a, b):
+    return -(-a // b)
+
+
+def negate(cover):
+    return tuple(-candidate for candidate in cover)
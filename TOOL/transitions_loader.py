@@ -1,37 +1,56 @@
 import utils
-from lts_parser import TransitionType
-from utils import transition_in_set
+from lts_parser import TransitionType, CompactTransition, TRANSITION_TYPE_CODES
 
 
 # Class used to compute the transitions belonging to the sets ART, FRT and URT
 # As transitions are uniquely defined by the tuple (inc_state, out_state, label),
-# and as we want only uniquely labelled transitions here, we verify that a transition
-# of same label is not already in the set before adding it to the set.
+# and as we want only uniquely labelled transitions here, each set contains a single
+# transition per label.
+# The three sets are computed from a census of the labels of the CLTS, built by a single
+# pass over its transitions, so that their computation is linear in the size of the CLTS.
+# This census can also be built by the CounterexamplesGenerator (or the Minimiser) while
+# producing the CLTS, in which case it is given to the loader instead of being computed again.
+
+
+class LabelCensus:
+    def __init__(self):
+        self.has_red = False
+        self.has_green = False
+        self.has_black = False
+        self.red_transitions = []
+        # Red transitions whose source is a neighbourhood
+        self.neighbourhood_red_transitions = []
 
 
 class TransitionsLoader:
-    def __init__(self, all_transitions):
+    def __init__(self, all_transitions, census=None):
         self.art = set()
         self.frt = set()
         self.urt = set()
         self.all_transitions = all_transitions
+        self.census = census
 
         if utils.VERBOSE:
             utils.print_verbose("Transitions set has {} transitions.".format(len(all_transitions)))
 
     def load_subsets(self):
+        if self.census is None:
+            self.census = compute_label_census(self.all_transitions)
+        elif utils.VERBOSE:
+            utils.print_verbose("Census of the {} labels computed during the generation reused.".format(
+                len(self.census)))
+
         self.load_art()
         self.load_frt()
         self.load_urt()
-        self.correct_art()
         print("ART has {} transitions.".format(len(self.art)))
         print("FRT has {} transitions.".format(len(self.frt)))
         print("URT has {} transitions.".format(len(self.urt)))
 
     def load_art(self):
-        for transition in self.all_transitions:
-            if transition.transition_type == TransitionType.INCORRECT and transition not in self.art:
-                self.art.add(transition)
+        for label_census in self.census.values():
+            if label_census.has_red:
+                self.art.add(label_census.red_transitions[0])
 
         if utils.VERBOSE:
             utils.print_verbose("ART has {} transitions:".format(len(self.art)))
@@ -40,9 +59,9 @@ class TransitionsLoader:
                 utils.print_verbose("Transition " + transition.label)
 
     def load_frt(self):
-        for transition in self.art:
-            if transition.inc_state.is_a_neighbourhood and not transition_in_set(self.frt, transition):
-                self.frt.add(transition)
+        for label_census in self.census.values():
+            if label_census.neighbourhood_red_transitions:
+                self.frt.add(label_census.neighbourhood_red_transitions[0])
 
         if utils.VERBOSE:
             utils.print_verbose("FRT has {} transitions.".format(len(self.frt)))
@@ -51,10 +70,11 @@ class TransitionsLoader:
                 utils.print_verbose("Transition " + transition.label)
 
     def load_urt(self):
-        for transition in self.frt:
-            if check_if_transition_is_only_red(transition, self.all_transitions) \
-                    and not transition_in_set(self.urt, transition):
-                self.urt.add(transition)
+        # URT transitions are the FRT transitions whose label only appears on red transitions
+        for label_census in self.census.values():
+            if label_census.neighbourhood_red_transitions and not label_census.has_green \
+                    and not label_census.has_black:
+                self.urt.add(label_census.neighbourhood_red_transitions[0])
 
         if utils.VERBOSE:
             utils.print_verbose("URT has {} transitions.".format(len(self.urt)))
@@ -62,21 +82,61 @@ class TransitionsLoader:
             for transition in self.urt:
                 utils.print_verbose("Transition " + transition.label)
 
-    def correct_art(self):
-        corrected_art = set()
 
-        for transition in self.art:
-            if not transition_in_set(corrected_art, transition):
-                corrected_art.add(transition)
+# Return the census of each label of the given transitions, indexed by label identifier
+def compute_label_census(transitions):
+    census = {}
+
+    for transition in transitions:
+        add_to_label_census(census, transition)
+
+    return census
+
+
+def add_to_label_census(census, transition):
+    label_census = census.get(transition.label_id)
+
+    if label_census is None:
+        label_census = LabelCensus()
+        census[transition.label_id] = label_census
+
+    transition_type = transition.transition_type
+
+    if transition_type == TransitionType.INCORRECT:
+        label_census.has_red = True
+        label_census.red_transitions.append(transition)
+
+        if transition.inc_state.is_a_neighbourhood:
+            label_census.neighbourhood_red_transitions.append(transition)
+    elif transition_type == TransitionType.CORRECT:
+        label_census.has_green = True
+    else:
+        label_census.has_black = True
+
+
+# Same as compute_label_census(), reading the arrays of a CompactLts: views are only created for red transitions
+def compute_compact_label_census(clts):
+    census = {}
+    red_code = TRANSITION_TYPE_CODES[TransitionType.INCORRECT]
+    green_code = TRANSITION_TYPE_CODES[TransitionType.CORRECT]
+    neighbourhoods = clts.neighbourhoods
+
+    for transition, (source, label_id, color) in enumerate(zip(clts.sources, clts.label_ids, clts.colors)):
+        label_census = census.get(label_id)
 
-        self.art = corrected_art
+        if label_census is None:
+            label_census = LabelCensus()
+            census[label_id] = label_census
 
+        if color == red_code:
+            label_census.has_red = True
+            label_census.red_transitions.append(CompactTransition(clts, transition))
 
-def check_if_transition_is_only_red(transition, all_transitions):
-    for current_transition in all_transitions:
-        if transition.label == current_transition.label \
-                and (current_transition.transition_type == TransitionType.CORRECT or
-                     current_transition.transition_type == TransitionType.NEUTRAL):
-            return False
+            if neighbourhoods[source] == 1:
+                label_census.neighbourhood_red_transitions.append(label_census.red_transitions[-1])
+        elif color == green_code:
+            label_census.has_green = True
+        else:
+            label_census.has_black = True
 
-    return True
+    return census
@@ -1,7 +1,7 @@
 from enum import Enum
 
 from lts_parser import TransitionType, State, Transition
-from utils import parse_property, transition_updates_property, print_error
+from utils import print_error
 
 
 class Truncation(Enum):
@@ -14,13 +14,13 @@ class Truncation(Enum):
 
 
 class Truncator:
-    def __init__(self, clts_parser, override, mcl_file):
+    def __init__(self, clts_parser, override, property_automaton):
         self.clts_parser = clts_parser
         self.override = override
-        self.property = parse_property(mcl_file)
+        self.property = property_automaton
 
     def truncate(self, truncation):
-        initial_state = get_initial_state(self.clts_parser.states)
+        initial_state = get_initial_state(self.clts_parser)
 
         if truncation == Truncation.FULL:
             self.truncate_all_green_rec(initial_state, set(), False)
@@ -83,8 +83,7 @@ class Truncator:
         visited_states.add(current_state)
 
         for transition in current_state.out_transitions:
-            current_advancement = advancement + 1 if transition_updates_property(self.property, transition,
-                                                                                 advancement) else advancement
+            current_advancement = self.property.next_advancement(advancement, transition.label_id)
 
             if transition.transition_type == TransitionType.CORRECT:
                 if should_be_removed:
@@ -101,7 +100,7 @@ class Truncator:
                         # Do nothing because the current state may have already been removed
                         pass
 
-                property_validated = current_advancement == len(self.property)
+                property_validated = self.property.is_accepting(current_advancement)
                 current_start_removing = should_be_removed or property_validated
 
                 self.truncate_green_after_liveness_rec(
@@ -143,7 +142,7 @@ class Truncator:
 
     def add_red_sink_state(self):
         to_red_sink_transitions = set()
-        self.get_to_red_sink_transitions(get_initial_state(self.clts_parser.states), to_red_sink_transitions, set())
+        self.get_to_red_sink_transitions(get_initial_state(self.clts_parser), to_red_sink_transitions, set())
         sink_state = State(-2)
         self.clts_parser.states.append(sink_state)
 
@@ -156,13 +155,14 @@ class Truncator:
             except ValueError:
                 pass
 
-            new_transition = Transition(transition.inc_state, sink_state, transition.label, TransitionType.INCORRECT)
+            new_transition = Transition(transition.inc_state, sink_state, transition.label_id,
+                                        TransitionType.INCORRECT)
             self.clts_parser.transitions.append(new_transition)
             self.clts_parser.red_transitions.append(new_transition)
 
     def add_green_sink_state(self):
         to_green_sink_transitions = set()
-        self.get_to_green_sink_transitions(get_initial_state(self.clts_parser.states), to_green_sink_transitions, set())
+        self.get_to_green_sink_transitions(get_initial_state(self.clts_parser), to_green_sink_transitions, set())
         sink_state = State(-1)
         self.clts_parser.states.append(sink_state)
 
@@ -175,7 +175,7 @@ class Truncator:
             except ValueError:
                 pass
 
-            new_transition = Transition(transition.inc_state, sink_state, transition.label, TransitionType.CORRECT)
+            new_transition = Transition(transition.inc_state, sink_state, transition.label_id, TransitionType.CORRECT)
             self.clts_parser.transitions.append(new_transition)
             self.clts_parser.green_transitions.append(new_transition)
 
@@ -209,9 +209,10 @@ class Truncator:
                 self.get_to_green_sink_transitions(transition.out_state, to_green_sink_transitions, visited_states)
 
 
-def get_initial_state(states):
-    for state in states:
-        if state.inc_transitions == set():
+# The initial state of a CLTS may have incoming transitions when its states are product states
+def get_initial_state(clts_parser):
+    for state in clts_parser.states:
+        if state.label == clts_parser.initial_state:
             return state
 
     print_error("No initial state could be found.")
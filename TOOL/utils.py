@@ -1,4 +1,5 @@
 from colors import colors
+from label_table import LABELS
 
 VERBOSE = False
 
@@ -24,11 +25,24 @@ def is_an_int(str):
     return True
 
 
-def transition_in_set(set, transition):
-    for current_transition in set:
-        if transition.label == current_transition.label:
-            return True
-    return False
+# Run a recursive function written as a generator, in which each recursive call "f(x)" is replaced by
+# "yield f(x)" (which evaluates to the value returned by the call). The calls are kept on an explicit stack
+# instead of the Python stack, so that the recursion depth is not bounded by the recursion limit.
+def run_without_recursion(generator):
+    stack = [generator]
+    result = None
+
+    while stack:
+        try:
+            call = stack[-1].send(result)
+        except StopIteration as stop:
+            stack.pop()
+            result = stop.value
+        else:
+            stack.append(call)
+            result = None
+
+    return result
 
 
 # We expect a property of type INEVITABLE("A", "B", ...)
@@ -68,8 +82,6 @@ def parse_property(mcl_file):
     return parsed_property
 
 
-def transition_updates_property(property, transition, advancement):
-    if advancement >= len(property) or advancement < 0:
-        return False
-
-    return property[advancement].upper() == transition.label.upper()
+# Resolve the labels of the property to their identifiers, so that progress checks are integer comparisons
+def parse_property_label_ids(mcl_file):
+    return [LABELS.intern(label) for label in parse_property(mcl_file)]
@@ -5,6 +5,7 @@
 # If this is the case, then the CLTS is badly formed.
 import utils
 from lts_parser import TransitionType
+from utils import run_without_recursion
 
 
 class Verifier:
@@ -15,11 +16,12 @@ class Verifier:
         visited_transitions = set()
 
         for transition in self.initial_state.out_transitions:
-            if not self.verify_rec(transition, visited_transitions, transition.transition_type):
+            if not run_without_recursion(self.verify_rec(transition, visited_transitions, transition.transition_type)):
                 return False
 
         return True
 
+    # Written as a generator to be run by utils.run_without_recursion(): each recursive call is yielded
     def verify_rec(self, transition, visited_transitions, expected_type):
         if transition in visited_transitions:
             transition_is_valid = True if expected_type == TransitionType.NEUTRAL\
@@ -44,7 +46,7 @@ class Verifier:
             new_transition_type = transition.transition_type
 
         for out_transition in transition.out_state.out_transitions:
-            if not self.verify_rec(out_transition, visited_transitions, new_transition_type):
+            if not (yield self.verify_rec(out_transition, visited_transitions, new_transition_type)):
                 if utils.VERBOSE:
                     utils.print_verbose("{} should be of type {}. Current is {}."
                           .format(transition, expected_type.value, transition.transition_type.value))